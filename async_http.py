@@ -0,0 +1,61 @@
+"""
+Servidor HTTP/1.1 mínimo sobre asyncio para los servicios simulados del harness
+(billetera externa, backend nulo). Soporta keep-alive y cuerpos con Content-Length.
+"""
+import asyncio
+import json
+import os
+from typing import Awaitable, Callable, Tuple, Union
+
+Payload = Union[dict, list, bytes]
+Dispatch = Callable[[str, str, bytes], Awaitable[Tuple[int, Payload]]]
+
+STATUS_TEXT = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 403: "Forbidden",
+               404: "Not Found", 500: "Internal Server Error", 503: "Service Unavailable"}
+
+async def serve_connection(dispatch: Dispatch, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            lines = head.decode("latin-1").split("\r\n")
+            method, path, _ = lines[0].split(" ", 2)
+            headers = {k.strip().lower(): v.strip() for k, v in
+                       (line.split(":", 1) for line in lines[1:] if ":" in line)}
+            body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+            try:
+                status, payload = await dispatch(method, path.split("?", 1)[0], body)
+            except (ValueError, TypeError) as e:
+                status, payload = 400, {"error": str(e)}
+            data = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            keep_alive = headers.get("connection", "").lower() != "close"
+            writer.write(
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: application/json\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + data
+            )
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (asyncio.IncompleteReadError, ConnectionError, asyncio.LimitOverrunError):
+        pass
+    finally:
+        writer.close()
+
+async def serve(dispatch: Dispatch, host: str, port: int, reuse_port: bool = False):
+    server = await asyncio.start_server(
+        lambda r, w: serve_connection(dispatch, r, w), host, port, backlog=1024, reuse_port=reuse_port
+    )
+    async with server:
+        await server.serve_forever()
+
+def run(dispatch_factory: Callable[[], Dispatch], host: str, port: int, processes: int = 1) -> None:
+    """Levanta el servidor; con processes > 1 se forkean procesos que comparten el puerto (SO_REUSEPORT)."""
+    for _ in range(processes - 1):
+        if os.fork() == 0:
+            break
+    try:
+        asyncio.run(serve(dispatch_factory(), host, port, reuse_port=processes > 1))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,219 @@
+"""
+Escenario para aislar el costo de la autenticación por request.
+
+JwtAuthenticationFilter valida el JWT de cada request con header Bearer y, si es válido,
+busca el usuario en la base (UserService.loadUserByUsername), aun en lecturas baratas
+como /api/v1/wallet/balance/{cvu}. Este escenario manda la misma mezcla de endpoints con
+cuatro variantes del header Authorization:
+
+  none       sin header: el filtro no hace nada
+  malformed  un string sin la forma de un JWT: falla al parsearlo, sin verificar firma
+  expired    JWT vencido: se verifica la firma y falla por exp, sin buscar al usuario
+  valid      el token del usuario: firma, exp y lookup del usuario en la base
+
+Cada usuario recorre las cuatro variantes en orden aleatorio, una por request, así todas
+ven la misma carga, los mismos usuarios y el mismo momento de la corrida. Los requests se
+reportan como "🔐 <endpoint> [<variante>]". Los endpoints son permitAll en SecurityConfig,
+así que todas las variantes deberían recibir 200; un 401/403 en una variante sin token
+válido también cuenta como éxito (el costo medido es el del rechazo).
+
+Al terminar se loguea por endpoint la latencia de cada variante, la diferencia contra
+"none" y el throughput máximo por conexión (1000 / promedio en ms, lo que un cliente
+sin espera puede hacer) con su pérdida contra "none". Se separan dos costos: verificar
+el JWT (expired - none) y el lookup del usuario (valid - expired). El resumen se guarda en
+auth_results/auth-overhead-<timestamp>.json y las filas por variante quedan en
+results_store como cualquier endpoint, para seguirlas entre corridas con compare.
+
+  AUTH_OVERHEAD_ENDPOINTS  mezcla de endpoints con pesos (default balance=3,history=1)
+  AUTH_JWT_SECRET          secreto del backend (default JWT_SECRET_KEY) para firmar el token
+                           vencido; sin secreto el token vencido lleva una firma inválida y
+                           "expired" mide el rechazo por firma, que cuesta lo mismo
+  AUTH_OUTPUT_DIR          directorio del resumen (default auth_results, vacío = no se guarda)
+
+Uso: locust -f auth_overhead.py --headless -u 50 -r 10 -t 5m AuthOverheadUser
+"""
+import base64
+import hashlib
+import hmac
+import json
+import os
+import random
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from locust import constant, events
+from locust.runners import MasterRunner, WorkerRunner
+
+from locustfile import WalletHttpUser, WalletUserFlow, logger
+
+AUTH_OVERHEAD_ENDPOINTS = os.getenv("AUTH_OVERHEAD_ENDPOINTS", "balance=3,history=1")
+AUTH_JWT_SECRET = os.getenv("AUTH_JWT_SECRET", os.getenv("JWT_SECRET_KEY", ""))
+AUTH_OUTPUT_DIR = os.getenv("AUTH_OUTPUT_DIR", "auth_results")
+AUTH_VARIANTS = ("none", "malformed", "expired", "valid")
+AUTH_REJECTED = (401, 403)
+
+ENDPOINTS = {
+    "balance": ("💰 Check Balance", "/api/v1/wallet/balance/{cvu}"),
+    "history": ("📊 Transaction History", "/api/v1/transaction/{cvu}/history"),
+}
+
+def parse_endpoints(spec: str) -> List[str]:
+    """"balance=3,history=1" -> lista expandida por peso."""
+    expanded = []
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        endpoint, _, weight = part.partition("=")
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Endpoint desconocido en AUTH_OVERHEAD_ENDPOINTS: {endpoint} "
+                             f"(opciones: {', '.join(ENDPOINTS)})")
+        expanded += [endpoint] * int(weight or 1)
+    if not expanded:
+        raise ValueError("AUTH_OVERHEAD_ENDPOINTS no tiene endpoints")
+    return expanded
+
+endpoint_mix = parse_endpoints(AUTH_OVERHEAD_ENDPOINTS)
+
+def _b64(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+def expired_token(valid_token: str) -> str:
+    """Mismo header y claims que el token válido pero vencido hace un día."""
+    header, payload, signature = valid_token.split(".")
+    try:
+        claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+    except ValueError:
+        claims = {}
+    now = int(time.time())
+    claims.update(iat=now - 2 * 86400, exp=now - 86400)
+    signing_input = f"{header}.{_b64(json.dumps(claims, separators=(',', ':')).encode())}"
+    if AUTH_JWT_SECRET:
+        signature = _b64(hmac.new(AUTH_JWT_SECRET.encode(), signing_input.encode(), hashlib.sha256).digest())
+    return f"{signing_input}.{signature}"
+
+def malformed_token() -> str:
+    return uuid.uuid4().hex + uuid.uuid4().hex
+
+class AuthOverheadFlow(WalletUserFlow):
+    journeys = False
+
+    def on_start(self):
+        super().on_start()
+        if not self.cvu:
+            self.step_1_register_user()
+        self._variants: List[str] = []
+        self._tokens: Dict[str, str] = {}
+        if self.auth_token:
+            self._tokens = {"malformed": malformed_token(), "expired": expired_token(self.auth_token)}
+
+    def _next_variant(self) -> str:
+        if not self._variants:
+            self._variants = random.sample(AUTH_VARIANTS, len(AUTH_VARIANTS))
+        return self._variants.pop()
+
+    def auth_request(self):
+        if not self.cvu or not self.auth_token:
+            return
+        variant = self._next_variant()
+        label, path = ENDPOINTS[random.choice(endpoint_mix)]
+        token = self.auth_token if variant == "valid" else self._tokens.get(variant)
+        headers = {"Authorization": f"Bearer {token}"} if token else {}
+        with self.client.get(path.format(cvu=self.cvu), headers=headers, name=f"🔐 {label} [{variant}]",
+                             catch_response=True) as response:
+            if response.status_code == 200 or (variant != "valid" and response.status_code in AUTH_REJECTED):
+                response.success()
+            else:
+                response.failure(f"Status {response.status_code} con token {variant}: {response.text[:200]}")
+
+AuthOverheadFlow.tasks = [AuthOverheadFlow.auth_request]
+
+class AuthOverheadUser(WalletHttpUser):
+    tasks = [AuthOverheadFlow]
+    wait_time = constant(0)
+    host = "http://localhost:8080"
+
+def _variant_stats(entry) -> dict:
+    return {
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "rps": round(entry.total_rps, 2),
+        "avg": round(entry.avg_response_time, 2),
+        "p50": entry.get_response_time_percentile(0.5),
+        "p95": entry.get_response_time_percentile(0.95),
+        "p99": entry.get_response_time_percentile(0.99),
+        # Lo que puede hacer una conexión sin espera entre requests
+        "max_rps_per_connection": round(1000 / entry.avg_response_time, 1) if entry.avg_response_time else None,
+    }
+
+def _cost(stats: Dict[str, dict], variant: str, baseline: str) -> Optional[dict]:
+    if variant not in stats or baseline not in stats:
+        return None
+    current, base = stats[variant], stats[baseline]
+    return {
+        "avg_ms": round(current["avg"] - base["avg"], 2),
+        "p50_ms": current["p50"] - base["p50"],
+        "p95_ms": current["p95"] - base["p95"],
+        "throughput_loss": round(1 - base["avg"] / current["avg"], 4) if current["avg"] else None,
+    }
+
+def summarize(stats) -> Dict[str, dict]:
+    """Por endpoint: stats de cada variante y costos de verificar el JWT y del lookup del usuario."""
+    summary = {}
+    for label, _ in ENDPOINTS.values():
+        variants = {}
+        for variant in AUTH_VARIANTS:
+            entry = stats.entries.get((f"🔐 {label} [{variant}]", "GET"))
+            if entry and entry.num_requests:
+                variants[variant] = _variant_stats(entry)
+        if not variants:
+            continue
+        summary[label] = {
+            "variants": variants,
+            "vs_none": {variant: _cost(variants, variant, "none") for variant in AUTH_VARIANTS[1:]},
+            "jwt_verification": _cost(variants, "expired", "none"),
+            "user_lookup": _cost(variants, "valid", "expired"),
+        }
+    return summary
+
+def report(environment) -> Optional[str]:
+    summary = summarize(environment.stats)
+    if not summary:
+        return None
+    lines = []
+    for label, endpoint in summary.items():
+        lines.append(f"{label}:")
+        lines.append(f"  {'variante':>10} | {'reqs':>7} | {'avg':>7} | {'p50':>5} | {'p95':>5} | {'p99':>5} | "
+                     f"{'Δavg':>7} | {'Δp50':>5} | {'req/s/con':>9} | pérdida")
+        for variant, s in endpoint["variants"].items():
+            cost = endpoint["vs_none"].get(variant) or {}
+            loss = cost.get("throughput_loss")
+            lines.append(f"  {variant:>10} | {s['requests']:>7} | {s['avg']:>7.2f} | {s['p50']:>5} | {s['p95']:>5} | "
+                         f"{s['p99']:>5} | {cost.get('avg_ms', 0):>7.2f} | {cost.get('p50_ms', 0):>5} | "
+                         f"{s['max_rps_per_connection'] or 0:>9.1f} | {(loss or 0) * 100:>6.1f}%")
+        for name, key in (("verificar el JWT", "jwt_verification"), ("lookup del usuario", "user_lookup")):
+            cost = endpoint[key]
+            if cost:
+                lines.append(f"  Costo de {name}: {cost['avg_ms']:+.2f}ms promedio, {cost['p95_ms']:+}ms p95, "
+                             f"{(cost['throughput_loss'] or 0) * 100:.1f}% de throughput por conexión")
+    if not AUTH_JWT_SECRET:
+        lines.append("  (sin AUTH_JWT_SECRET: el token vencido tiene firma inválida)")
+    logger.info("🔐 Costo de autenticación por endpoint (ms)\n%s", "\n".join(lines))
+    if not AUTH_OUTPUT_DIR:
+        return None
+    os.makedirs(AUTH_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(AUTH_OUTPUT_DIR, f"auth-overhead-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({"endpoints": AUTH_OVERHEAD_ENDPOINTS, "signed_expired": bool(AUTH_JWT_SECRET),
+                   "summary": summary}, f, indent=2, ensure_ascii=False)
+    logger.info("📈 Resumen de costo de autenticación guardado en %s", path)
+    return path
+
+@events.test_stop.add_listener
+def report_local_run(environment, **kwargs):
+    if not isinstance(environment.runner, (MasterRunner, WorkerRunner)):
+        report(environment)
+
+@events.quitting.add_listener
+def report_distributed_run(environment, **kwargs):
+    # Las stats finales de los workers llegan después del test_stop del master
+    if isinstance(environment.runner, MasterRunner):
+        report(environment)
@@ -0,0 +1,141 @@
+"""
+Benchmark del techo del harness: corre locustfile_ceiling.py (un solo proceso,
+equivalente a un worker) contra null_backend.py y reporta, por clase de usuario
+y tarea, el máximo de requests/s sostenible, requests/s por core y el costo de
+CPU por request del proceso de Locust. Por defecto compara HttpUser (requests)
+contra FastHttpUser (geventhttpclient) sobre el mismo escenario.
+
+Los resultados se guardan en bench_results/harness-<versión>.json para
+dimensionar cuántos workers hacen falta para una carga objetivo.
+
+Uso: python bench_harness.py [--users 10,50,200] [--duration 20] [--tasks mix,balance,...]
+                             [--user-classes CeilingWalletUser,FastCeilingWalletUser]
+"""
+import argparse
+import csv
+import json
+import os
+import resource
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+from results_store import harness_version
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ALL_TASKS = "mix,register,login,balance,deposit,withdrawal,transfer,history"
+DEFAULT_USER_CLASSES = "CeilingWalletUser,FastCeilingWalletUser"
+MAX_FAILURE_RATIO = 0.01
+
+def wait_for_port(host: str, port: int, timeout: float = 10.0) -> None:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"El backend nulo no respondió en {host}:{port}")
+
+def read_stats(prefix: str) -> Dict[str, dict]:
+    with open(f"{prefix}_stats.csv", newline="") as f:
+        return {row["Name"]: row for row in csv.DictReader(f)}
+
+def run_stage(user_class: str, task: str, users: int, duration: int, host: str) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        prefix = os.path.join(tmp, "stage")
+        env = dict(os.environ, BENCH_TASK=task, LOG_MODE="off", LOG_SUMMARY_INTERVAL="0", RESULTS_DB="", HDR_OUTPUT_DIR="")
+        cpu_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+        start = time.perf_counter()
+        process = subprocess.run([
+            sys.executable, "-m", "locust", "-f", os.path.join(HERE, "locustfile_ceiling.py"),
+            "--headless", "-u", str(users), "-r", str(users), "-t", f"{duration}s",
+            "--host", host, "--csv", prefix, "--only-summary", "--loglevel", "WARNING", user_class
+        ], env=env, cwd=HERE, check=False, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+        wall = time.perf_counter() - start
+        if process.returncode not in (0, 1):
+            # Locust sale con 1 cuando hubo fallas; cualquier otro código es un error del propio harness
+            raise RuntimeError(f"Locust terminó con código {process.returncode}:\n{process.stderr[-2000:]}")
+        cpu_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+        stats = read_stats(prefix)
+
+    cpu = (cpu_after.ru_utime - cpu_before.ru_utime) + (cpu_after.ru_stime - cpu_before.ru_stime)
+    total = stats["Aggregated"]
+    requests_count = int(total["Request Count"])
+    failures = int(total["Failure Count"])
+    return {
+        "user_class": user_class,
+        "task": task,
+        "users": users,
+        "requests": requests_count,
+        "failures": failures,
+        "rps": float(total["Requests/s"]),
+        "cpu_seconds": round(cpu, 3),
+        "cpu_utilization": round(cpu / wall, 3),
+        # Incluye el CPU de arranque del proceso: con --duration >= 20 s su peso es marginal
+        "rps_per_core": round(requests_count / cpu, 1) if cpu else None,
+        "cpu_us_per_request": round(cpu / requests_count * 1e6, 1) if requests_count else None,
+        "p95_ms": float(total["95%"]) if total.get("95%") not in (None, "N/A") else None,
+        "endpoints": {name: float(row["Requests/s"]) for name, row in stats.items() if name != "Aggregated"},
+    }
+
+def summarize(stages: List[dict]) -> Dict[str, Dict[str, dict]]:
+    summary: Dict[str, Dict[str, dict]] = {}
+    for user_class, task in dict.fromkeys((stage["user_class"], stage["task"]) for stage in stages):
+        healthy = [s for s in stages if s["user_class"] == user_class and s["task"] == task and s["requests"]
+                   and s["failures"] / s["requests"] <= MAX_FAILURE_RATIO]
+        if not healthy:
+            continue
+        best = max(healthy, key=lambda s: s["rps"])
+        summary.setdefault(user_class, {})[task] = {
+            "max_rps": best["rps"], "users": best["users"],
+            "rps_per_core": best["rps_per_core"], "cpu_us_per_request": best["cpu_us_per_request"]
+        }
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description="Techo de requests/s por proceso worker de Locust")
+    parser.add_argument("--users", default="10,50,200")
+    parser.add_argument("--duration", type=int, default=20)
+    parser.add_argument("--tasks", default=ALL_TASKS)
+    parser.add_argument("--user-classes", default=DEFAULT_USER_CLASSES)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--null-processes", type=int, default=2)
+    parser.add_argument("--output-dir", default=os.path.join(HERE, "bench_results"))
+    args = parser.parse_args()
+
+    host = f"http://127.0.0.1:{args.port}"
+    backend = subprocess.Popen([sys.executable, os.path.join(HERE, "null_backend.py"), "--port", str(args.port),
+                                "--processes", str(args.null_processes)],
+                               stdout=subprocess.DEVNULL, start_new_session=True)
+    stages = []
+    try:
+        wait_for_port("127.0.0.1", args.port)
+        print(f"{'clase':>22} | {'tarea':>10} | {'users':>5} | {'req/s':>8} | {'req/s/core':>10} | "
+              f"{'µs CPU/req':>10} | {'fallas':>6}")
+        for user_class in args.user_classes.split(","):
+            for task in args.tasks.split(","):
+                for users in (int(u) for u in args.users.split(",")):
+                    stage = run_stage(user_class, task, users, args.duration, host)
+                    stages.append(stage)
+                    print(f"{user_class:>22} | {task:>10} | {users:>5} | {stage['rps']:>8.1f} | "
+                          f"{stage['rps_per_core'] or 0:>10.1f} | {stage['cpu_us_per_request'] or 0:>10.1f} | "
+                          f"{stage['failures']:>6}")
+    finally:
+        os.killpg(backend.pid, signal.SIGTERM)
+
+    version = "+".join(harness_version())
+    result = {"harness_version": version, "timestamp": int(time.time()), "duration_s": args.duration,
+              "summary": summarize(stages), "stages": stages}
+    os.makedirs(args.output_dir, exist_ok=True)
+    path = os.path.join(args.output_dir, f"harness-{version}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2, ensure_ascii=False)
+    print(f"✅ Resultados guardados en {path}")
+
+if __name__ == "__main__":
+    main()
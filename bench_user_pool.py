@@ -0,0 +1,46 @@
+"""
+Micro-benchmark de UserPool.get_random_cvu.
+Verifica que el costo de muestreo se mantenga plano entre 1k y 1M CVUs
+para cada distribución de payees.
+
+Uso: python bench_user_pool.py [--sizes 1000,10000,100000,1000000] [--samples 200000]
+                               [--distributions uniform,zipf,hotset]
+"""
+import argparse
+import logging
+import time
+
+from user_pool import (PAYEE_HOT_SET_FRACTION, PAYEE_HOT_SET_SIZE, PAYEE_ZIPF_EXPONENT, HotSetPayees,
+                       UniformPayees, UserPool, ZipfPayees)
+
+DISTRIBUTIONS = {
+    "uniform": UniformPayees,
+    "zipf": lambda: ZipfPayees(PAYEE_ZIPF_EXPONENT),
+    "hotset": lambda: HotSetPayees(PAYEE_HOT_SET_SIZE, PAYEE_HOT_SET_FRACTION),
+}
+
+def bench_size(size: int, samples: int, distribution: str) -> float:
+    pool = UserPool(distribution=DISTRIBUTIONS[distribution]())
+    pool.merge_cvus(range(10000000000, 10000000000 + size))
+    payers = pool.snapshot()[:1024]
+    mask = len(payers) - 1
+    start = time.perf_counter()
+    for i in range(samples):
+        pool.get_random_cvu(payers[i & mask])
+    return (time.perf_counter() - start) / samples * 1e9
+
+def main():
+    parser = argparse.ArgumentParser(description="Costo de muestreo de payees por tamaño de pool")
+    parser.add_argument("--sizes", default="1000,10000,100000,1000000")
+    parser.add_argument("--samples", type=int, default=200000)
+    parser.add_argument("--distributions", default="uniform,zipf,hotset")
+    args = parser.parse_args()
+    logging.getLogger('wallet_test').setLevel(logging.WARNING)
+
+    distributions = args.distributions.split(",")
+    print(f"{'CVUs':>10} | " + " | ".join(f"{d + ' ns':>10}" for d in distributions))
+    for size in (int(s) for s in args.sizes.split(",")):
+        print(f"{size:>10} | " + " | ".join(f"{bench_size(size, args.samples, d):>10.0f}" for d in distributions))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Benchmark de memoria por usuario simulado.
+
+Mide con tracemalloc los bytes por usuario de:
+  legacy   estado en atributos de instancia (como antes de user_state.py)
+  compact  estado en UserStateStore, el objeto solo guarda el slot
+  full     WalletUser + WalletUserFlow reales con estado compacto (sesión HTTP incluida);
+           con --greenlets además un greenlet ocioso por usuario, como un usuario en wait_time
+
+Uso: python bench_user_state.py [--users 10000,100000] [--layouts legacy,compact,full] [--greenlets]
+     CONNECTION_MODE=shared python bench_user_state.py --layouts full --users 5000
+"""
+import argparse
+import gc
+import logging
+import tracemalloc
+import uuid
+from typing import Callable, List
+
+import gevent
+
+from provisioning import USER_DAY_OF_BIRTH, USER_LASTNAME, USER_NAME, USER_PASSWORD
+from user_state import UserStateStore
+
+class _LegacyState:
+    def __init__(self, email: str, token: str, cvu: int, balance: float):
+        self.user_email = email
+        self.user_password = USER_PASSWORD
+        self.user_name = USER_NAME
+        self.user_lastname = USER_LASTNAME
+        self.user_day_of_birth = USER_DAY_OF_BIRTH
+        self.auth_token = token
+        self.cvu = cvu
+        self.balance = balance
+
+class _CompactState:
+    def __init__(self, store: UserStateStore, email: str, token: str, cvu: int, balance: float):
+        self._slot = store.allocate(email)
+        store.tokens[self._slot] = token
+        store.cvus[self._slot] = cvu
+        store.balances[self._slot] = balance
+
+def _identity(i: int):
+    """Email, token, CVU y saldo distintos por usuario, como los que llegan del backend."""
+    email = f"loadtest_{uuid.uuid4().hex[:12]}@example.com"
+    token = "eyJhbGciOiJIUzI1NiJ9." + uuid.uuid4().hex * 3 + "." + uuid.uuid4().hex
+    return email, token, 10000000000 + i, 1000.0 + i
+
+def build_legacy(users: int) -> list:
+    return [_LegacyState(*_identity(i)) for i in range(users)]
+
+def build_compact(users: int) -> list:
+    store = UserStateStore()
+    return [store] + [_CompactState(store, *_identity(i)) for i in range(users)]
+
+def build_full(users: int, greenlets: bool) -> list:
+    from locust.env import Environment
+    from locustfile import WalletUser, WalletUserFlow, user_states
+
+    environment = Environment(user_classes=[WalletUser], host=WalletUser.host)
+    built: List = []
+    for i in range(users):
+        user = WalletUser(environment)
+        flow = WalletUserFlow(user)
+        email, token, cvu, balance = _identity(i)
+        flow._slot = user_states.allocate(email)
+        flow.auth_token, flow.cvu, flow.balance = token, cvu, balance
+        built.append((user, flow))
+    if greenlets:
+        built.extend(gevent.spawn(gevent.sleep, 3600) for _ in range(users))
+        gevent.sleep(0)
+    return built
+
+def measure(users: int, build: Callable[[int], list]) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    built = build(users)
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gevent.killall([item for item in built if isinstance(item, gevent.Greenlet)])
+    return (after - before) / users
+
+def main():
+    parser = argparse.ArgumentParser(description="Bytes por usuario simulado según la representación del estado")
+    parser.add_argument("--users", default="10000,100000")
+    parser.add_argument("--layouts", default="legacy,compact,full")
+    parser.add_argument("--greenlets", action="store_true", help="Un greenlet ocioso por usuario en el layout full")
+    args = parser.parse_args()
+    logging.getLogger('wallet_test').setLevel(logging.WARNING)
+
+    builders = {
+        "legacy": build_legacy,
+        "compact": build_compact,
+        "full": lambda users: build_full(users, args.greenlets),
+    }
+    layouts = args.layouts.split(",")
+    if "full" in layouts:
+        import locustfile  # noqa: F401  (el import no cuenta como memoria por usuario)
+    print(f"{'usuarios':>10} | " + " | ".join(f"{layout + ' B/u':>12}" for layout in layouts))
+    for users in (int(u) for u in args.users.split(",")):
+        print(f"{users:>10} | " + " | ".join(f"{measure(users, builders[layout]):>12.0f}" for layout in layouts))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,251 @@
+"""
+Búsqueda de capacidad: la carga más alta que todavía cumple los SLO por endpoint.
+
+Se usa como forma de carga de load_shapes.py (LOAD_SHAPE=capacity). Corre etapas
+cortas a un nivel fijo (--capacity-warmup s de calentamiento y --capacity-stage s
+medidos) y elige el nivel siguiente según si la etapa cumplió los SLO. El calentamiento
+empieza cuando el runner llega a los usuarios de la etapa, no al cambiar de nivel: con
+saltos grandes la rampa sola dura más que el calentamiento.
+
+  --capacity-search adaptive  duplica el nivel desde --capacity-min hasta la primera etapa que
+                              falla y después biseca entre el último nivel que pasó y ese (default)
+  --capacity-search binary    biseca desde el principio entre --capacity-min y --capacity-max
+
+El nivel es la cantidad de usuarios (--capacity-mode users) o, con open_model.py, el
+multiplicador de OPEN_MODEL_RATES (--capacity-mode rate, con --capacity-users usuarios
+fijos que aportan identidades). La búsqueda termina cuando el intervalo es menor que
+--capacity-resolution (relativo al nivel) y el resultado es el knee: el nivel más alto que
+pasó. La curva throughput/latencia de todas las etapas se loguea y se guarda en
+capacity_results/capacity-<timestamp>.json.
+
+SLO por defecto --capacity-p99 ms y --capacity-error-rate para todos los endpoints; se
+ajustan por endpoint con --capacity-slos y un JSON como
+  {"default": {"p99": 500}, "📊 Transaction History": {"p99": 1500, "error_rate": 0.02}}
+
+Uso: LOAD_SHAPE=capacity locust -f locustfile.py,load_shapes.py --headless --capacity-max 2000 StressWalletUser
+"""
+import json
+import logging
+import os
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+from locust import LoadTestShape, events
+from locust.stats import calculate_response_time_percentile, diff_response_time_dicts
+
+from journey import JOURNEY_TYPE
+from results_store import tolerance_for
+
+CAPACITY_OUTPUT_DIR = os.getenv("CAPACITY_OUTPUT_DIR", "capacity_results")
+
+logger = logging.getLogger("wallet_test")
+
+@events.init_command_line_parser.add_listener
+def add_capacity_arguments(parser):
+    group = parser.add_argument_group("Capacity search", "Parámetros de LOAD_SHAPE=capacity (capacity_search.py)")
+    group.add_argument("--capacity-mode", choices=("users", "rate"), default="users", env_var="LOCUST_CAPACITY_MODE")
+    group.add_argument("--capacity-search", choices=("adaptive", "binary"), default="adaptive",
+                       env_var="LOCUST_CAPACITY_SEARCH")
+    group.add_argument("--capacity-min", type=float, default=10, env_var="LOCUST_CAPACITY_MIN",
+                       help="Nivel inicial: usuarios o multiplicador de OPEN_MODEL_RATES")
+    group.add_argument("--capacity-max", type=float, default=2000, env_var="LOCUST_CAPACITY_MAX")
+    group.add_argument("--capacity-resolution", type=float, default=0.05, env_var="LOCUST_CAPACITY_RESOLUTION",
+                       help="Ancho relativo del intervalo en el que se detiene la búsqueda")
+    group.add_argument("--capacity-warmup", type=float, default=10, env_var="LOCUST_CAPACITY_WARMUP")
+    group.add_argument("--capacity-stage", type=float, default=30, env_var="LOCUST_CAPACITY_STAGE",
+                       help="Segundos medidos por etapa")
+    group.add_argument("--capacity-spawn-rate", type=float, default=50, env_var="LOCUST_CAPACITY_SPAWN_RATE")
+    group.add_argument("--capacity-users", type=int, default=200, env_var="LOCUST_CAPACITY_USERS",
+                       help="Usuarios fijos en modo rate")
+    group.add_argument("--capacity-p99", type=float, default=500, env_var="LOCUST_CAPACITY_P99",
+                       help="SLO de p99 en ms para todos los endpoints")
+    group.add_argument("--capacity-error-rate", type=float, default=0.01, env_var="LOCUST_CAPACITY_ERROR_RATE")
+    group.add_argument("--capacity-slos", env_var="LOCUST_CAPACITY_SLOS", help="JSON de SLO por endpoint")
+    group.add_argument("--capacity-min-samples", type=int, default=20, env_var="LOCUST_CAPACITY_MIN_SAMPLES",
+                       help="Requests mínimos de un endpoint en la etapa para evaluar su p99")
+
+def load_slos(options) -> Dict[str, Dict[str, float]]:
+    slos = {"default": {"p99": options.capacity_p99, "error_rate": options.capacity_error_rate}}
+    if options.capacity_slos:
+        with open(options.capacity_slos) as f:
+            for endpoint, values in json.load(f).items():
+                slos.setdefault(endpoint, {}).update(values)
+    return slos
+
+@dataclass
+class StageResult:
+    level: float
+    requests: int
+    rps: float
+    error_rate: float
+    p50: Optional[float]
+    p99: Optional[float]
+    passed: bool
+    violations: List[str] = field(default_factory=list)
+
+def _snapshot(stats) -> Dict[Tuple[str, str], Tuple[int, int, dict]]:
+    return {key: (entry.num_requests, entry.num_failures, dict(entry.response_times))
+            for key, entry in stats.entries.items()}
+
+def evaluate_stage(stats, before: dict, level: float, seconds: float, slos: dict, min_samples: int) -> StageResult:
+    """Compara las stats actuales contra el snapshot del inicio de la medición."""
+    total_requests = total_failures = 0
+    total_times: Dict[int, int] = {}
+    violations = []
+    for (name, method), entry in stats.entries.items():
+        # Los journeys duran varios requests: no se comparan contra los SLO por request
+        if method == JOURNEY_TYPE:
+            continue
+        requests0, failures0, times0 = before.get((name, method), (0, 0, {}))
+        requests, failures = entry.num_requests - requests0, entry.num_failures - failures0
+        if requests <= 0:
+            continue
+        times = diff_response_time_dicts(entry.response_times, times0)
+        total_requests += requests
+        total_failures += failures
+        for ms, count in times.items():
+            total_times[ms] = total_times.get(ms, 0) + count
+        key = f"{method} {name}"
+        error_rate = failures / requests
+        max_errors = tolerance_for(slos, key, name, "error_rate")
+        if max_errors is not None and error_rate > max_errors:
+            violations.append(f"{key} error_rate {error_rate:.2%} > {max_errors:.2%}")
+        max_p99 = tolerance_for(slos, key, name, "p99")
+        # Con pocas muestras el p99 es el máximo: no alcanza para decidir
+        if max_p99 is not None and requests >= min_samples:
+            p99 = calculate_response_time_percentile(times, sum(times.values()), 0.99)
+            if p99 > max_p99:
+                violations.append(f"{key} p99 {p99}ms > {max_p99:g}ms")
+    measured = sum(total_times.values())
+    percentile = (lambda p: calculate_response_time_percentile(total_times, measured, p)) if measured else (lambda p: None)
+    return StageResult(level=level, requests=total_requests, rps=round(total_requests / seconds, 2),
+                       error_rate=round(total_failures / total_requests, 4) if total_requests else 0.0,
+                       p50=percentile(0.5), p99=percentile(0.99),
+                       passed=bool(total_requests) and not violations, violations=violations)
+
+class CapacitySearch:
+    """Elige el próximo nivel a partir del resultado de cada etapa."""
+
+    def __init__(self, strategy: str, low: float, high: float, resolution: float, integer: bool):
+        self.strategy = strategy
+        self.low, self.high = low, high
+        self.resolution = resolution
+        self.integer = integer
+        self.best: Optional[float] = None      # nivel más alto que pasó
+        self.failed: Optional[float] = None    # nivel más bajo que falló
+        self.growing = strategy == "adaptive"
+
+    def _round(self, level: float) -> float:
+        return float(max(round(level), 1)) if self.integer else round(level, 3)
+
+    def first(self) -> float:
+        return self._round(self.low)
+
+    def next(self, level: float, passed: bool) -> Optional[float]:
+        """Próximo nivel a medir, o None si la búsqueda terminó."""
+        if passed:
+            self.best = level if self.best is None else max(self.best, level)
+        else:
+            self.failed = level if self.failed is None else min(self.failed, level)
+        if self.best is None:
+            return None                     # ni el nivel mínimo cumple los SLO
+        if self.growing and passed:
+            return None if self.best >= self.high else self._round(min(self.best * 2, self.high))
+        self.growing = False
+        high = self.failed if self.failed is not None else self.high
+        if self.best >= high or high - self.best <= max(self.resolution * self.best, 1 if self.integer else 0):
+            return None
+        candidate = self._round((self.best + high) / 2)
+        return None if candidate in (self.best, high) else candidate
+
+class CapacitySearchShape(LoadTestShape):
+    abstract = True
+
+    def __init__(self):
+        super().__init__()
+        self.search: Optional[CapacitySearch] = None
+        self.level: Optional[float] = None
+        self.stage_started = 0.0
+        self.ramp_from = 0
+        self.settled: Optional[float] = None   # cuándo el runner llegó a los usuarios de la etapa
+        self.measure_started: Optional[float] = None
+        self.before: dict = {}
+        self.results: List[StageResult] = []
+
+    @property
+    def options(self):
+        return self.runner.environment.parsed_options
+
+    def _apply(self, level: float) -> None:
+        self.level = level
+        self.stage_started = self.get_run_time()
+        self.ramp_from = self.runner.user_count
+        self.settled = None
+        self.measure_started = None
+        if self.options.capacity_mode == "rate":
+            from open_model import set_rate_scale
+            set_rate_scale(self.runner.environment, level)
+
+    def tick(self) -> Optional[Tuple[int, float]]:
+        o, run_time = self.options, self.get_run_time()
+        if self.search is None:
+            self.search = CapacitySearch(o.capacity_search, o.capacity_min, o.capacity_max, o.capacity_resolution,
+                                         integer=o.capacity_mode == "users")
+            self.slos = load_slos(o)
+            self._apply(self.search.first())
+        users = self._users()
+        if self.settled is None:
+            # Si la rampa tarda mucho más de lo esperado (usuarios que cortan con StopUser), se mide igual
+            ramp = abs(users - self.ramp_from) / o.capacity_spawn_rate
+            if self.runner.user_count == users:
+                self.settled = run_time
+            elif run_time - self.stage_started >= ramp + o.capacity_warmup:
+                logger.warning("⚠️ Etapa nivel %g: %d de %d usuarios tras %.0fs de rampa, se mide igual",
+                               self.level, self.runner.user_count, users, run_time - self.stage_started)
+                self.settled = run_time
+        elif self.measure_started is None and run_time - self.settled >= o.capacity_warmup:
+            self.measure_started = run_time
+            self.before = _snapshot(self.runner.stats)
+        elif self.measure_started is not None and run_time - self.measure_started >= o.capacity_stage:
+            result = evaluate_stage(self.runner.stats, self.before, self.level, run_time - self.measure_started,
+                                    self.slos, o.capacity_min_samples)
+            self.results.append(result)
+            _log_stage(result)
+            level = self.search.next(self.level, result.passed)
+            if level is None:
+                report_capacity(self.results, self.search.best, self.slos, o)
+                return None
+            self._apply(level)
+            users = self._users()
+        return users, o.capacity_spawn_rate
+
+    def _users(self) -> int:
+        o = self.options
+        return int(self.level if o.capacity_mode == "users" else o.capacity_users)
+
+def _log_stage(result: StageResult) -> None:
+    mark = "✅" if result.passed else "❌"
+    logger.info("%s Etapa nivel %g: %.1f req/s, p50 %sms, p99 %sms, errores %.2f%% %s", mark, result.level, result.rps,
+                result.p50, result.p99, result.error_rate * 100, "; ".join(result.violations))
+
+def report_capacity(results: List[StageResult], knee: Optional[float], slos: dict, options) -> Optional[str]:
+    curve = sorted(results, key=lambda r: r.level)
+    lines = [f"{'nivel':>8} | {'req/s':>8} | {'p50':>6} | {'p99':>6} | {'err %':>6} | SLO"]
+    lines += [f"{r.level:>8g} | {r.rps:>8.1f} | {r.p50 or 0:>6} | {r.p99 or 0:>6} | {r.error_rate * 100:>6.2f} | "
+              f"{'ok' if r.passed else 'falla'}" for r in curve]
+    if knee is None:
+        logger.error("❌ Ninguna etapa cumplió los SLO (nivel mínimo %g)\n%s", options.capacity_min, "\n".join(lines))
+    else:
+        knee_rps = max(r.rps for r in results if r.level == knee and r.passed)
+        unit = "usuarios" if options.capacity_mode == "users" else "x OPEN_MODEL_RATES"
+        logger.info("🏁 Knee: %g %s (%.1f req/s)\n%s", knee, unit, knee_rps, "\n".join(lines))
+    if not CAPACITY_OUTPUT_DIR:
+        return None
+    os.makedirs(CAPACITY_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(CAPACITY_OUTPUT_DIR, f"capacity-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump({"mode": options.capacity_mode, "search": options.capacity_search, "knee": knee, "slos": slos,
+                   "stages": [asdict(r) for r in results]}, f, indent=2, ensure_ascii=False)
+    logger.info("📈 Curva de capacidad guardada en %s", path)
+    return path
@@ -0,0 +1,134 @@
+"""
+Servicio de billetera externa simulado para pruebas de carga.
+
+Implementa los endpoints que consume ExternalWalletClient
+(validate-cvu, validate-balance y deposit) con latencia y fallas
+configurables, para medir el backend sin depender del servicio real.
+
+Uso: python external_wallet_stub.py --port 8090 --profile normal [--latency-ms 50 ...]
+
+Endpoints de control:
+  GET  /__stats    contadores por endpoint y resultado
+  POST /__profile  cambia el perfil en caliente ({"profile": "slow"} y/o campos sueltos)
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import uuid
+from collections import Counter
+from dataclasses import asdict, dataclass, fields, replace
+from typing import Dict, Optional, Tuple
+
+import async_http
+from async_http import STATUS_TEXT
+
+@dataclass
+class FaultProfile:
+    latency: str = "lognormal"    # constant | uniform | exponential | lognormal
+    latency_ms: float = 20.0      # media (o valor fijo) de la latencia
+    jitter_ms: float = 10.0       # dispersión: ancho de uniform / desvío de lognormal
+    error_rate: float = 0.0       # 500 Internal Server Error
+    not_found_rate: float = 0.0   # 404 CVU externo inexistente
+    bad_request_rate: float = 0.0  # 400 (fondos insuficientes / depósito inválido)
+    slow_rate: float = 0.0        # respuestas que tardan slow_ms adicionales
+    slow_ms: float = 2000.0
+    hang_rate: float = 0.0        # respuestas que no llegan nunca (el cliente corta por timeout)
+
+PROFILES: Dict[str, FaultProfile] = {
+    "fast": FaultProfile(latency="constant", latency_ms=1.0, jitter_ms=0.0),
+    "normal": FaultProfile(),
+    "slow": FaultProfile(latency_ms=250.0, jitter_ms=150.0, slow_rate=0.02),
+    "flaky": FaultProfile(error_rate=0.05, not_found_rate=0.01, bad_request_rate=0.01, slow_rate=0.05),
+    "degraded": FaultProfile(latency_ms=800.0, jitter_ms=600.0, error_rate=0.1, slow_rate=0.1, hang_rate=0.01),
+}
+
+class ExternalWalletStub:
+    def __init__(self, profile: FaultProfile):
+        self.profile = profile
+        self.stats: Counter = Counter()
+
+    def sample_latency(self) -> float:
+        p = self.profile
+        if p.latency == "constant":
+            ms = p.latency_ms
+        elif p.latency == "uniform":
+            ms = random.uniform(p.latency_ms - p.jitter_ms / 2, p.latency_ms + p.jitter_ms / 2)
+        elif p.latency == "exponential":
+            ms = random.expovariate(1.0 / p.latency_ms) if p.latency_ms > 0 else 0.0
+        else:
+            # Lognormal con media latency_ms y desvío jitter_ms
+            mean, std = max(p.latency_ms, 1e-3), max(p.jitter_ms, 1e-3)
+            sigma2 = math.log(1 + (std / mean) ** 2)
+            ms = random.lognormvariate(math.log(mean) - sigma2 / 2, sigma2 ** 0.5)
+        if random.random() < p.slow_rate:
+            ms += p.slow_ms
+        return max(ms, 0.0) / 1000.0
+
+    def pick_fault(self) -> Optional[int]:
+        p = self.profile
+        roll = random.random()
+        for status, rate in ((500, p.error_rate), (404, p.not_found_rate), (400, p.bad_request_rate)):
+            if roll < rate:
+                return status
+            roll -= rate
+        return None
+
+    def handle_wallet(self, endpoint: str, body: dict) -> Tuple[int, dict]:
+        if endpoint == "validate-cvu":
+            return 200, {"exists": True, "bankName": "Banco Simulado"}
+        if endpoint == "validate-balance":
+            return 200, {"cvu": body.get("cvu"), "exists": True, "balance": 1_000_000_000.0,
+                         "hasSufficientFunds": True}
+        return 200, {
+            "transactionId": uuid.uuid4().hex,
+            "destinationCvu": body.get("destinationCvu"),
+            "amount": body.get("amount"),
+            "currency": body.get("currency", "ARS"),
+            "status": "COMPLETED",
+            "message": None
+        }
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, dict]:
+        if path == "/__stats":
+            return 200, {"profile": asdict(self.profile), "counters": dict(self.stats)}
+        if path == "/__profile" and method == "POST":
+            changes = json.loads(body or b"{}")
+            base = PROFILES.get(changes.pop("profile", None), self.profile)
+            known = {f.name for f in fields(FaultProfile)}
+            self.profile = replace(base, **{k: v for k, v in changes.items() if k in known})
+            return 200, asdict(self.profile)
+
+        endpoint = path.rsplit("/", 1)[-1]
+        if method != "POST" or not path.startswith("/api/v1/wallet/") or \
+                endpoint not in ("validate-cvu", "validate-balance", "deposit"):
+            return 404, {"error": f"Unknown endpoint {method} {path}"}
+
+        await asyncio.sleep(self.sample_latency())
+        if random.random() < self.profile.hang_rate:
+            self.stats[f"{endpoint}:hang"] += 1
+            await asyncio.sleep(3600)
+        fault = self.pick_fault()
+        if fault:
+            self.stats[f"{endpoint}:{fault}"] += 1
+            return fault, {"error": STATUS_TEXT[fault]}
+        self.stats[f"{endpoint}:200"] += 1
+        return self.handle_wallet(endpoint, json.loads(body or b"{}"))
+
+def main():
+    parser = argparse.ArgumentParser(description="Servicio de billetera externa simulado")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--profile", choices=sorted(PROFILES), default="normal")
+    for f in fields(FaultProfile):
+        parser.add_argument(f"--{f.name.replace('_', '-')}", type=type(f.default), default=None)
+    args = parser.parse_args()
+
+    overrides = {f.name: getattr(args, f.name) for f in fields(FaultProfile) if getattr(args, f.name) is not None}
+    stub = ExternalWalletStub(replace(PROFILES[args.profile], **overrides))
+    print(f"🏦 Billetera externa simulada en http://{args.host}:{args.port} - perfil {asdict(stub.profile)}", flush=True)
+    async_http.run(lambda: stub.dispatch, args.host, args.port)
+
+if __name__ == "__main__":
+    main()
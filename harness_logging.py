@@ -0,0 +1,126 @@
+"""
+Logging de bajo costo para el harness de carga.
+
+Los registros se encolan sin formatear y un hilo nativo (fuera del loop de
+gevent) los formatea y escribe en los handlers raíz que configura Locust (consola o
+--logfile, con el formato y el nivel de --loglevel); sin handlers raíz (scripts sueltos,
+--skip-log-setup) los escribe en stderr. Al salir del proceso se vacía la cola. Los logs por request pasan por log_event,
+que cuenta cada tipo de evento y aplica el modo configurado:
+
+  LOG_MODE=full     escribe todos los eventos (default)
+  LOG_MODE=sampled  escribe una fracción LOG_SAMPLE_RATE de los eventos
+  LOG_MODE=off      no escribe eventos por request, solo cuenta
+
+Los errores se escriben siempre salvo en modo off.
+"""
+import atexit
+import logging
+import os
+import random
+import sys
+from collections import Counter
+from typing import Dict, List, Tuple
+
+try:
+    from gevent import monkey
+    _start_native_thread = monkey.get_original("_thread", "start_new_thread")
+    _NativeQueue = monkey.get_original("queue", "SimpleQueue")
+    _allocate_native_lock = monkey.get_original("_thread", "allocate_lock")
+except ImportError:
+    from _thread import allocate_lock as _allocate_native_lock, start_new_thread as _start_native_thread
+    from queue import SimpleQueue as _NativeQueue
+
+LOG_MODE = os.getenv("LOG_MODE", "full")
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.01"))
+LOG_FORMAT = '%(asctime)s - %(levelname)s - %(message)s'
+# Espera máxima al salir para que el hilo de escritura vacíe la cola
+LOG_DRAIN_TIMEOUT = 10.0
+
+_STOP = object()
+# (cola, lock que el hilo de escritura libera al terminar) de cada logger configurado
+_writers: List[Tuple[object, object]] = []
+
+event_counts: Counter = Counter()
+
+class _EnqueueHandler(logging.Handler):
+    def __init__(self, queue):
+        super().__init__()
+        self.queue = queue
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.queue.put_nowait(record)
+
+def _write_record(record: logging.LogRecord, stream, formatter: logging.Formatter, pending: set) -> None:
+    handlers = logging.root.handlers
+    if not handlers:
+        stream.write(formatter.format(record) + "\n")
+        pending.add(stream)
+        return
+    if record.levelno < logging.root.level:
+        return
+    for handler in handlers:
+        if record.levelno < handler.level:
+            continue
+        if isinstance(handler, logging.StreamHandler):
+            # Directo al stream: flush() del handler tomaría su lock, que es de gevent
+            if handler.stream is not None:
+                handler.stream.write(handler.format(record) + handler.terminator)
+                pending.add(handler.stream)
+        else:
+            handler.emit(record)
+
+def _write_records(queue, stream, formatter: logging.Formatter, done) -> None:
+    pending = set()
+    while True:
+        record = queue.get()
+        if record is not _STOP:
+            try:
+                _write_record(record, stream, formatter, pending)
+            except Exception:
+                pass
+        # Vaciar los buffers solo cuando la cola queda vacía agrupa las escrituras
+        if record is _STOP or queue.empty():
+            for target in pending:
+                try:
+                    target.flush()
+                except Exception:
+                    pass
+            pending.clear()
+        if record is _STOP:
+            done.release()
+            return
+
+def flush_logs(timeout: float = LOG_DRAIN_TIMEOUT) -> None:
+    """Escribe lo que quedó en las colas y termina los hilos de escritura (se llama al salir)."""
+    while _writers:
+        queue, done = _writers.pop()
+        queue.put_nowait(_STOP)
+        done.acquire(timeout=timeout)
+
+def setup_logger(name: str = 'wallet_test', level: int = logging.INFO, stream=None) -> logging.Logger:
+    logger = logging.getLogger(name)
+    logger.setLevel(level)
+    # Sin propagar: el hilo de escritura ya manda cada registro a los handlers raíz, y
+    # propagarlo los haría formatear y escribir de nuevo dentro del loop de gevent
+    logger.propagate = False
+    if not any(isinstance(h, _EnqueueHandler) for h in logger.handlers):
+        queue, done = _NativeQueue(), _allocate_native_lock()
+        done.acquire()
+        logger.addHandler(_EnqueueHandler(queue))
+        if not _writers:
+            atexit.register(flush_logs)
+        _writers.append((queue, done))
+        _start_native_thread(_write_records, (queue, stream or sys.stderr, logging.Formatter(LOG_FORMAT), done))
+    return logger
+
+def log_event(logger: logging.Logger, event: str, msg: str, *args, level: int = logging.INFO) -> None:
+    """Cuenta el evento y lo loguea según LOG_MODE. msg usa formato % (se formatea en el hilo de escritura)."""
+    event_counts[event] += 1
+    if LOG_MODE == "off" or not logger.isEnabledFor(level):
+        return
+    if LOG_MODE == "sampled" and level < logging.ERROR and random.random() >= LOG_SAMPLE_RATE:
+        return
+    logger.log(level, msg, *args)
+
+def event_summary() -> Dict[str, int]:
+    return dict(event_counts)
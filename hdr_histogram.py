@@ -0,0 +1,140 @@
+"""
+Histograma de latencias de alto rango dinámico (estilo HdrHistogram), en Python puro.
+
+Buckets log-lineales sobre microsegundos: valores < 2048 µs son exactos y el resto
+tiene 1024 sub-buckets por potencia de 2 (error relativo <= 0.1%). Los conteos son
+enteros, así que sumar histogramas de distintos workers no pierde información.
+La codificación es dispersa (índice delta + conteo en varints) y comprimida con zlib.
+"""
+import base64
+import math
+import zlib
+from collections import Counter
+from typing import Dict, Iterable, List, Tuple
+
+SUB_BUCKETS = 2048
+HALF_SUB_BUCKETS = SUB_BUCKETS // 2
+SUB_BUCKET_BITS = SUB_BUCKETS.bit_length() - 1
+
+def bucket_index(value_us: int) -> int:
+    if value_us < SUB_BUCKETS:
+        return max(value_us, 0)
+    shift = value_us.bit_length() - SUB_BUCKET_BITS
+    return SUB_BUCKETS + (shift - 1) * HALF_SUB_BUCKETS + (value_us >> shift) - HALF_SUB_BUCKETS
+
+def bucket_range(index: int) -> Tuple[int, int]:
+    """Rango [min, max] de microsegundos que cae en el bucket."""
+    if index < SUB_BUCKETS:
+        return index, index
+    shift = (index - SUB_BUCKETS) // HALF_SUB_BUCKETS + 1
+    mantissa = (index - SUB_BUCKETS) % HALF_SUB_BUCKETS + HALF_SUB_BUCKETS
+    return mantissa << shift, ((mantissa + 1) << shift) - 1
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def _read_varints(data: bytes) -> Iterable[int]:
+    value = shift = 0
+    for byte in data:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+        else:
+            yield value
+            value = shift = 0
+
+class LatencyHistogram:
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.total = 0
+
+    def record(self, response_time_ms: float) -> None:
+        self.counts[bucket_index(int(response_time_ms * 1000))] += 1
+        self.total += 1
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        self.counts.update(other.counts)
+        self.total += other.total
+
+    def value_at_percentile(self, percentile: float) -> float:
+        """Latencia en ms del percentil pedido (cota superior del bucket, como HdrHistogram)."""
+        if not self.total:
+            return 0.0
+        target = max(1, math.ceil(percentile / 100 * self.total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= target:
+                return bucket_range(index)[1] / 1000
+        return bucket_range(max(self.counts))[1] / 1000
+
+    def percentile_distribution(self, ticks_per_half_distance: int = 5) -> List[Tuple[float, float, int]]:
+        """Filas (valor ms, percentil, conteo acumulado) con el mismo esquema de ticks que HdrHistogram."""
+        if not self.total:
+            return []
+        cumulative, seen = [], 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            cumulative.append((index, seen))
+        rows, percentile, position = [], 0.0, 0
+        while True:
+            target = max(1, math.ceil(percentile / 100 * self.total))
+            while cumulative[position][1] < target:
+                position += 1
+            index, count = cumulative[position]
+            rows.append((bucket_range(index)[1] / 1000, percentile, count))
+            if percentile >= 100.0:
+                return rows
+            if count >= self.total:
+                percentile = 100.0
+                continue
+            # Cada mitad de la distancia que falta al 100% se parte en ticks_per_half_distance pasos
+            halvings = int(math.log2(100.0 / (100.0 - percentile))) + 1
+            percentile = min(100.0, percentile + 100.0 / (2 ** halvings * ticks_per_half_distance))
+
+    def encode(self) -> bytes:
+        out = bytearray()
+        previous = 0
+        for index in sorted(self.counts):
+            _write_varint(out, index - previous)
+            _write_varint(out, self.counts[index])
+            previous = index
+        return zlib.compress(bytes(out))
+
+    @classmethod
+    def decode(cls, data: bytes) -> "LatencyHistogram":
+        histogram = cls()
+        values = iter(_read_varints(zlib.decompress(data)))
+        index = 0
+        for delta, count in zip(values, values):
+            index += delta
+            histogram.counts[index] += count
+            histogram.total += count
+        return histogram
+
+def encode_all(histograms: Dict[str, LatencyHistogram]) -> Dict[str, bytes]:
+    return {name: h.encode() for name, h in histograms.items() if h.total}
+
+def merge_encoded(histograms: Dict[str, LatencyHistogram], encoded: Dict[str, bytes]) -> None:
+    for name, data in encoded.items():
+        histograms.setdefault(name, LatencyHistogram()).merge(LatencyHistogram.decode(data))
+
+SUMMARY_PERCENTILES = (50, 75, 90, 95, 99, 99.5, 99.9, 99.99, 100)
+
+def write_report(path: str, histograms: Dict[str, LatencyHistogram]) -> None:
+    """Distribución completa por endpoint en texto (diffeable) más el histograma codificado para re-mezclar."""
+    with open(path, "w", encoding="utf-8") as f:
+        for name in sorted(histograms):
+            h = histograms[name]
+            if not h.total:
+                continue
+            f.write(f"### {name}\n")
+            f.write(f"# total={h.total} " + " ".join(
+                f"p{p}={h.value_at_percentile(p):.3f}ms" for p in SUMMARY_PERCENTILES) + "\n")
+            f.write(f"{'Value(ms)':>12} {'Percentile':>14} {'TotalCount':>10}\n")
+            for value, percentile, count in h.percentile_distribution():
+                f.write(f"{value:>12.3f} {percentile / 100:>14.12f} {count:>10}\n")
+            f.write(f"#encoded: {base64.b64encode(h.encode()).decode()}\n\n")
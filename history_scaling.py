@@ -0,0 +1,146 @@
+"""
+Escenario de crecimiento del historial de transacciones.
+
+Crea un par de billeteras, las hace crecer con transferencias P2P de ida y vuelta
+hasta cada tamaño objetivo (por defecto 10, 1k, 10k y 100k transacciones) y en
+cada punto mide GET /api/v1/transaction/{cvu}/history: latencia, TTFB, bytes de
+respuesta y tiempo de parseo en el cliente según el modo de validación.
+
+Modos de validación (también usados por locustfile.py con HISTORY_VALIDATION):
+  full   json.loads de la lista completa
+  count  cuenta entradas escaneando los bytes, sin construir objetos
+  size   solo verifica que el cuerpo sea una lista JSON y mide su tamaño
+
+Uso: python history_scaling.py --host http://localhost:8080 [--sizes 10,1000,10000,100000] [-o history.json]
+"""
+import argparse
+import json
+import math
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import requests
+
+from provisioning import ProvisionedUser, provision_user
+
+VALIDATION_MODES = ("full", "count", "size")
+TRANSFER_AMOUNT = 0.01
+
+def validate_history(body: bytes, mode: str) -> Optional[int]:
+    """Valida el cuerpo del historial y devuelve la cantidad de transacciones (None en modo size)."""
+    if mode == "full":
+        data = json.loads(body)
+        if not isinstance(data, list):
+            raise ValueError("El historial no es una lista")
+        return len(data)
+    body = body.strip()
+    if not (body.startswith(b"[") and body.endswith(b"]")):
+        raise ValueError("El historial no es una lista JSON")
+    if mode == "count":
+        return body.count(b'"transactionId"')
+    return None
+
+def grow(host: str, a: ProvisionedUser, b: ProvisionedUser, transfers: int, concurrency: int, timeout: float) -> int:
+    """Hace transfers transferencias exitosas alternando el sentido a->b / b->a."""
+    def worker(offset: int) -> int:
+        session, done, attempts = requests.Session(), 0, 0
+        while done < transfers // concurrency + (1 if offset < transfers % concurrency else 0):
+            payer, payee = (a, b) if (offset + attempts) % 2 == 0 else (b, a)
+            attempts += 1
+            response = session.post(f"{host}/api/v1/transaction/transfer", json={
+                "payerCvu": payer.cvu, "payeeCvu": payee.cvu, "amount": TRANSFER_AMOUNT, "currency": "ARS"
+            }, headers={"Authorization": f"Bearer {payer.token}"}, timeout=timeout)
+            if response.status_code in [200, 201]:
+                done += 1
+            elif attempts > 10 * transfers:
+                break
+        return done
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return sum(pool.map(worker, range(concurrency)))
+
+def measure(host: str, user: ProvisionedUser, samples: int, timeout: float) -> dict:
+    session = requests.Session()
+    url = f"{host}/api/v1/transaction/{user.cvu}/history"
+    headers = {"Authorization": f"Bearer {user.token}"}
+    latency, ttfb, parse = [], [], {mode: [] for mode in VALIDATION_MODES}
+    size, count = 0, 0
+    for _ in range(samples):
+        start = time.perf_counter()
+        response = session.get(url, headers=headers, timeout=timeout, stream=True)
+        ttfb.append((time.perf_counter() - start) * 1000)
+        body = response.content
+        latency.append((time.perf_counter() - start) * 1000)
+        response.raise_for_status()
+        size = len(body)
+        for mode in VALIDATION_MODES:
+            parse_start = time.perf_counter()
+            result = validate_history(body, mode)
+            parse[mode].append((time.perf_counter() - parse_start) * 1000)
+            if mode == "full":
+                count = result
+    return {
+        "transactions": count,
+        "bytes": size,
+        "latency_p50_ms": round(statistics.median(latency), 2),
+        "latency_p95_ms": round(percentile(latency, 95), 2),
+        "ttfb_p50_ms": round(statistics.median(ttfb), 2),
+        "parse_p50_ms": {mode: round(statistics.median(values), 3) for mode, values in parse.items()},
+    }
+
+def percentile(values: List[float], p: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, math.ceil(p / 100 * len(ordered)) - 1)]
+
+def scaling_exponents(points: List[dict], metric: str) -> List[Optional[float]]:
+    """Exponente log-log entre tamaños consecutivos: ~1 es lineal, ~0 constante."""
+    exponents = []
+    for prev, cur in zip(points, points[1:]):
+        x0, x1, y0, y1 = prev["transactions"], cur["transactions"], prev[metric], cur[metric]
+        exponents.append(round(math.log(y1 / y0) / math.log(x1 / x0), 2) if min(x0, x1, y0, y1) > 0 and x1 != x0 else None)
+    return exponents
+
+def main():
+    parser = argparse.ArgumentParser(description="Latencia y tamaño del historial según su largo")
+    parser.add_argument("--host", default="http://localhost:8080")
+    parser.add_argument("--sizes", default="10,1000,10000,100000")
+    parser.add_argument("--samples", type=int, default=20)
+    parser.add_argument("-c", "--concurrency", type=int, default=16)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("-o", "--output")
+    args = parser.parse_args()
+    host = args.host.rstrip("/")
+
+    run_id = int(time.time())
+    a = provision_user(host, f"history{run_id}_a@example.com", args.timeout)
+    b = provision_user(host, f"history{run_id}_b@example.com", args.timeout)
+    if not a or not b:
+        raise SystemExit("❌ No se pudieron aprovisionar las billeteras del escenario")
+
+    # Cada billetera arranca con su depósito inicial; cada P2P aparece en ambos historiales
+    current, points = 1, []
+    print(f"{'txns':>8} | {'bytes':>11} | {'p50 ms':>8} | {'p95 ms':>8} | {'TTFB ms':>8} | "
+          f"{'full ms':>8} | {'count ms':>8} | {'size ms':>8}")
+    for target in (int(s) for s in args.sizes.split(",")):
+        if target > current:
+            current += grow(host, a, b, target - current, args.concurrency, args.timeout)
+        point = measure(host, a, args.samples, args.timeout)
+        points.append(point)
+        parse = point["parse_p50_ms"]
+        print(f"{point['transactions']:>8} | {point['bytes']:>11} | {point['latency_p50_ms']:>8} | "
+              f"{point['latency_p95_ms']:>8} | {point['ttfb_p50_ms']:>8} | {parse['full']:>8} | "
+              f"{parse['count']:>8} | {parse['size']:>8}")
+
+    scaling: Dict[str, List[Optional[float]]] = {
+        metric: scaling_exponents(points, metric) for metric in ("bytes", "latency_p50_ms", "ttfb_p50_ms")
+    }
+    print(f"📈 Exponentes de escala entre tamaños: {scaling}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"points": points, "scaling": scaling}, f, indent=2)
+        print(f"✅ Resultados guardados en {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Escenario de contención sobre billeteras calientes en el camino de transferencias P2P.
+
+Muchos usuarios concurrentes concentran transferencias y retiros sobre unas pocas
+billeteras "calientes" (destinatarios de sueldos, comercios):
+
+  🔥 Hot P2P In       usuario -> billetera caliente
+  🔥 Hot P2P Out      billetera caliente -> usuario
+  🔥 Hot Withdrawal   billetera caliente -> billetera externa
+
+Cada request lleva en el nombre la concurrencia por billetera caliente
+("[8/wallet]" = entre 8 y 15 usuarios activos por billetera, en potencias de 2),
+así las stats muestran throughput, latencia y fallas a medida que crece la
+concurrencia (combinar con LOAD_SHAPE=step o ramp de load_shapes.py).
+
+Al terminar se concilia con una sola llamada a /api/v1/wallet/all: saldo esperado
+(snapshot inicial + efectos confirmados por el API) contra saldo real. Una
+diferencia sin requests ambiguos (5xx, timeouts) es un lost update.
+
+  HOT_WALLETS          cantidad de billeteras calientes (default 4)
+  HOT_WALLETS_FILE     fixture de provisioning.py a usar en vez de registrar billeteras nuevas
+  HOT_WALLET_SEED      depósito extra por billetera caliente al arrancar (default 100000)
+
+Uso: locust -f hot_wallets.py,load_shapes.py --headless HotWalletUser
+"""
+import logging
+import os
+import random
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+import gevent
+import requests
+from locust import between, events
+from locust.runners import MasterRunner, WorkerRunner
+
+from harness_logging import log_event
+from locustfile import WalletHttpUser, WalletUserFlow, generate_external_reference, logger
+from provisioning import EXTERNAL_CVU, ProvisionedUser, deposit, load_fixture, provision_user
+
+HOT_WALLETS = int(os.getenv("HOT_WALLETS", "4"))
+HOT_WALLETS_FILE = os.getenv("HOT_WALLETS_FILE")
+HOT_WALLET_SEED = float(os.getenv("HOT_WALLET_SEED", "100000"))
+HOT_LEVEL_INTERVAL = 1.0
+MSG_HOT_WALLETS = "hot_wallets"
+MSG_HOT_LEVEL = "hot_wallets_level"
+
+hot_wallets: List[ProvisionedUser] = []
+hot_level = 1
+# Efecto esperado sobre cada billetera caliente según las respuestas exitosas del API
+hot_ledger: Counter = Counter()
+hot_ops: Counter = Counter()
+# Requests sin respuesta definitiva (5xx, timeouts): pueden o no haberse aplicado
+hot_ambiguous: Counter = Counter()
+_baseline: Dict[int, float] = {}
+_level_greenlet: Optional[gevent.Greenlet] = None
+
+def concurrency_level(user_count: int) -> int:
+    """Usuarios por billetera caliente redondeado a la potencia de 2 inferior."""
+    per_wallet = max(user_count // max(len(hot_wallets), 1), 1)
+    return 1 << (per_wallet.bit_length() - 1)
+
+def fetch_all_balances(host: str) -> Tuple[Dict[int, float], float]:
+    start = time.perf_counter()
+    response = requests.get(f"{host}/api/v1/wallet/all", timeout=60)
+    response.raise_for_status()
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return {int(w["cvu"]): float(w["balance"]) for w in response.json()["wallets"]}, elapsed_ms
+
+def _provision_hot_wallets(host: str) -> List[ProvisionedUser]:
+    if HOT_WALLETS_FILE:
+        wallets = load_fixture(HOT_WALLETS_FILE)[:HOT_WALLETS]
+    else:
+        run_id = int(time.time())
+        wallets = [w for w in (provision_user(host, f"hot{run_id}_{i}@example.com", 30)
+                               for i in range(HOT_WALLETS)) if w]
+    for wallet in wallets:
+        if HOT_WALLET_SEED > 0 and not deposit(host, wallet.cvu, wallet.token, HOT_WALLET_SEED, 30):
+            raise RuntimeError(f"No se pudo fondear la billetera caliente {wallet.cvu}")
+    if not wallets:
+        raise RuntimeError("No hay billeteras calientes disponibles")
+    return wallets
+
+def _set_hot_wallets(wallets: List[ProvisionedUser]) -> None:
+    hot_wallets[:] = wallets
+    hot_ledger.clear()
+    hot_ops.clear()
+    hot_ambiguous.clear()
+
+def _worker_on_hot_wallets(environment, msg, **kwargs):
+    _set_hot_wallets([ProvisionedUser(*w) for w in msg.data])
+
+def _worker_on_level(environment, msg, **kwargs):
+    global hot_level
+    hot_level = msg.data
+
+def _drain_ledger() -> list:
+    drained = [list(hot_ledger.items()), list(hot_ops.items()), list(hot_ambiguous.items())]
+    hot_ledger.clear()
+    hot_ops.clear()
+    hot_ambiguous.clear()
+    return drained
+
+def _publish_level_loop(runner):
+    global hot_level
+    while True:
+        level = concurrency_level(runner.user_count)
+        if level != hot_level:
+            hot_level = level
+            if isinstance(runner, MasterRunner):
+                runner.send_message(MSG_HOT_LEVEL, level)
+        gevent.sleep(HOT_LEVEL_INTERVAL)
+
+@events.init.add_listener
+def setup_hot_wallets(environment, **kwargs):
+    runner = environment.runner
+    if isinstance(runner, WorkerRunner):
+        runner.register_message(MSG_HOT_WALLETS, _worker_on_hot_wallets)
+        runner.register_message(MSG_HOT_LEVEL, _worker_on_level)
+
+@events.test_start.add_listener
+def start_hot_wallets(environment, **kwargs):
+    global _level_greenlet
+    runner = environment.runner
+    if isinstance(runner, WorkerRunner):
+        return
+    host = environment.host or HotWalletUser.host
+    wallets = _provision_hot_wallets(host)
+    _set_hot_wallets(wallets)
+    balances, _ = fetch_all_balances(host)
+    _baseline.clear()
+    _baseline.update({w.cvu: balances.get(w.cvu, 0.0) for w in wallets})
+    if isinstance(runner, MasterRunner):
+        # Llega a los workers antes que el mensaje de spawn
+        runner.send_message(MSG_HOT_WALLETS, [tuple(w) for w in wallets])
+    _level_greenlet = gevent.spawn(_publish_level_loop, runner)
+    logger.info("🔥 %s billeteras calientes: %s", len(wallets), ", ".join(str(w.cvu) for w in wallets))
+
+@events.report_to_master.add_listener
+def send_hot_ledger(client_id, data, **kwargs):
+    data["hot_ledger"] = _drain_ledger()
+
+@events.worker_report.add_listener
+def merge_hot_ledger(client_id, data, **kwargs):
+    ledger, ops, ambiguous = data.get("hot_ledger", ([], [], []))
+    hot_ledger.update(dict(ledger))
+    hot_ops.update(dict(ops))
+    hot_ambiguous.update(dict(ambiguous))
+
+def reconcile(environment) -> None:
+    if _level_greenlet:
+        _level_greenlet.kill()
+    if not hot_wallets:
+        return
+    try:
+        balances, elapsed_ms = fetch_all_balances(environment.host or HotWalletUser.host)
+    except requests.RequestException as e:
+        logger.error("❌ No se pudo conciliar: /wallet/all falló: %s", e)
+        return
+    lost_updates = []
+    for wallet in hot_wallets:
+        expected = _baseline[wallet.cvu] + hot_ledger[wallet.cvu]
+        actual = balances.get(wallet.cvu, 0.0)
+        # El backend guarda saldos en Float de 32 bits: cada escritura puede redondear medio ulp
+        tolerance = 0.01 + 2 * hot_ops[wallet.cvu] * max(abs(expected), abs(actual)) * 2 ** -24
+        diff = actual - expected
+        if abs(diff) <= tolerance:
+            log_event(logger, "hot_reconciled", "✅ Billetera %s conciliada: $%.2f (%s operaciones)",
+                      wallet.cvu, actual, hot_ops[wallet.cvu])
+        elif hot_ambiguous[wallet.cvu]:
+            log_event(logger, "hot_inconclusive", "⚠️ Billetera %s: esperado $%.2f, real $%.2f (dif %.2f) "
+                      "con %s requests ambiguos", wallet.cvu, expected, actual, diff, hot_ambiguous[wallet.cvu],
+                      level=logging.WARNING)
+        else:
+            lost_updates.append(wallet.cvu)
+            log_event(logger, "hot_lost_update", "❌ Lost update en billetera %s: esperado $%.2f, real $%.2f "
+                      "(dif %.2f en %s operaciones)", wallet.cvu, expected, actual, diff, hot_ops[wallet.cvu],
+                      level=logging.ERROR)
+    environment.events.request.fire(
+        request_type="RECONCILE", name="🔥 Hot wallet reconciliation", response_time=elapsed_ms,
+        response_length=len(balances), context={},
+        exception=Exception(f"Lost updates en {lost_updates}") if lost_updates else None)
+    hot_wallets.clear()
+
+@events.test_stop.add_listener
+def reconcile_local_run(environment, **kwargs):
+    if not isinstance(environment.runner, (MasterRunner, WorkerRunner)):
+        reconcile(environment)
+
+@events.quitting.add_listener
+def reconcile_distributed_run(environment, **kwargs):
+    # En master/worker el último ledger de cada worker llega con su reporte final al salir,
+    # después del test_stop del master
+    if isinstance(environment.runner, MasterRunner):
+        reconcile(environment)
+
+class HotWalletFlow(WalletUserFlow):
+    journeys = False
+
+    def on_start(self):
+        super().on_start()
+        if not self.cvu:
+            self.step_1_register_user()
+
+    def _hot_request(self, op: str, path: str, payload: dict, token: str, hot_cvu: int, delta: float) -> bool:
+        with self.client.post(path, json=payload, headers={"Authorization": f"Bearer {token}"},
+                              name=f"🔥 Hot {op} [{hot_level}/wallet]", catch_response=True) as response:
+            try:
+                completed = response.status_code in [200, 201] and response.json().get("status") == "COMPLETED"
+            except ValueError:
+                completed = False
+            if completed:
+                hot_ledger[hot_cvu] += delta
+                hot_ops[hot_cvu] += 1
+                response.success()
+                return True
+            if not 400 <= response.status_code < 500:
+                # Sin respuesta definitiva: el backend pudo haber aplicado la operación
+                hot_ambiguous[hot_cvu] += 1
+            response.failure(f"{op} falló ({response.status_code}): {response.text[:200]}")
+            return False
+
+    def transfer_to_hot(self):
+        if not self.cvu or not self.auth_token or self.balance <= 10.0 or not hot_wallets:
+            return
+        hot = random.choice(hot_wallets)
+        amount = round(random.uniform(1.0, 5.0), 2)
+        if self._hot_request("P2P In", "/api/v1/transaction/transfer", {
+            "payerCvu": self.cvu, "payeeCvu": hot.cvu, "amount": amount, "currency": "ARS"
+        }, self.auth_token, hot.cvu, amount):
+            self.balance -= amount
+
+    def transfer_from_hot(self):
+        if not self.cvu or not hot_wallets:
+            return
+        hot = random.choice(hot_wallets)
+        amount = round(random.uniform(1.0, 5.0), 2)
+        if self._hot_request("P2P Out", "/api/v1/transaction/transfer", {
+            "payerCvu": hot.cvu, "payeeCvu": self.cvu, "amount": amount, "currency": "ARS"
+        }, hot.token, hot.cvu, -amount):
+            self.balance += amount
+
+    def withdraw_from_hot(self):
+        if not hot_wallets:
+            return
+        hot = random.choice(hot_wallets)
+        amount = round(random.uniform(1.0, 5.0), 2)
+        self._hot_request("Withdrawal", "/api/v1/transaction/withdrawal", {
+            "sourceCvu": hot.cvu, "destinationCvu": EXTERNAL_CVU, "amount": amount, "currency": "ARS",
+            "externalReference": generate_external_reference()
+        }, hot.token, hot.cvu, -amount)
+
+# Lista expandida por peso: asignar un dict después de crear la clase no pasa por la
+# metaclase de Locust y los pesos se perderían
+HotWalletFlow.tasks = ([HotWalletFlow.transfer_to_hot] * 3 + [HotWalletFlow.transfer_from_hot] * 2 +
+                       [HotWalletFlow.withdraw_from_hot])
+
+class HotWalletUser(WalletHttpUser):
+    tasks = [HotWalletFlow]
+    wait_time = between(0.1, 0.5)
+    host = "http://localhost:8080"
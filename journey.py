@@ -0,0 +1,60 @@
+"""
+Métricas de journey de punta a punta por usuario simulado.
+
+El journey es el recorrido que mira producto: registro → login → primer depósito →
+primera transferencia. Empieza en el on_start de WalletUserFlow y termina cuando el
+usuario alcanzó los cuatro hitos, o falla cuando falla el request de un hito que todavía
+no alcanzó. Con el perfil ponderado los pasos salen al azar, así que los hitos cuentan en
+cualquier orden; el depósito inicial cuenta como primer depósito y reusar el token
+cacheado cuenta como login.
+
+Cada journey terminado se registra en la entrada de stats JOURNEY "🧭 Onboarding journey":
+tiempo de pared total como tiempo de respuesta (con sus percentiles) y cantidad de pasos
+(tasks ejecutadas) como tamaño de respuesta, así el promedio de pasos sale en la columna
+de tamaño. Se escribe directo en la entrada y no por el evento request: la fila viaja a
+master con las demás stats, sale en los CSV, en el HDR y en results_store, pero el
+Aggregated de Locust sigue contando solo requests HTTP.
+
+JOURNEY_METRICS=0 lo desactiva. Los usuarios de PROVISIONED_USERS_FILE no tienen journey
+(ya están registrados) y los journeys cortados por el fin de la corrida no se cuentan.
+"""
+import os
+import time
+from typing import Optional
+
+from locust.exception import CatchResponseError
+from locust.stats import StatsError
+
+JOURNEY_METRICS = os.getenv("JOURNEY_METRICS", "1") == "1"
+JOURNEY_TYPE = "JOURNEY"
+JOURNEY_NAME = "🧭 Onboarding journey"
+JOURNEY_MILESTONES = frozenset(("register", "login", "deposit", "transfer"))
+
+class Journey:
+    __slots__ = ("started", "steps", "reached")
+
+    def __init__(self):
+        self.started = time.time()
+        self.steps = 0
+        self.reached = set()
+
+    def pending(self, milestone: str) -> bool:
+        return milestone not in self.reached
+
+    def reach(self, milestone: str) -> bool:
+        """Marca el hito y devuelve True si con él se completó el journey."""
+        self.reached.add(milestone)
+        return self.reached >= JOURNEY_MILESTONES
+
+def record_journey(stats, journey: Journey, error: Optional[str] = None) -> float:
+    """Registra el journey terminado en las stats y devuelve su duración en ms."""
+    elapsed_ms = (time.time() - journey.started) * 1000
+    entry = stats.get(JOURNEY_NAME, JOURNEY_TYPE)
+    entry.log(elapsed_ms, journey.steps)
+    if error:
+        # Igual que un response.failure(), así el reporte de errores lo muestra como los demás
+        error = CatchResponseError(error)
+        entry.log_error(error)
+        key = StatsError.create_key(JOURNEY_TYPE, JOURNEY_NAME, error)
+        stats.errors.setdefault(key, StatsError(JOURNEY_TYPE, JOURNEY_NAME, error)).occurred()
+    return elapsed_ms
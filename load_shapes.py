@@ -0,0 +1,112 @@
+"""
+Formas de carga reproducibles para correr en headless (local o master/worker).
+
+Se agrega como segundo locustfile y la forma se elige con LOAD_SHAPE:
+
+  LOAD_SHAPE=ramp   rampa lineal de --shape-start-users a --shape-users en --shape-ramp s, luego --shape-hold s
+  LOAD_SHAPE=step   --shape-steps escalones de --shape-users/--shape-steps usuarios, cada uno sostenido --shape-hold s
+  LOAD_SHAPE=spike  --shape-users de base (rampa a --shape-spawn-rate), salto a --shape-spike-users
+                    en --shape-spike-at s durante --shape-spike-duration s; subida y bajada del
+                    spike en un segundo; termina a los --shape-duration s
+  LOAD_SHAPE=soak   rampa a --shape-users en --shape-ramp s y carga constante durante --shape-duration s
+  LOAD_SHAPE=capacity  búsqueda del knee contra SLO de p99 y errores (parámetros --capacity-*,
+                    ver capacity_search.py)
+
+Los parámetros también se pueden pasar por entorno (LOCUST_SHAPE_USERS, LOCUST_SHAPE_RAMP, ...).
+
+Ejemplo:
+  LOAD_SHAPE=step locust -f locustfile.py,load_shapes.py --headless --master --expect-workers 4 \\
+      --shape-users 1000 --shape-steps 5 --shape-hold 120 StressWalletUser
+"""
+import math
+import os
+from typing import Optional, Tuple
+
+from locust import LoadTestShape, events
+
+from capacity_search import CapacitySearchShape
+
+LOAD_SHAPE = os.getenv("LOAD_SHAPE", "ramp")
+
+@events.init_command_line_parser.add_listener
+def add_shape_arguments(parser):
+    group = parser.add_argument_group("Load shapes", "Parámetros de load_shapes.py (forma elegida con LOAD_SHAPE)")
+    group.add_argument("--shape-users", type=int, default=100, env_var="LOCUST_SHAPE_USERS",
+                       help="Usuarios objetivo (pico de la rampa, total de los escalones, base del spike, soak)")
+    group.add_argument("--shape-start-users", type=int, default=0, env_var="LOCUST_SHAPE_START_USERS")
+    group.add_argument("--shape-spawn-rate", type=float, default=10, env_var="LOCUST_SHAPE_SPAWN_RATE",
+                       help="Usuarios/s de los escalones y de la rampa a la base del spike "
+                            "(la subida y bajada del spike son en un segundo)")
+    group.add_argument("--shape-ramp", type=float, default=60, env_var="LOCUST_SHAPE_RAMP", help="Segundos de rampa")
+    group.add_argument("--shape-hold", type=float, default=60, env_var="LOCUST_SHAPE_HOLD",
+                       help="Segundos sostenidos al final de la rampa o en cada escalón")
+    group.add_argument("--shape-steps", type=int, default=5, env_var="LOCUST_SHAPE_STEPS")
+    group.add_argument("--shape-spike-users", type=int, default=500, env_var="LOCUST_SHAPE_SPIKE_USERS")
+    group.add_argument("--shape-spike-at", type=float, default=60, env_var="LOCUST_SHAPE_SPIKE_AT")
+    group.add_argument("--shape-spike-duration", type=float, default=30, env_var="LOCUST_SHAPE_SPIKE_DURATION")
+    group.add_argument("--shape-duration", type=float, default=300, env_var="LOCUST_SHAPE_DURATION",
+                       help="Duración total del spike o del tramo constante del soak, en segundos")
+
+class _OptionsShape(LoadTestShape):
+    abstract = True
+
+    @property
+    def options(self):
+        return self.runner.environment.parsed_options
+
+class RampShape(_OptionsShape):
+    abstract = True
+
+    def tick(self) -> Optional[Tuple[int, float]]:
+        o, run_time = self.options, self.get_run_time()
+        if run_time > o.shape_ramp + o.shape_hold:
+            return None
+        progress = min(run_time / o.shape_ramp, 1.0) if o.shape_ramp > 0 else 1.0
+        users = round(o.shape_start_users + (o.shape_users - o.shape_start_users) * progress)
+        # El spawn rate sigue a la pendiente de la rampa para que la curva sea realmente lineal
+        slope = abs(o.shape_users - o.shape_start_users) / o.shape_ramp if o.shape_ramp > 0 else o.shape_spawn_rate
+        return users, max(slope, 1.0)
+
+class StepShape(_OptionsShape):
+    abstract = True
+
+    def tick(self) -> Optional[Tuple[int, float]]:
+        o, run_time = self.options, self.get_run_time()
+        step = math.floor(run_time / o.shape_hold) + 1
+        if step > o.shape_steps:
+            return None
+        return round(o.shape_users * step / o.shape_steps), o.shape_spawn_rate
+
+class SpikeShape(_OptionsShape):
+    abstract = True
+
+    def tick(self) -> Optional[Tuple[int, float]]:
+        o, run_time = self.options, self.get_run_time()
+        if run_time > o.shape_duration:
+            return None
+        # Todo el salto en un segundo (subida y bajada): el spike es repentino por definición
+        jump = max(abs(o.shape_spike_users - o.shape_users), 1)
+        if o.shape_spike_at <= run_time < o.shape_spike_at + o.shape_spike_duration:
+            return o.shape_spike_users, jump
+        if run_time < o.shape_spike_at:
+            return o.shape_users, o.shape_spawn_rate
+        return o.shape_users, jump
+
+class SoakShape(_OptionsShape):
+    abstract = True
+
+    def tick(self) -> Optional[Tuple[int, float]]:
+        o, run_time = self.options, self.get_run_time()
+        if run_time > o.shape_ramp + o.shape_duration:
+            return None
+        rate = o.shape_users / o.shape_ramp if o.shape_ramp > 0 else o.shape_users
+        return o.shape_users, max(rate, 1.0)
+
+SHAPES = {"ramp": RampShape, "step": StepShape, "spike": SpikeShape, "soak": SoakShape,
+          "capacity": CapacitySearchShape}
+
+if LOAD_SHAPE not in SHAPES:
+    raise ValueError(f"LOAD_SHAPE desconocido: {LOAD_SHAPE} (opciones: {', '.join(SHAPES)})")
+
+class WalletLoadShape(SHAPES[LOAD_SHAPE]):
+    abstract = False
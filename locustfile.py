@@ -1,23 +1,62 @@
+import os
 import random
 import time
 import uuid
+import itertools
 import threading
 import logging
-from locust import HttpUser, TaskSet, task, between
-from typing import Optional, Dict, Any, Set
+import gevent
+from contextlib import contextmanager
+from locust import HttpUser, FastHttpUser, TaskSet, SequentialTaskSet, between, events
+from locust.runners import MasterRunner, WorkerRunner
+from collections import Counter
+from typing import Optional, Dict, Any, List
+from user_pool import PAYEE_DISTRIBUTION, UserPool, distribution_summary, payee_distribution_from_env
+from provisioning import USER_DAY_OF_BIRTH, USER_LASTNAME, USER_NAME, USER_PASSWORD, ProvisionedUser, load_fixture
+from token_cache import TokenCache
+from user_state import UserStateStore
+from journey import JOURNEY_METRICS, JOURNEY_NAME, JOURNEY_TYPE, Journey, record_journey
+from harness_logging import setup_logger, log_event, event_summary
+from history_scaling import validate_history
+from results_store import RESULTS_DB, save_run
+from workload_profile import load_workload
+from hdr_histogram import LatencyHistogram, encode_all, merge_encoded, write_report
+from resource_sampler import RESOURCE_OUTPUT_DIR, RESOURCE_SAMPLE_INTERVAL, RESOURCE_TARGETS, ResourceSampler, parse_targets
+from request_trace import TraceRecorder, trace_session
+from retry_policy import (RETRY_MAX_ATTEMPTS, RETRY_POLICY, backoff_delay, budget, drain_retry_stats, record_operation,
+                          should_retry, summarize)
+from request_timing import (CONNECTION_MODES, drain_connection_stats, instrument_fast_session, instrument_session,
+                            response_timing)
 
-logger = logging.getLogger('wallet_test')
-logger.setLevel(logging.INFO)
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-ch = logging.StreamHandler()
-ch.setFormatter(formatter)
-logger.addHandler(ch)
+logger = setup_logger('wallet_test')
 
 USER_COUNTER = 0
 CVU_COUNTER = int(time.time() * 1000)
 USER_LOCK = threading.Lock()
 CVU_LOCK = threading.Lock()
 
+CVU_SYNC_BATCH_SIZE = int(os.getenv("CVU_SYNC_BATCH_SIZE", "500"))
+CVU_SYNC_INTERVAL = float(os.getenv("CVU_SYNC_INTERVAL", "1.0"))
+MSG_CVU_BATCH = "cvu_pool_batch"
+MSG_CVU_SNAPSHOT_REQUEST = "cvu_pool_snapshot_request"
+
+PROVISIONED_USERS_FILE = os.getenv("PROVISIONED_USERS_FILE")
+MSG_PROVISIONED_SHARE = "provisioned_share"
+TOKEN_RELOGIN_RATIO = float(os.getenv("TOKEN_RELOGIN_RATIO", "0.05"))
+LOG_SUMMARY_INTERVAL = float(os.getenv("LOG_SUMMARY_INTERVAL", "30"))
+HISTORY_VALIDATION = os.getenv("HISTORY_VALIDATION", "full")
+WORKLOAD_PROFILE = os.getenv("WORKLOAD_PROFILE", "default")
+HDR_OUTPUT_DIR = os.getenv("HDR_OUTPUT_DIR", "hdr_results")
+MSG_HDR_FLUSH = "hdr_histogram_flush"
+RESULTS_LABEL = os.getenv("RESULTS_LABEL")
+REQUEST_TIMING = os.getenv("REQUEST_TIMING", "1") == "1"
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "1000"))
+CONNECTION_MODE = os.getenv("CONNECTION_MODE", "keepalive")
+SHARED_POOL_SIZE = int(os.getenv("SHARED_POOL_SIZE", "50"))
+TRACE_RECORD = os.getenv("TRACE_RECORD")
+RETRY_REPORT_INTERVAL = float(os.getenv("RETRY_REPORT_INTERVAL", "10"))
+TIMING_PHASES = ("connect", "tls", "pool_wait", "ttfb", "body")
+
 def generate_unique_email():
     global USER_COUNTER
     with USER_LOCK:
@@ -31,56 +70,537 @@ def generate_unique_cvu():
         CVU_COUNTER += 1
         return 10000000000 + CVU_COUNTER
 
-def generate_random_amount():
-    return round(random.uniform(1.0, 1000.0), 2)
-
 def generate_external_reference():
     return f"REF_{uuid.uuid4().hex[:8]}"
 
-class UserPool:
-    def __init__(self):
-        self.valid_cvus: Set[int] = set()
-        self._lock = threading.Lock()
+if CONNECTION_MODE not in CONNECTION_MODES:
+    raise ValueError(f"CONNECTION_MODE desconocido: {CONNECTION_MODE} ({', '.join(CONNECTION_MODES)})")
+
+workload = load_workload(WORKLOAD_PROFILE)
+user_pool = UserPool(distribution=payee_distribution_from_env())
+token_cache = TokenCache()
+user_states = UserStateStore()
+
+def _chunks(cvus: List[int], size: int):
+    for i in range(0, len(cvus), size):
+        yield cvus[i:i + size]
+
+def _master_on_cvu_batch(environment, msg, **kwargs):
+    added = user_pool.merge_cvus(msg.data)
+    if added:
+        environment.runner.send_message(MSG_CVU_BATCH, added)
+        logger.info(" Pool del cluster: +%s CVUs desde %s (Total: %s)", len(added), msg.node_id, user_pool.get_pool_size())
+
+def _master_on_snapshot_request(environment, msg, **kwargs):
+    for batch in _chunks(user_pool.snapshot(), CVU_SYNC_BATCH_SIZE):
+        environment.runner.send_message(MSG_CVU_BATCH, batch, client_id=msg.node_id)
+
+def _worker_on_cvu_batch(environment, msg, **kwargs):
+    user_pool.merge_cvus(msg.data)
+
+def _worker_flush_pending(runner: WorkerRunner):
+    while True:
+        gevent.sleep(CVU_SYNC_INTERVAL)
+        for batch in _chunks(user_pool.drain_pending(), CVU_SYNC_BATCH_SIZE):
+            runner.send_message(MSG_CVU_BATCH, batch)
+
+@events.init.add_listener
+def setup_cvu_pool_sync(environment, **kwargs):
+    runner = environment.runner
+    if isinstance(runner, MasterRunner):
+        runner.register_message(MSG_CVU_BATCH, _master_on_cvu_batch)
+        runner.register_message(MSG_CVU_SNAPSHOT_REQUEST, _master_on_snapshot_request)
+    elif isinstance(runner, WorkerRunner):
+        runner.register_message(MSG_CVU_BATCH, _worker_on_cvu_batch)
+        gevent.spawn(_worker_flush_pending, runner)
+        runner.send_message(MSG_CVU_SNAPSHOT_REQUEST, None)
+
+def _log_event_summary():
+    counts = event_summary()
+    if counts:
+        logger.info("📈 Resumen de eventos: %s", ", ".join(f"{k}={v}" for k, v in sorted(counts.items())))
+
+def _log_event_summary_loop():
+    while True:
+        gevent.sleep(LOG_SUMMARY_INTERVAL)
+        _log_event_summary()
+
+@events.init.add_listener
+def setup_event_summary(environment, **kwargs):
+    if not isinstance(environment.runner, MasterRunner) and LOG_SUMMARY_INTERVAL > 0:
+        gevent.spawn(_log_event_summary_loop)
+
+@events.test_stop.add_listener
+def log_final_event_summary(environment, **kwargs):
+    _log_event_summary()
+
+# Histogramas HDR por endpoint: los workers mandan deltas codificados en cada reporte
+# de stats y un último envío al parar; el master los suma sin pérdida y escribe el archivo
+hdr_histograms: Dict[str, LatencyHistogram] = {}
+hdr_run_id = time.strftime("%Y%m%d-%H%M%S")
+
+def _drain_hdr_histograms() -> Dict[str, bytes]:
+    encoded = encode_all(hdr_histograms)
+    hdr_histograms.clear()
+    return encoded
+
+def _master_on_hdr_flush(environment, msg, **kwargs):
+    merge_encoded(hdr_histograms, msg.data)
+
+@events.init.add_listener
+def setup_hdr_histograms(environment, **kwargs):
+    if isinstance(environment.runner, MasterRunner):
+        environment.runner.register_message(MSG_HDR_FLUSH, _master_on_hdr_flush)
+
+def _record_hdr(key: str, value_ms: float) -> None:
+    histogram = hdr_histograms.get(key)
+    if histogram is None:
+        histogram = hdr_histograms[key] = LatencyHistogram()
+    histogram.record(value_ms)
+
+@events.request.add_listener
+def record_hdr_latency(request_type, name, response_time, **kwargs):
+    _record_hdr(f"{request_type} {name}", response_time)
+
+@events.request.add_listener
+def record_request_phases(request_type, name, response_time, response=None, **kwargs):
+    # Fases de request_timing.py como histogramas propios ("MÉTODO nombre · ttfb"), que
+    # viajan al master y terminan en el .hgrm junto con la latencia total
+    timing = response_timing(response)
+    if timing is None:
+        return
+    key = f"{request_type} {name}"
+    for phase in TIMING_PHASES:
+        value = getattr(timing, phase)
+        # connect y tls solo cuentan cuando se abrió una conexión nueva; pool_wait solo con pool compartido
+        if phase == "pool_wait" and CONNECTION_MODE != "shared":
+            continue
+        if value or phase in ("ttfb", "body", "pool_wait"):
+            _record_hdr(f"{key} · {phase}", value)
+    if response_time >= SLOW_REQUEST_MS:
+        log_event(logger, "slow_request", "🐢 Request lento %s: %.0fms (connect %.1f, tls %.1f, ttfb %.1f, "
+                  "body %.1f) correlation_id=%s", key, response_time, timing.connect, timing.tls, timing.ttfb,
+                  timing.body, timing.correlation_id, level=logging.WARNING)
+
+@events.report_to_master.add_listener
+def send_hdr_histograms(client_id, data, **kwargs):
+    data["hdr_histograms"] = _drain_hdr_histograms()
+
+@events.worker_report.add_listener
+def merge_hdr_histograms(client_id, data, **kwargs):
+    merge_encoded(hdr_histograms, data.get("hdr_histograms", {}))
+
+@events.test_start.add_listener
+def reset_hdr_histograms(environment, **kwargs):
+    global hdr_run_id
+    hdr_run_id = time.strftime("%Y%m%d-%H%M%S")
+    if not isinstance(environment.runner, WorkerRunner):
+        hdr_histograms.clear()
+
+def _write_hdr_report():
+    if not HDR_OUTPUT_DIR or not hdr_histograms:
+        return
+    os.makedirs(HDR_OUTPUT_DIR, exist_ok=True)
+    path = os.path.join(HDR_OUTPUT_DIR, f"hdr-{hdr_run_id}.hgrm")
+    write_report(path, hdr_histograms)
+    summary = ", ".join(f"{key}: p99.9={h.value_at_percentile(99.9):.1f}ms"
+                        for key, h in sorted(hdr_histograms.items()) if key.endswith(("Withdrawal", "Transfer")))
+    logger.info("📊 Histogramas HDR guardados en %s %s", path, summary)
+
+@events.test_stop.add_listener
+def export_hdr_histograms(environment, **kwargs):
+    runner = environment.runner
+    if isinstance(runner, WorkerRunner):
+        runner.send_message(MSG_HDR_FLUSH, _drain_hdr_histograms())
+    else:
+        _write_hdr_report()
+
+@events.quitting.add_listener
+def export_final_hdr_histograms(environment, **kwargs):
+    # Los workers mandan un último reporte al salir que puede llegar después del test_stop del master
+    if isinstance(environment.runner, MasterRunner):
+        _write_hdr_report()
+
+# Reintentos (retry_policy.py): los workers mandan sus contadores con cada reporte de stats
+# y el master (o el runner local) cierra una ventana cada RETRY_REPORT_INTERVAL segundos
+retry_window: Counter = Counter()
+retry_total: Counter = Counter()
+retry_curve: List[Dict[str, float]] = []
+_retry_greenlet: Optional[gevent.Greenlet] = None
+
+@events.report_to_master.add_listener
+def send_retry_stats(client_id, data, **kwargs):
+    if RETRY_POLICY:
+        data["retry_stats"] = drain_retry_stats()
+
+@events.worker_report.add_listener
+def merge_retry_stats(client_id, data, **kwargs):
+    retry_window.update(data.get("retry_stats", {}))
+
+def _close_retry_window():
+    retry_window.update(drain_retry_stats())
+    summary = summarize(retry_window)
+    if summary:
+        retry_curve.append(summary)
+        logger.info("🔁 Reintentos: %s", ", ".join(f"{k}={v}" for k, v in summary.items()))
+    retry_total.update(retry_window)
+    retry_window.clear()
+
+def _retry_window_loop():
+    while True:
+        gevent.sleep(RETRY_REPORT_INTERVAL)
+        _close_retry_window()
+
+@events.test_start.add_listener
+def start_retry_report(environment, **kwargs):
+    global _retry_greenlet
+    if not RETRY_POLICY or isinstance(environment.runner, WorkerRunner):
+        return
+    for counter in (retry_window, retry_total):
+        counter.clear()
+    retry_curve.clear()
+    _retry_greenlet = gevent.spawn(_retry_window_loop)
+
+def _log_retry_report():
+    if _retry_greenlet is None or _retry_greenlet.dead:
+        return
+    _retry_greenlet.kill()
+    _close_retry_window()
+    total = summarize(retry_total)
+    if not total:
+        return
+    attempts = ", ".join(f"{n}: {retry_total[f'attempts_{n}']}" for n in range(1, RETRY_MAX_ATTEMPTS + 1))
+    logger.info("🔁 Total de reintentos: %s | operaciones por cantidad de intentos: %s",
+                ", ".join(f"{k}={v}" for k, v in total.items()), attempts)
+    # Carga extra según la tasa de falla del primer intento, agrupando ventanas de a 5 puntos
+    buckets: Dict[float, List[float]] = {}
+    for window in retry_curve:
+        buckets.setdefault(round(window["first_failure_rate"] * 20) / 20, []).append(window["extra_load"])
+    logger.info("🔁 Carga extra por tasa de falla del primer intento:\n%s", "\n".join(
+        f"  falla ~{rate:.0%}: +{sum(loads) / len(loads):.1%} requests ({len(loads)} ventanas)"
+        for rate, loads in sorted(buckets.items())))
+
+@events.test_stop.add_listener
+def log_local_retry_report(environment, **kwargs):
+    if not isinstance(environment.runner, (MasterRunner, WorkerRunner)):
+        _log_retry_report()
+
+@events.quitting.add_listener
+def log_cluster_retry_report(environment, **kwargs):
+    if isinstance(environment.runner, MasterRunner):
+        _log_retry_report()
+
+# Recursos del backend (resource_sampler.py): solo en el master o el runner local, que
+# comparten host con el backend; cada muestra lleva las stats actuales de Locust
+resource_targets = parse_targets(RESOURCE_TARGETS)
+resource_sampler: Optional[ResourceSampler] = None
+_resource_greenlet: Optional[gevent.Greenlet] = None
+
+def _sample_resources_loop(environment):
+    stats = environment.stats.total
+    while True:
+        resource_sampler.sample(users=environment.runner.user_count, rps=stats.current_rps,
+                                fail_per_sec=stats.current_fail_per_sec,
+                                p95_ms=stats.get_current_response_time_percentile(0.95))
+        gevent.sleep(RESOURCE_SAMPLE_INTERVAL)
+
+@events.test_start.add_listener
+def start_resource_sampler(environment, **kwargs):
+    global resource_sampler, _resource_greenlet
+    if not resource_targets or isinstance(environment.runner, WorkerRunner):
+        return
+    output_path = None
+    if RESOURCE_OUTPUT_DIR:
+        os.makedirs(RESOURCE_OUTPUT_DIR, exist_ok=True)
+        output_path = os.path.join(RESOURCE_OUTPUT_DIR, f"resources-{hdr_run_id}.csv")
+    resource_sampler = ResourceSampler(resource_targets, output_path)
+    _resource_greenlet = gevent.spawn(_sample_resources_loop, environment)
+    logger.info("🩺 Muestreando recursos de %s cada %ss", ", ".join(resource_targets), RESOURCE_SAMPLE_INTERVAL)
+
+@events.test_stop.add_listener
+def stop_resource_sampler(environment, **kwargs):
+    if _resource_greenlet is None or _resource_greenlet.dead:
+        return
+    _resource_greenlet.kill()
+    for target, peak in resource_sampler.peaks().items():
+        logger.info("🩺 Pico de %s: cpu %.1f%%, rss %.1fMB, %s threads, %s fds, %s procesos", target,
+                    peak["cpu_percent"], peak["rss_mb"], peak["threads"], peak["fds"], peak["processes"])
+    if resource_sampler.output_path:
+        logger.info("🩺 Muestras de recursos guardadas en %s", resource_sampler.output_path)
+
+@events.quitting.add_listener
+def store_run_results(environment, **kwargs):
+    # Solo corridas headless: en la UI las stats se resetean y no hay un final claro de la corrida
+    if isinstance(environment.runner, WorkerRunner) or not RESULTS_DB or not environment.parsed_options.headless:
+        return
+    if not environment.stats.total.num_requests:
+        return
+    run_id = save_run(environment, RESULTS_LABEL, hdr_histograms,
+                      resource_samples=resource_sampler.samples if resource_sampler else None)
+    logger.info("🗄️ Corrida #%s guardada en %s", run_id, RESULTS_DB)
+
+# Conexiones abiertas por el cliente (request_timing.py): los workers mandan sus contadores
+# con cada reporte de stats; el pico del cluster es la suma de los picos de cada worker
+cluster_connection_stats: Counter = Counter()
+connection_peaks: Dict[str, int] = {}
+
+@events.report_to_master.add_listener
+def send_connection_stats(client_id, data, **kwargs):
+    data["connection_stats"] = drain_connection_stats()
+
+@events.worker_report.add_listener
+def merge_connection_stats(client_id, data, **kwargs):
+    stats = data.get("connection_stats", {})
+    connection_peaks[client_id] = max(connection_peaks.get(client_id, 0), stats.pop("peak_open", 0))
+    cluster_connection_stats.update(stats)
+
+@events.test_start.add_listener
+def reset_connection_stats(environment, **kwargs):
+    cluster_connection_stats.clear()
+    connection_peaks.clear()
+    drain_connection_stats()
+
+def _log_connection_stats():
+    stats = cluster_connection_stats
+    if not stats["requests"]:
+        return
+    opened = stats["opened"]
+    setup_ms = stats["connect_us"] / opened / 1000 if opened else 0.0
+    logger.info("🔌 Conexiones (%s): %s abiertas, %s cerradas, %s requests, %.2f requests por conexión, "
+                "setup promedio %.2fms (%.1fs en total), pico de conexiones abiertas %s",
+                CONNECTION_MODE, opened, stats["closed"], stats["requests"], stats["requests"] / max(opened, 1),
+                setup_ms, stats["connect_us"] / 1_000_000, sum(connection_peaks.values()))
+
+@events.test_stop.add_listener
+def log_local_connection_stats(environment, **kwargs):
+    if not isinstance(environment.runner, (MasterRunner, WorkerRunner)):
+        stats = drain_connection_stats()
+        connection_peaks["local"] = stats.pop("peak_open")
+        cluster_connection_stats.update(stats)
+        _log_connection_stats()
+
+@events.quitting.add_listener
+def log_cluster_connection_stats(environment, **kwargs):
+    if isinstance(environment.runner, MasterRunner):
+        _log_connection_stats()
+
+# Distribución de payees realizada: los workers mandan sus conteos con cada reporte de stats
+@events.report_to_master.add_listener
+def send_payee_counts(client_id, data, **kwargs):
+    data["payee_counts"] = list(user_pool.drain_payee_counts().items())
+
+@events.worker_report.add_listener
+def merge_payee_counts(client_id, data, **kwargs):
+    user_pool.payee_counts.update(dict(data.get("payee_counts", [])))
+
+@events.test_start.add_listener
+def reset_payee_counts(environment, **kwargs):
+    if not isinstance(environment.runner, WorkerRunner):
+        user_pool.drain_payee_counts()
+
+def _log_payee_distribution():
+    summary = distribution_summary(user_pool.payee_counts)
+    if summary["samples"]:
+        logger.info("🎯 Distribución de payees realizada (%s): %s", PAYEE_DISTRIBUTION,
+                    ", ".join(f"{k}={v}" for k, v in summary.items()))
+
+@events.test_stop.add_listener
+def log_local_payee_distribution(environment, **kwargs):
+    if not isinstance(environment.runner, (MasterRunner, WorkerRunner)):
+        _log_payee_distribution()
+
+@events.quitting.add_listener
+def log_cluster_payee_distribution(environment, **kwargs):
+    if isinstance(environment.runner, MasterRunner):
+        _log_payee_distribution()
+
+# Grabación de trazas para trace_replay.py: cada worker (o el runner local) escribe su archivo
+trace_recorder: Optional[TraceRecorder] = None
+_trace_user_ids = itertools.count()
+
+@events.test_start.add_listener
+def start_trace_recording(environment, **kwargs):
+    global trace_recorder
+    runner = environment.runner
+    if not TRACE_RECORD or isinstance(runner, MasterRunner):
+        return
+    if trace_recorder:
+        trace_recorder.close()
+    if isinstance(runner, WorkerRunner):
+        trace_recorder = TraceRecorder(f"{TRACE_RECORD}.w{runner.worker_index}", source=f"worker {runner.worker_index}")
+    else:
+        trace_recorder = TraceRecorder(TRACE_RECORD)
+    logger.info("🎙️ Grabando traza en %s", trace_recorder.path)
+
+@events.test_stop.add_listener
+def stop_trace_recording(environment, **kwargs):
+    if trace_recorder:
+        trace_recorder.close()
+        logger.info("🎙️ Traza guardada en %s: %s requests", trace_recorder.path, trace_recorder.count)
 
-    def add_cvu(self, cvu: int) -> None:
-        with self._lock:
-            if cvu is not None:
-                self.valid_cvus.add(cvu)
-                logger.info(f" CVU {cvu} agregado al pool (Total: {len(self.valid_cvus)})")
+provisioned_users: List[ProvisionedUser] = []
+_provisioned_fixture: List[ProvisionedUser] = []
+_provisioned_cursor = itertools.count()
 
-    def get_random_cvu(self, exclude_cvu: int) -> Optional[int]:
-        with self._lock:
-            available_cvus = [cvu for cvu in self.valid_cvus if cvu != exclude_cvu]
-            if not available_cvus:
-                return None
-            return random.choice(available_cvus)
+@events.init.add_listener
+def load_provisioned_users(environment, **kwargs):
+    runner = environment.runner
+    if not PROVISIONED_USERS_FILE or isinstance(runner, MasterRunner):
+        return
+    records = load_fixture(PROVISIONED_USERS_FILE)
+    user_pool.merge_cvus(record.cvu for record in records)
+    if isinstance(runner, WorkerRunner):
+        # La porción de este worker la asigna el master al arrancar, según los workers conectados
+        _provisioned_fixture.extend(records)
+        runner.register_message(MSG_PROVISIONED_SHARE, _worker_on_provisioned_share)
+        return
+    provisioned_users.extend(records)
+    logger.info("📦 %s usuarios aprovisionados cargados desde %s", len(provisioned_users), PROVISIONED_USERS_FILE)
 
-    def get_pool_size(self) -> int:
-        with self._lock:
-            return len(self.valid_cvus)
+def _worker_on_provisioned_share(environment, msg, **kwargs):
+    share, workers = msg.data
+    # Cada worker toma una porción disjunta del fixture para no compartir billeteras
+    provisioned_users[:] = _provisioned_fixture[share::workers]
+    logger.info("📦 %s usuarios aprovisionados cargados desde %s (porción %s de %s)", len(provisioned_users),
+                PROVISIONED_USERS_FILE, share + 1, workers)
 
-user_pool = UserPool()
+@events.test_start.add_listener
+def send_provisioned_shares(environment, **kwargs):
+    runner = environment.runner
+    if not PROVISIONED_USERS_FILE or not isinstance(runner, MasterRunner):
+        return
+    # Llega a cada worker antes que el mensaje de spawn. Los índices de worker no son
+    # necesariamente contiguos (un worker que se reconecta recibe uno nuevo), así que la
+    # porción es la posición entre los conectados; un worker que entra con la corrida en
+    # marcha no recibe porción y registra usuarios nuevos
+    workers = sorted(runner.clients.ready + runner.clients.spawning + runner.clients.running,
+                     key=lambda client: runner.get_worker_index(client.id))
+    for share, client in enumerate(workers):
+        runner.send_message(MSG_PROVISIONED_SHARE, (share, len(workers)), client_id=client.id)
+
+def next_provisioned_user() -> Optional[ProvisionedUser]:
+    if not provisioned_users:
+        return None
+    return provisioned_users[next(_provisioned_cursor) % len(provisioned_users)]
+
+class WalletUserFlow(SequentialTaskSet if workload.mode == "sequential" else TaskSet):
+    # Iguales para todos los usuarios: constantes de clase, no atributos por instancia
+    user_name = USER_NAME
+    user_lastname = USER_LASTNAME
+    user_day_of_birth = USER_DAY_OF_BIRTH
+    user_password = USER_PASSWORD
+    # Las variantes con otra mezcla de tareas (hot wallets, modelo abierto) no miden journeys
+    journeys = True
+
+    # Email, token, CVU y saldo viven en user_states (ver user_state.py); el flujo solo guarda su slot
+    @property
+    def user_email(self) -> Optional[str]:
+        return user_states.emails[self._slot]
+
+    @user_email.setter
+    def user_email(self, email: str) -> None:
+        user_states.emails[self._slot] = email
+
+    @property
+    def auth_token(self) -> Optional[str]:
+        return user_states.tokens[self._slot]
+
+    @auth_token.setter
+    def auth_token(self, token: Optional[str]) -> None:
+        user_states.tokens[self._slot] = token or None
+
+    @property
+    def cvu(self) -> Optional[int]:
+        return user_states.cvus[self._slot] or None
+
+    @cvu.setter
+    def cvu(self, cvu: Optional[int]) -> None:
+        user_states.cvus[self._slot] = int(cvu or 0)
+
+    @property
+    def balance(self) -> float:
+        return user_states.balances[self._slot]
+
+    @balance.setter
+    def balance(self, balance: float) -> None:
+        user_states.balances[self._slot] = float(balance or 0.0)
 
-class WalletUserFlow(TaskSet):
     def on_start(self):
-        self.user_email = generate_unique_email()
-        self.user_password = "TestPassword124!"
-        self.user_name = "Test"
-        self.user_lastname = "User"
-        self.user_day_of_birth = "1990-01-01"
-        self.auth_token: Optional[str] = None
-        self.cvu: Optional[int] = None
-        self.balance: float = 0.0
-        logger.info(f"🚀 Iniciando flujo para usuario: {self.user_email}")
+        self._slot = user_states.allocate(generate_unique_email())
+
+        provisioned = next_provisioned_user()
+        self.journey = Journey() if JOURNEY_METRICS and self.journeys and not provisioned else None
+        if provisioned:
+            self.user_email = provisioned.email
+            self.cvu = provisioned.cvu
+            token_cache.put(provisioned.email, provisioned.token)
+            self.auth_token = token_cache.get(self.user_email)
+            if not self.auth_token:
+                self._login()
+            self.step_3_check_balance()
+        log_event(logger, "flow_start", "🚀 Iniciando flujo para usuario: %s", self.user_email)
+
+    def execute_task(self, task):
+        if self.journey:
+            self.journey.steps += 1
+        super().execute_task(task)
+
+    def _journey_step(self, milestone: str, response=None) -> None:
+        """Avanza el journey con el resultado del request de un hito (sin response: hito alcanzado)."""
+        if not self.journey or not self.journey.pending(milestone):
+            return
+        error = response.request_meta.get("exception") if response is not None else None
+        if error:
+            self._end_journey(f"{milestone}: {error}")
+        elif (response is None or response.status_code < 400) and self.journey.reach(milestone):
+            self._end_journey()
+
+    def _end_journey(self, error: Optional[str] = None) -> None:
+        journey, self.journey = self.journey, None
+        elapsed_ms = record_journey(self.user.environment.stats, journey, error)
+        _record_hdr(f"{JOURNEY_TYPE} {JOURNEY_NAME}", elapsed_ms)
+        if error:
+            log_event(logger, "journey_failed", "🧭 Journey fallido a los %.0fms (%s pasos): %s", elapsed_ms,
+                      journey.steps, error, level=logging.WARNING)
+        else:
+            log_event(logger, "journey_ok", "🧭 Journey completo en %.0fms (%s pasos)", elapsed_ms, journey.steps)
 
     def get_auth_headers(self) -> Dict[str, str]:
         if self.auth_token:
             return {"Authorization": f"Bearer {self.auth_token}"}
         return {}
 
-    @task(1)
+    @contextmanager
+    def _transaction_post(self, path: str, payload: Dict[str, Any], name: str):
+        """POST de una operación con la billetera externa. Con RETRY_POLICY=on reintenta los
+        status de retry_policy.py (mismo payload y externalReference) y entrega la respuesta
+        del último intento; los reintentos se reportan como "<nombre> ↻"."""
+        attempt, first_failed = 1, False
+        if RETRY_POLICY:
+            budget.deposit()
+        while True:
+            response = self.client.post(path, json=payload, headers=self.get_auth_headers(),
+                                        name=name if attempt == 1 else f"{name} ↻", catch_response=True)
+            first_failed = first_failed or (attempt == 1 and response.status_code not in [200, 201])
+            retryable = RETRY_POLICY and should_retry(response.status_code)
+            if retryable and attempt < RETRY_MAX_ATTEMPTS and budget.withdraw():
+                with response:
+                    response.failure(f"Status {response.status_code}, se reintenta (intento {attempt})")
+                gevent.sleep(backoff_delay(attempt))
+                attempt += 1
+                continue
+            with response:
+                yield response
+            if RETRY_POLICY:
+                if not retryable:
+                    outcome = "ok" if response.status_code in [200, 201] else "not_retryable"
+                else:
+                    outcome = "exhausted" if attempt >= RETRY_MAX_ATTEMPTS else "no_budget"
+                record_operation(attempt, first_failed, response.status_code in [200, 201], outcome)
+            return
+
     def step_1_register_user(self):
-        if self.auth_token:
+        if self.auth_token or self.cvu:
             return
         payload = {
             "name": self.user_name,
@@ -96,7 +616,7 @@ class WalletUserFlow(TaskSet):
             name="🔑 Register User",
             catch_response=True
         ) as response:
-            if response.ok:
+            if 0 < response.status_code < 400:
                 try:
                     data = response.json()
                     self.cvu = data.get("cvu")
@@ -104,25 +624,37 @@ class WalletUserFlow(TaskSet):
                     
                     if not self.cvu or not self.auth_token:
                         response.failure("Registration response missing cvu or token")
-                        logger.warning(" Respuesta incompleta:", data)
+                        log_event(logger, "register_incomplete", " Respuesta incompleta: %s", data, level=logging.WARNING)
                     else:
                         user_pool.add_cvu(self.cvu)
+                        token_cache.put(self.user_email, self.auth_token)
                         response.success()
-                        logger.info(f" Usuario registrado - CVU: {self.cvu}")
+                        log_event(logger, "register_ok", " Usuario registrado - CVU: %s", self.cvu)
                 except Exception as e:
                     response.failure(f"Failed to parse register response: {e}")
-                    logger.error(f" Error al parsear respuesta: {e}")
+                    log_event(logger, "register_error", " Error al parsear respuesta: %s", e, level=logging.ERROR)
             else:
                 response.failure(f"Registration failed with status {response.status_code}: {response.text}")
-                logger.error(f" Error en registro ({response.status_code}): {response.text}")
-                logger.debug(" Datos enviados:", payload)
+                log_event(logger, "register_error", " Error en registro (%s): %s", response.status_code, response.text, level=logging.ERROR)
+                log_event(logger, "register_payload", " Datos enviados: %s", payload, level=logging.DEBUG)
+        self._journey_step("register", response)
+        if self.auth_token:
+            self._make_initial_deposit()
 
-    @task(1)
     def step_2_login_user(self):
         if not self.user_email:
-            logger.warning(" Login omitido - Email no disponible")
+            log_event(logger, "login_skipped", " Login omitido - Email no disponible", level=logging.WARNING)
             return
-            
+
+        # Reusar el token cacheado salvo que esté por expirar o toque simular churn de sesión
+        cached_token = token_cache.get(self.user_email)
+        if cached_token and random.random() >= TOKEN_RELOGIN_RATIO:
+            self.auth_token = cached_token
+            self._journey_step("login")
+            return
+        self._login()
+
+    def _login(self):
         payload = {
             "mail": self.user_email,
             "password": self.user_password
@@ -142,56 +674,51 @@ class WalletUserFlow(TaskSet):
                     
                     if self.auth_token and cvu_from_login:
                         self.cvu = cvu_from_login
+                        token_cache.put(self.user_email, self.auth_token)
                         response.success()
-                        logger.info(f" Login exitoso - Token actualizado")
-                        self._make_initial_deposit()
+                        log_event(logger, "login_ok", " Login exitoso - Token actualizado")
                     else:
                         response.failure("Token o CVU faltante en respuesta de login")
                 except Exception as e:
                     response.failure(f"Error al parsear respuesta de login: {e}")
             else:
                 response.failure(f"Login falló con código {response.status_code}: {response.text}")
+        self._journey_step("login", response)
 
     def _make_initial_deposit(self):
         if not self.cvu or not self.auth_token:
-            logger.warning("No se puede realizar depósito inicial - CVU o token faltante")
+            log_event(logger, "initial_deposit_skipped", "No se puede realizar depósito inicial - CVU o token faltante", level=logging.WARNING)
             return
             
-        initial_amount = 1000.0
+        initial_amount = workload.initial_deposit
         
         payload = {
-            "sourceCvu": 200000000001,
+            "sourceCvu": workload.external_cvu,
             "destinationCvu": self.cvu,
             "amount": initial_amount,
             "currency": "ARS",
             "externalReference": generate_external_reference()
         }
         
-        with self.client.post(
-            "/api/v1/transaction/deposit",
-            json=payload,
-            headers=self.get_auth_headers(),
-            name="💰 Initial Deposit",
-            catch_response=True
-        ) as response:
+        with self._transaction_post("/api/v1/transaction/deposit", payload, "💰 Initial Deposit") as response:
             if response.status_code in [200, 201]:
                 try:
                     response_data = response.json()
                     if response_data.get("status") == "COMPLETED":
                         self.balance = initial_amount
                         response.success()
-                        logger.info(f" Depósito inicial realizado: ${initial_amount}")
+                        log_event(logger, "initial_deposit_ok", " Depósito inicial realizado: $%s", initial_amount)
                     else:
                         response.failure(f"Estado de transacción inesperado: {response_data.get('status')}")
                 except Exception as e:
                     response.failure(f"Error al parsear respuesta de depósito: {e}")
             else:
                 response.failure(f"Depósito inicial falló ({response.status_code}): {response.text}")
+        self._journey_step("deposit", response)
 
-    @task(8)
     def step_3_check_balance(self):
         if not self.cvu or not self.auth_token:
-            logger.warning("Consulta de saldo omitida - CVU o token faltante")
+            log_event(logger, "balance_skipped", "Consulta de saldo omitida - CVU o token faltante", level=logging.WARNING)
             return
             
         with self.client.get(
@@ -205,84 +732,69 @@ class WalletUserFlow(TaskSet):
                     data = response.json()
                     self.balance = data.get("balance", 0.0)
                     response.success()
-                    logger.info(f" Saldo actual: ${self.balance}")
+                    log_event(logger, "balance_ok", " Saldo actual: $%s", self.balance)
                 except Exception as e:
                     response.failure(f"Error al parsear saldo: {e}")
             else:
                 response.failure(f"Consulta de saldo falló: {response.text}")
 
-    @task(4)
     def step_4_make_deposit(self):
         if not self.cvu or not self.auth_token:
-            logger.warning(" Depósito omitido - CVU o token faltante")
+            log_event(logger, "deposit_skipped", " Depósito omitido - CVU o token faltante", level=logging.WARNING)
             return
             
-        amount = generate_random_amount()
+        amount = workload.amounts["deposit"].sample()
         
         payload = {
-            "sourceCvu": 200000000001,
+            "sourceCvu": workload.external_cvu,
             "destinationCvu": self.cvu,
             "amount": amount,
             "currency": "ARS",
             "externalReference": generate_external_reference()
         }
         
-        with self.client.post(
-            "/api/v1/transaction/deposit",
-            json=payload,
-            headers=self.get_auth_headers(),
-            name="💵 Make Deposit",
-            catch_response=True
-        ) as response:
+        with self._transaction_post("/api/v1/transaction/deposit", payload, "💵 Make Deposit") as response:
             if response.status_code in [200, 201]:
                 try:
                     response_data = response.json()
                     if response_data.get("status") == "COMPLETED":
                         self.balance += amount
                         response.success()
-                        logger.info(f" Depósito realizado: ${amount} - Nuevo saldo: ${self.balance}")
+                        log_event(logger, "deposit_ok", " Depósito realizado: $%s - Nuevo saldo: $%s", amount, self.balance)
                     else:
                         response.failure(f"Estado de transacción inesperado: {response_data.get('status')}")
                 except Exception as e:
                     response.failure(f"Error al parsear respuesta de depósito: {e}")
             else:
                 response.failure(f"Depósito falló ({response.status_code}): {response.text}")
+        self._journey_step("deposit", response)
 
-    @task(2)
     def step_5_make_withdrawal(self):
         if not self.cvu or not self.auth_token:
-            logger.warning(" Retiro omitido - CVU o token faltante")
+            log_event(logger, "withdrawal_skipped", " Retiro omitido - CVU o token faltante", level=logging.WARNING)
             return
             
-        if self.balance <= 10.0:
-            logger.warning(f" Retiro omitido - Saldo insuficiente: ${self.balance}")
+        withdrawal_amount = workload.amounts["withdrawal"].sample(self.balance)
+        if withdrawal_amount is None:
+            log_event(logger, "withdrawal_skipped", " Retiro omitido - Saldo insuficiente: $%s", self.balance, level=logging.WARNING)
             return
-            
-        max_withdrawal = min(self.balance * 0.3, self.balance - 10.0)
-        withdrawal_amount = round(random.uniform(10.0, max_withdrawal), 2)
         
         payload = {
             "sourceCvu": self.cvu,
-            "destinationCvu": 200000000001,
+            "destinationCvu": workload.external_cvu,
             "amount": withdrawal_amount,
             "currency": "ARS",
             "externalReference": generate_external_reference()
         }
         
-        with self.client.post(
-            "/api/v1/transaction/withdrawal",
-            json=payload,
-            headers=self.get_auth_headers(),
-            name="💸 Make Withdrawal",
-            catch_response=True
-        ) as response:
+        with self._transaction_post("/api/v1/transaction/withdrawal", payload, "💸 Make Withdrawal") as response:
             if response.status_code in [200, 201]:
                 try:
                     response_data = response.json()
                     if response_data.get("status") == "COMPLETED":
                         self.balance -= withdrawal_amount
                         response.success()
-                        logger.info(f" Retiro realizado: ${withdrawal_amount} - Nuevo saldo: ${self.balance}")
+                        log_event(logger, "withdrawal_ok", " Retiro realizado: $%s - Nuevo saldo: $%s", withdrawal_amount, self.balance)
                     else:
                         response.failure(f"Estado de transacción inesperado: {response_data.get('status')}")
                 except Exception as e:
@@ -290,24 +802,21 @@ class WalletUserFlow(TaskSet):
             else:
                 response.failure(f"Retiro falló ({response.status_code}): {response.text}")
 
-    @task(3)
     def step_6_make_p2p_transfer(self):
         if not self.cvu or not self.auth_token:
-            logger.warning(" Transferencia omitida - CVU o token faltante")
+            log_event(logger, "transfer_skipped", " Transferencia omitida - CVU o token faltante", level=logging.WARNING)
             return
             
-        if self.balance <= 20.0:
-            logger.warning(f" Transferencia omitida - Saldo insuficiente: ${self.balance}")
+        transfer_amount = workload.amounts["transfer"].sample(self.balance)
+        if transfer_amount is None:
+            log_event(logger, "transfer_skipped", " Transferencia omitida - Saldo insuficiente: $%s", self.balance, level=logging.WARNING)
             return
-            
+
         destination_cvu = user_pool.get_random_cvu(self.cvu)
         if not destination_cvu:
-            logger.warning(" Transferencia omitida - No hay CVUs disponibles")
+            log_event(logger, "transfer_skipped", " Transferencia omitida - No hay CVUs disponibles", level=logging.WARNING)
             return
             
-        max_transfer = min(self.balance * 0.15, self.balance - 10.0)
-        transfer_amount = round(random.uniform(10.0, max_transfer), 2)
-        
         payload = {
             "payerCvu": self.cvu,
             "payeeCvu": destination_cvu,
@@ -328,21 +837,21 @@ class WalletUserFlow(TaskSet):
                     if response_data.get("status") == "COMPLETED":
                         self.balance -= transfer_amount
                         response.success()
-                        logger.info(f" Transferencia realizada: ${transfer_amount} a CVU {destination_cvu}")
+                        log_event(logger, "transfer_ok", " Transferencia realizada: $%s a CVU %s", transfer_amount, destination_cvu)
                     else:
                         response.failure(f"Estado de transacción inesperado: {response_data.get('status')}")
                 except Exception as e:
                     response.failure(f"Error al parsear respuesta de transferencia: {e}")
             elif response.status_code == 404:
                 response.success()
-                logger.info(f" CVU destino no encontrado - Error esperado")
+                log_event(logger, "transfer_payee_not_found", " CVU destino no encontrado - Error esperado")
             else:
                 response.failure(f"Transferencia falló ({response.status_code}): {response.text}")
+        self._journey_step("transfer", response)
 
-    @task(5)
     def step_7_get_transaction_history(self):
         if not self.cvu or not self.auth_token:
-            logger.warning(" Consulta de historial omitida - CVU o token faltante")
+            log_event(logger, "history_skipped", " Consulta de historial omitida - CVU o token faltante", level=logging.WARNING)
             return
             
         with self.client.get(
@@ -353,27 +862,83 @@ class WalletUserFlow(TaskSet):
         ) as response:
             if response.status_code == 200:
                 try:
-                    data = response.json()
-                    transaction_count = len(data) if isinstance(data, list) else 0
+                    if HISTORY_VALIDATION == "full":
+                        data = response.json()
+                        transaction_count = len(data) if isinstance(data, list) else 0
+                    else:
+                        transaction_count = validate_history(response.content, HISTORY_VALIDATION)
                     response.success()
-                    logger.info(f" Historial consultado: {transaction_count} transacciones")
+                    log_event(logger, "history_ok", " Historial consultado: %s transacciones", transaction_count)
                 except Exception as e:
                     response.failure(f"Error al parsear historial: {e}")
             else:
                 response.failure(f"Consulta de historial falló ({response.status_code}): {response.text}")
 
     def on_stop(self):
-        logger.info(f"🏁 Flujo completado para usuario: {self.user_email}")
-        logger.info(f"   CVU: {self.cvu}")
-        logger.info(f"   Saldo final: ${self.balance}")
+        log_event(logger, "flow_stop", "🏁 Flujo completado para usuario: %s\n   CVU: %s\n   Saldo final: $%s",
+                  self.user_email, self.cvu, self.balance)
+        # El token se descarta con el slot: el cache no crece con el churn de usuarios
+        if self.user_email:
+            token_cache.invalidate(self.user_email)
+        user_states.release(self._slot)
+
+# La mezcla sale del perfil: lista expandida por peso (o en orden si es secuencial)
+WalletUserFlow.tasks = workload.expand_tasks({
+    "register": WalletUserFlow.step_1_register_user,
+    "login": WalletUserFlow.step_2_login_user,
+    "balance": WalletUserFlow.step_3_check_balance,
+    "deposit": WalletUserFlow.step_4_make_deposit,
+    "withdrawal": WalletUserFlow.step_5_make_withdrawal,
+    "transfer": WalletUserFlow.step_6_make_p2p_transfer,
+    "history": WalletUserFlow.step_7_get_transaction_history,
+})
+
+class WalletHttpUser(HttpUser):
+    """HttpUser con el desglose de tiempos y el modo de conexión de request_timing.py.
+
+    CONNECTION_MODE elige keepalive (default), close o shared (pool de SHARED_POOL_SIZE
+    conexiones por worker). REQUEST_TIMING=0 deja el adapter de Locust en modo keepalive.
+    Con TRACE_RECORD cada request queda grabado en la traza bajo un id lógico del usuario.
+    """
+    abstract = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if REQUEST_TIMING or CONNECTION_MODE != "keepalive":
+            instrument_session(self.client, CONNECTION_MODE, SHARED_POOL_SIZE)
+        if trace_recorder:
+            worker_index = getattr(self.environment.runner, "worker_index", 0)
+            trace_session(self.client, trace_recorder, f"{worker_index}.{next(_trace_user_ids)}")
+
+class WalletUser(WalletHttpUser):
+    tasks = [WalletUserFlow]
+    wait_time = between(*workload.pacing["normal"])
+    host = "http://localhost:8080"
+
+class StressWalletUser(WalletHttpUser):
+    tasks = [WalletUserFlow]
+    wait_time = between(*workload.pacing["stress"])
+    host = "http://localhost:8080"
+
+class WalletFastHttpUser(FastHttpUser):
+    """FastHttpUser con el X-Correlation-ID, el modo de conexión, los contadores de conexiones
+    y la grabación de trazas de WalletHttpUser."""
+    abstract = True
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        instrument_fast_session(self.client, CONNECTION_MODE, SHARED_POOL_SIZE)
+        if trace_recorder:
+            worker_index = getattr(self.environment.runner, "worker_index", 0)
+            trace_session(self.client, trace_recorder, f"{worker_index}.{next(_trace_user_ids)}")
 
-class WalletUser(HttpUser):
+class FastWalletUser(WalletFastHttpUser):
     tasks = [WalletUserFlow]
-    wait_time = between(1, 3)
+    wait_time = between(*workload.pacing["normal"])
     host = "http://localhost:8080"
 
-class StressWalletUser(HttpUser):
+class FastStressWalletUser(WalletFastHttpUser):
     tasks = [WalletUserFlow]
-    wait_time = between(0.1, 0.5)
+    wait_time = between(*workload.pacing["stress"])
     host = "http://localhost:8080"
 
@@ -0,0 +1,56 @@
+"""
+Usuario sin espera para medir el techo del harness contra null_backend.py.
+
+BENCH_TASK=mix usa el mix completo de WalletUserFlow; con el nombre de una
+tarea (register, login, balance, deposit, withdrawal, transfer, history)
+cada usuario se registra una vez y después ejecuta solo esa tarea.
+"""
+import os
+
+from locust import HttpUser, FastHttpUser, constant
+
+from locustfile import WalletUserFlow, generate_unique_email
+
+BENCH_TASK = os.getenv("BENCH_TASK", "mix")
+NULL_BACKEND_BALANCE = 1_000_000.0
+
+def _register_again(flow: WalletUserFlow):
+    flow.user_email = generate_unique_email()
+    flow.auth_token = None
+    flow.cvu = None
+    flow.step_1_register_user()
+
+def _with_funds(step):
+    # El backend nulo tiene fondos infinitos: evitar que el saldo local frene retiros y transferencias
+    def run(flow: WalletUserFlow):
+        flow.balance = NULL_BACKEND_BALANCE
+        step(flow)
+    return run
+
+ISOLATED_TASKS = {
+    "register": _register_again,
+    "login": WalletUserFlow._login,
+    "balance": WalletUserFlow.step_3_check_balance,
+    "deposit": WalletUserFlow.step_4_make_deposit,
+    "withdrawal": _with_funds(WalletUserFlow.step_5_make_withdrawal),
+    "transfer": _with_funds(WalletUserFlow.step_6_make_p2p_transfer),
+    "history": WalletUserFlow.step_7_get_transaction_history,
+}
+
+class IsolatedTaskFlow(WalletUserFlow):
+    def on_start(self):
+        super().on_start()
+        self.step_1_register_user()
+
+if BENCH_TASK != "mix":
+    IsolatedTaskFlow.tasks = [ISOLATED_TASKS[BENCH_TASK]]
+
+class CeilingWalletUser(HttpUser):
+    tasks = [WalletUserFlow if BENCH_TASK == "mix" else IsolatedTaskFlow]
+    wait_time = constant(0)
+    host = "http://127.0.0.1:8081"
+
+class FastCeilingWalletUser(FastHttpUser):
+    tasks = [WalletUserFlow if BENCH_TASK == "mix" else IsolatedTaskFlow]
+    wait_time = constant(0)
+    host = "http://127.0.0.1:8081"
@@ -0,0 +1,93 @@
+"""
+Backend nulo: responde al instante con respuestas enlatadas con la forma de la API
+de PlataYa (/api/v1/user, /wallet, /transaction). Sirve para medir el techo del
+propio harness de Locust sin que el backend real sea el cuello de botella.
+
+Con --external-failure-rate los depósitos y retiros responden 503 con esa probabilidad,
+como el backend real cuando ExternalWalletClient da timeout (sirve para RETRY_POLICY).
+
+Uso: python null_backend.py --port 8081 [--processes 2] [--history-size 20] [--external-failure-rate 0.1]
+"""
+import argparse
+import base64
+import itertools
+import json
+import random
+import time
+from typing import Dict, Tuple
+
+import async_http
+from async_http import Payload
+
+def fake_token(email: str, ttl: float = 86400.0) -> str:
+    def b64(data: dict) -> str:
+        return base64.urlsafe_b64encode(json.dumps(data).encode()).rstrip(b"=").decode()
+    now = int(time.time())
+    return f"{b64({'alg': 'HS256'})}.{b64({'sub': email, 'iat': now, 'exp': now + int(ttl)})}.null"
+
+class NullBackend:
+    def __init__(self, history_size: int, external_failure_rate: float = 0.0):
+        self.external_failure_rate = external_failure_rate
+        self._cvus = itertools.count(10000000000 + int(time.time()) % 10000000 * 1000)
+        self._ids = itertools.count(1)
+        self._by_mail: Dict[str, int] = {}
+        self._history = json.dumps([
+            {"transactionId": i, "type": "P2P", "amount": 10.0, "currency": "ARS", "status": "COMPLETED",
+             "createdAt": "2025-01-01T00:00:00", "payerCvu": 10000000001, "payeeCvu": 10000000002}
+            for i in range(history_size)
+        ]).encode()
+
+    def user(self, body: dict) -> dict:
+        mail = body.get("mail", "")
+        cvu = self._by_mail.setdefault(mail, next(self._cvus))
+        return {"name": body.get("name", "Test"), "lastname": body.get("lastname", "User"),
+                "mail": mail, "token": fake_token(mail), "cvu": cvu}
+
+    def transaction(self, kind: str, body: dict) -> dict:
+        if kind == "transfer":
+            return {"transactionId": next(self._ids), "type": "P2P", "amount": body.get("amount"),
+                    "currency": "ARS", "status": "COMPLETED", "createdAt": "2025-01-01T00:00:00",
+                    "payerCvu": body.get("payerCvu"), "payeeCvu": body.get("payeeCvu")}
+        return {"transactionId": next(self._ids), "type": kind.upper(), "sourceCvu": body.get("sourceCvu"),
+                "destinationCvu": body.get("destinationCvu"), "externalReference": body.get("externalReference"),
+                "amount": body.get("amount"), "currency": "ARS", "status": "COMPLETED",
+                "createdAt": "2025-01-01T00:00:00"}
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, Payload]:
+        parts = path.strip("/").split("/")
+        if parts[:2] != ["api", "v1"] or len(parts) < 4:
+            return 404, {"error": f"Unknown endpoint {method} {path}"}
+        resource, action = parts[2], parts[3]
+        data = json.loads(body) if body else {}
+
+        if resource == "user" and action in ("register", "login"):
+            return 200, self.user(data)
+        if resource == "wallet" and action == "balance":
+            return 200, {"cvu": int(parts[4]), "balance": 1_000_000.0}
+        if resource == "wallet" and action == "all":
+            return 200, {"wallets": [{"userMail": mail, "cvu": cvu, "balance": 1_000_000.0}
+                                     for mail, cvu in self._by_mail.items()]}
+        if resource == "transaction" and action in ("deposit", "withdrawal") and \
+                random.random() < self.external_failure_rate:
+            return 503, {"error": "External wallet service timeout"}
+        if resource == "transaction" and action in ("deposit", "withdrawal", "transfer"):
+            return 201, self.transaction(action, data)
+        if resource == "transaction" and parts[-1] == "history":
+            return 200, self._history
+        return 404, {"error": f"Unknown endpoint {method} {path}"}
+
+def main():
+    parser = argparse.ArgumentParser(description="Backend nulo con respuestas enlatadas")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--history-size", type=int, default=20)
+    parser.add_argument("--external-failure-rate", type=float, default=0.0,
+                        help="Probabilidad de 503 en depósitos y retiros")
+    args = parser.parse_args()
+
+    print(f"🕳️ Backend nulo en http://{args.host}:{args.port} ({args.processes} procesos)", flush=True)
+    async_http.run(lambda: NullBackend(args.history_size, args.external_failure_rate).dispatch, args.host, args.port, args.processes)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+Modo de modelo abierto: tasa de llegada constante por endpoint.
+
+Los usuarios de OpenModelWalletUser solo aportan identidades (registro o fixture
+aprovisionado). Un planificador por worker dispara cada endpoint a la tasa
+configurada sin esperar respuestas, así la carga ofrecida no baja cuando el
+backend se pone lento. La latencia se mide desde el instante de envío previsto
+(corrección de coordinated omission), no desde el envío real.
+
+Cada llegada toma un usuario libre y lo devuelve al terminar, así un usuario nunca tiene
+dos requests en vuelo (su sesión y su saldo no se pisan). Una llegada que no encuentra
+usuario libre, o que supera OPEN_MODEL_MAX_INFLIGHT, se reporta como falla en
+"⏱️ Open model overflow": la carga ofrecida que no se pudo enviar queda a la vista.
+Lo mismo una llegada cuya tarea no envía ningún request (retiro o transferencia sin
+saldo, transferencia sin payees).
+Los planificadores arrancan cuando el primer usuario queda listo (registrado o tomado
+del fixture), así el registro inicial no cuenta como carga perdida.
+
+El master reparte la tasa en partes iguales entre los workers conectados y la vuelve a
+repartir cuando entra o sale un worker durante la corrida.
+
+  OPEN_MODEL_RATES="balance=40,deposit=20,withdrawal=10,transfer=15,history=25,login=2"
+                           req/s por endpoint para todo el cluster
+  OPEN_MODEL_ARRIVALS      poisson (default) | uniform
+  OPEN_MODEL_MAX_INFLIGHT  tope de requests en vuelo por worker; el excedente se reporta como falla
+  OPEN_MODEL_REBALANCE_INTERVAL  segundos entre chequeos de la cantidad de workers (default 2)
+
+Uso: locust -f open_model.py --headless -u 500 -r 100 OpenModelWalletUser
+"""
+import os
+import random
+import time
+from typing import Callable, Dict, List, Optional
+
+import gevent
+from gevent.event import Event
+from gevent.local import local
+from locust import constant, events
+from locust.runners import MasterRunner, WorkerRunner
+
+from locustfile import WalletHttpUser, WalletUserFlow, logger
+
+OPEN_MODEL_RATES = os.getenv("OPEN_MODEL_RATES", "balance=40,deposit=20,withdrawal=10,transfer=15,history=25,login=2")
+OPEN_MODEL_ARRIVALS = os.getenv("OPEN_MODEL_ARRIVALS", "poisson")
+OPEN_MODEL_MAX_INFLIGHT = int(os.getenv("OPEN_MODEL_MAX_INFLIGHT", "1000"))
+OPEN_MODEL_REBALANCE_INTERVAL = float(os.getenv("OPEN_MODEL_REBALANCE_INTERVAL", "2"))
+MSG_OPEN_MODEL_SHARE = "open_model_share"
+
+ENDPOINT_TASKS: Dict[str, Callable[[WalletUserFlow], None]] = {
+    "login": WalletUserFlow._login,
+    "balance": WalletUserFlow.step_3_check_balance,
+    "deposit": WalletUserFlow.step_4_make_deposit,
+    "withdrawal": WalletUserFlow.step_5_make_withdrawal,
+    "transfer": WalletUserFlow.step_6_make_p2p_transfer,
+    "history": WalletUserFlow.step_7_get_transaction_history,
+}
+
+def parse_rates(spec: str) -> Dict[str, float]:
+    rates = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        endpoint, rate = item.split("=")
+        if endpoint not in ENDPOINT_TASKS:
+            raise ValueError(f"Endpoint desconocido en OPEN_MODEL_RATES: {endpoint}")
+        rates[endpoint] = float(rate)
+    return rates
+
+_intended = local()
+# Usuarios listos y libres: cada llegada saca uno y lo devuelve al terminar
+ready_flows: List["OpenModelFlow"] = []
+_flow_count = 0
+# Los planificadores arrancan con el primer usuario listo, no con test_start
+users_ready = Event()
+_schedulers: List[gevent.Greenlet] = []
+_rebalancer: Optional[gevent.Greenlet] = None
+_inflight = 0
+rate_scale = 1.0
+
+class IntendedStartRequestEvent:
+    """Envuelve el evento request del cliente y suma la espera entre el envío previsto y el real."""
+    def __init__(self, event):
+        self._event = event
+
+    def fire(self, **kwargs):
+        _intended.requests = getattr(_intended, "requests", 0) + 1
+        intended_start = getattr(_intended, "start", None)
+        if intended_start is not None and kwargs.get("start_time"):
+            kwargs["response_time"] += max(0.0, kwargs["start_time"] - intended_start) * 1000
+        return self._event.fire(**kwargs)
+
+def _checkout_flow() -> Optional["OpenModelFlow"]:
+    """Saca un usuario libre al azar (swap-remove, O(1)) o None si no hay."""
+    if not ready_flows:
+        return None
+    index = random.randrange(len(ready_flows))
+    ready_flows[index], ready_flows[-1] = ready_flows[-1], ready_flows[index]
+    flow = ready_flows.pop()
+    flow.open_model_busy = True
+    return flow
+
+def _return_flow(flow: "OpenModelFlow") -> None:
+    flow.open_model_busy = False
+    if flow.open_model_ready:
+        ready_flows.append(flow)
+    elif flow.open_model_stopped:
+        # Se detuvo con este request en vuelo: recién ahora se libera su estado
+        flow.release_state()
+
+def _report_overflow(environment, reason: str) -> None:
+    environment.events.request.fire(request_type="OPEN", name="⏱️ Open model overflow", response_time=0,
+                                    response_length=0, context={}, exception=Exception(reason))
+
+def _run_arrival(environment, flow: "OpenModelFlow", endpoint: str, intended_start: float):
+    global _inflight
+    _intended.start = intended_start
+    _intended.requests = 0
+    try:
+        ENDPOINT_TASKS[endpoint](flow)
+        if not _intended.requests:
+            # La tarea se salteó el request (saldo insuficiente, sin payees): la llegada se perdió
+            _report_overflow(environment, f"La llegada de {endpoint} no envió ningún request "
+                                          "(tarea omitida por saldo o payees)")
+    except Exception as e:
+        environment.events.request.fire(request_type="OPEN", name=f"⏱️ Open model {endpoint}", response_time=0,
+                                        response_length=0, exception=e, context={})
+    finally:
+        _inflight -= 1
+        _return_flow(flow)
+
+def _schedule(environment, endpoint: str, rate: float):
+    global _inflight
+    users_ready.wait()
+    next_at = time.time()
+    while True:
+        next_at += random.expovariate(rate) if OPEN_MODEL_ARRIVALS == "poisson" else 1.0 / rate
+        delay = next_at - time.time()
+        if delay > 0:
+            gevent.sleep(delay)
+        if _inflight >= OPEN_MODEL_MAX_INFLIGHT:
+            _report_overflow(environment, f"Más de {OPEN_MODEL_MAX_INFLIGHT} requests en vuelo")
+            continue
+        flow = _checkout_flow()
+        if flow is None:
+            _report_overflow(environment, f"Sin usuarios libres ({_flow_count} listos, todos con un request en vuelo)"
+                             if _flow_count else "Ningún usuario listo")
+            continue
+        _inflight += 1
+        gevent.spawn(_run_arrival, environment, flow, endpoint, next_at)
+
+def start_schedulers(environment, share: float):
+    stop_schedulers()
+    for endpoint, rate in parse_rates(OPEN_MODEL_RATES).items():
+        if rate * share > 0:
+            _schedulers.append(gevent.spawn(_schedule, environment, endpoint, rate * share))
+    logger.info("⏱️ Modelo abierto: %s req/s por endpoint (escala del worker %.3f)", OPEN_MODEL_RATES, share)
+
+def stop_schedulers():
+    gevent.killall(_schedulers)
+    _schedulers.clear()
+
+def _send_shares(runner: MasterRunner) -> int:
+    """Cada worker conectado dispara una fracción igual de la tasa total."""
+    workers = runner.worker_count
+    runner.send_message(MSG_OPEN_MODEL_SHARE, rate_scale / max(workers, 1))
+    return workers
+
+def _rebalance_shares(runner: MasterRunner, workers: int):
+    while True:
+        gevent.sleep(OPEN_MODEL_REBALANCE_INTERVAL)
+        if runner.worker_count != workers:
+            logger.info("⏱️ Modelo abierto: %s workers (antes %s), se reparte de nuevo la tasa",
+                        runner.worker_count, workers)
+            workers = _send_shares(runner)
+
+def set_rate_scale(environment, scale: float):
+    """Multiplica OPEN_MODEL_RATES (lo usa la búsqueda de capacidad en modo rate)."""
+    global rate_scale
+    rate_scale = scale
+    runner = environment.runner
+    if isinstance(runner, MasterRunner):
+        _send_shares(runner)
+    elif not isinstance(runner, WorkerRunner):
+        start_schedulers(environment, rate_scale)
+
+def _worker_on_share(environment, msg, **kwargs):
+    start_schedulers(environment, msg.data)
+
+@events.init.add_listener
+def setup_open_model(environment, **kwargs):
+    parse_rates(OPEN_MODEL_RATES)
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message(MSG_OPEN_MODEL_SHARE, _worker_on_share)
+
+@events.test_start.add_listener
+def start_open_model(environment, **kwargs):
+    global _rebalancer
+    runner = environment.runner
+    if isinstance(runner, MasterRunner):
+        if _rebalancer:
+            _rebalancer.kill()
+        # Los workers que entran o salen no disparan test_start: se chequea su cantidad periódicamente
+        _rebalancer = gevent.spawn(_rebalance_shares, runner, _send_shares(runner))
+    elif runner is not None and not isinstance(runner, WorkerRunner):
+        # Un worker que entra con la corrida en marcha recibe el spawn antes de que
+        # environment.runner quede asignado: runner es None y su parte llega del master
+        start_schedulers(environment, rate_scale)
+
+@events.test_stop.add_listener
+def stop_open_model(environment, **kwargs):
+    global _rebalancer
+    if _rebalancer:
+        _rebalancer.kill()
+        _rebalancer = None
+    stop_schedulers()
+    users_ready.clear()
+
+class OpenModelFlow(WalletUserFlow):
+    journeys = False
+    open_model_ready = False
+    open_model_busy = False
+    open_model_stopped = False
+
+    def on_start(self):
+        global _flow_count
+        super().on_start()
+        if not self.cvu:
+            self.step_1_register_user()
+        if self.cvu and self.auth_token:
+            self.open_model_ready = True
+            _flow_count += 1
+            ready_flows.append(self)
+            users_ready.set()
+
+    def on_stop(self):
+        global _flow_count
+        if self.open_model_ready:
+            self.open_model_ready = False
+            _flow_count -= 1
+            if self in ready_flows:
+                ready_flows.remove(self)
+        if self.open_model_busy:
+            # La llegada en vuelo sigue usando el slot de user_states: lo libera _return_flow
+            # cuando termina, así no lo pisa el usuario que reciba el slot reusado
+            self.open_model_stopped = True
+            return
+        self.release_state()
+
+    def release_state(self):
+        super().on_stop()
+
+    def idle(self):
+        pass
+
+OpenModelFlow.tasks = [OpenModelFlow.idle]
+
+class OpenModelWalletUser(WalletHttpUser):
+    tasks = [OpenModelFlow]
+    wait_time = constant(60)
+    host = "http://localhost:8080"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.client.request_event = IntendedStartRequestEvent(self.client.request_event)
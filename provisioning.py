@@ -0,0 +1,126 @@
+"""
+Pre-aprovisionamiento de usuarios de prueba.
+
+Registra N usuarios en paralelo, les hace el depósito inicial y guarda
+cvu/email/token en un fixture CSV comprimido que locustfile.py puede
+reutilizar con PROVISIONED_USERS_FILE para arrancar en estado estable.
+
+Uso: python provisioning.py --host http://localhost:8080 -n 100000 -o users.csv.gz
+"""
+import argparse
+import csv
+import gzip
+import logging
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import List, NamedTuple, Optional
+
+import requests
+
+USER_PASSWORD = "TestPassword124!"
+USER_NAME = "Test"
+USER_LASTNAME = "User"
+USER_DAY_OF_BIRTH = "1990-01-01"
+EXTERNAL_CVU = 200000000001
+INITIAL_DEPOSIT_AMOUNT = 1000.0
+
+logger = logging.getLogger('wallet_test')
+
+class ProvisionedUser(NamedTuple):
+    cvu: int
+    email: str
+    token: str
+
+def write_fixture(path: str, users: List[ProvisionedUser]) -> None:
+    with gzip.open(path, "wt", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(ProvisionedUser._fields)
+        writer.writerows(users)
+
+def load_fixture(path: str) -> List[ProvisionedUser]:
+    with gzip.open(path, "rt", newline="") as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return [ProvisionedUser(int(cvu), email, token) for cvu, email, token in reader]
+
+_local = threading.local()
+
+def _session() -> requests.Session:
+    if not hasattr(_local, "session"):
+        _local.session = requests.Session()
+    return _local.session
+
+def provision_user(host: str, email: str, timeout: float) -> Optional[ProvisionedUser]:
+    """Registra un usuario y le acredita el depósito inicial. None si algo falla."""
+    session = _session()
+    response = session.post(f"{host}/api/v1/user/register", json={
+        "name": USER_NAME,
+        "lastname": USER_LASTNAME,
+        "mail": email,
+        "password": USER_PASSWORD,
+        "dayOfBirth": USER_DAY_OF_BIRTH
+    }, timeout=timeout)
+    if not response.ok:
+        return None
+    data = response.json()
+    cvu, token = data.get("cvu"), data.get("token")
+    if not cvu or not token:
+        return None
+
+    if not deposit(host, int(cvu), token, INITIAL_DEPOSIT_AMOUNT, timeout):
+        return None
+    return ProvisionedUser(int(cvu), email, token)
+
+def deposit(host: str, cvu: int, token: str, amount: float, timeout: float) -> bool:
+    """Acredita amount desde la billetera externa; True si la transacción quedó COMPLETED."""
+    response = _session().post(f"{host}/api/v1/transaction/deposit", json={
+        "sourceCvu": EXTERNAL_CVU,
+        "destinationCvu": cvu,
+        "amount": amount,
+        "currency": "ARS",
+        "externalReference": f"REF_{uuid.uuid4().hex[:8]}"
+    }, headers={"Authorization": f"Bearer {token}"}, timeout=timeout)
+    return response.status_code in [200, 201] and response.json().get("status") == "COMPLETED"
+
+def seed(host: str, count: int, concurrency: int, timeout: float) -> List[ProvisionedUser]:
+    run_id = int(time.time())
+    users: List[ProvisionedUser] = []
+    failures = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(provision_user, host, f"seed{run_id}_{i}@example.com", timeout)
+            for i in range(count)
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            try:
+                user = future.result()
+            except requests.RequestException:
+                user = None
+            if user:
+                users.append(user)
+            else:
+                failures += 1
+            if done % 1000 == 0:
+                logger.info("⏳ %s/%s procesados (%s fallidos)", done, count, failures)
+    return users
+
+def main():
+    parser = argparse.ArgumentParser(description="Registra y fondea usuarios de prueba antes de la corrida")
+    parser.add_argument("--host", default="http://localhost:8080")
+    parser.add_argument("-n", "--count", type=int, default=1000)
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("-o", "--output", default="provisioned_users.csv.gz")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
+    start = time.perf_counter()
+    users = seed(args.host.rstrip("/"), args.count, args.concurrency, args.timeout)
+    write_fixture(args.output, users)
+    elapsed = time.perf_counter() - start
+    print(f"✅ {len(users)}/{args.count} usuarios aprovisionados en {elapsed:.1f}s -> {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+"""
+Desglose de tiempos y política de conexiones para los usuarios basados en requests (HttpUser)
+y en geventhttpclient (FastHttpUser).
+
+TimedHTTPAdapter reemplaza el adapter de la sesión de Locust y deja en cada
+respuesta un atributo timing con:
+
+  connect    ms abriendo la conexión TCP (+TLS), 0 si se reusó una conexión del pool
+  tls        ms del handshake TLS (solo https)
+  pool_wait  ms esperando una conexión libre del pool (solo cuenta en modo shared)
+  ttfb       ms desde el envío hasta tener los headers de respuesta (incluye connect y pool_wait)
+  body       ms descargando el cuerpo
+
+Cada request lleva además un header X-Correlation-ID único, que el backend agrega
+a sus líneas de log, para cruzar requests lentos con lo que pasó del lado servidor.
+instrument_fast_session agrega el mismo header, el modo de conexión y los contadores
+a los requests de FastHttpUser (sin el desglose de fases).
+
+Modos de conexión (CONNECTION_MODES):
+
+  keepalive  cada usuario reusa sus conexiones persistentes (lo que hace requests por defecto)
+  close      una conexión nueva por request con "Connection: close", como clientes móviles
+  shared     un pool acotado compartido por todos los usuarios del proceso; si no hay
+             conexión libre el request espera (pool_wait)
+
+connection_stats cuenta conexiones abiertas y cerradas, requests y el tiempo total de
+establecimiento; open_connections/peak_connections son las conexiones abiertas ahora y el
+máximo de la corrida en este proceso.
+"""
+import time
+import uuid
+from collections import Counter
+from typing import Optional
+
+from gevent.local import local
+from geventhttpclient.client import HTTPClientPool
+from geventhttpclient.connectionpool import ConnectionPool, SSLConnectionPool
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.connection import HTTPConnection, HTTPSConnection
+
+CORRELATION_HEADER = "X-Correlation-ID"
+CONNECTION_MODES = ("keepalive", "close", "shared")
+
+_current = local()
+connection_stats: Counter = Counter()
+open_connections = 0
+peak_connections = 0
+
+def _add(attribute: str, seconds: float) -> None:
+    setattr(_current, attribute, getattr(_current, attribute, 0.0) + seconds)
+
+def drain_connection_stats() -> dict:
+    """Contadores acumulados desde el último drenado más el pico de conexiones abiertas."""
+    global peak_connections
+    drained = dict(connection_stats, peak_open=peak_connections)
+    connection_stats.clear()
+    peak_connections = open_connections
+    return drained
+
+class _TimedConnectionMixin:
+    def connect(self):
+        global open_connections, peak_connections
+        start = time.perf_counter()
+        super().connect()
+        elapsed = time.perf_counter() - start
+        _add("connect", elapsed)
+        connection_stats["opened"] += 1
+        connection_stats["connect_us"] += int(elapsed * 1_000_000)
+        open_connections += 1
+        peak_connections = max(peak_connections, open_connections)
+
+    def close(self):
+        global open_connections
+        if self.sock is not None:
+            open_connections -= 1
+            connection_stats["closed"] += 1
+        super().close()
+
+class TimedHTTPConnection(_TimedConnectionMixin, HTTPConnection):
+    pass
+
+class TimedHTTPSConnection(_TimedConnectionMixin, HTTPSConnection):
+    def _new_conn(self):
+        start = time.perf_counter()
+        sock = super()._new_conn()
+        _add("tcp", time.perf_counter() - start)
+        return sock
+
+class _TimedPoolMixin:
+    # Si True, la conexión se cierra al devolverla en vez de quedar disponible para reuso
+    close_after_use = False
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        conn = super()._get_conn(timeout)
+        _add("pool_wait", time.perf_counter() - start)
+        return conn
+
+    def _put_conn(self, conn):
+        if self.close_after_use and conn is not None:
+            conn.close()
+        super()._put_conn(conn)
+
+class TimedHTTPConnectionPool(_TimedPoolMixin, HTTPConnectionPool):
+    ConnectionCls = TimedHTTPConnection
+
+class TimedHTTPSConnectionPool(_TimedPoolMixin, HTTPSConnectionPool):
+    ConnectionCls = TimedHTTPSConnection
+
+class ClosingHTTPConnectionPool(TimedHTTPConnectionPool):
+    close_after_use = True
+
+class ClosingHTTPSConnectionPool(TimedHTTPSConnectionPool):
+    close_after_use = True
+
+class RequestTiming:
+    __slots__ = ("connect", "tls", "pool_wait", "ttfb", "body", "correlation_id")
+
+    def __init__(self, connect: float, tls: float, pool_wait: float, ttfb: float, body: float,
+                 correlation_id: str):
+        self.connect = connect
+        self.tls = tls
+        self.pool_wait = pool_wait
+        self.ttfb = ttfb
+        self.body = body
+        self.correlation_id = correlation_id
+
+class TimedHTTPAdapter(HTTPAdapter):
+    def __init__(self, mode: str = "keepalive", **kwargs):
+        if mode not in CONNECTION_MODES:
+            raise ValueError(f"Modo de conexión desconocido: {mode} ({', '.join(CONNECTION_MODES)})")
+        self.mode = mode
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        if self.mode == "close":
+            pools = {"http": ClosingHTTPConnectionPool, "https": ClosingHTTPSConnectionPool}
+        else:
+            pools = {"http": TimedHTTPConnectionPool, "https": TimedHTTPSConnectionPool}
+        self.poolmanager.pool_classes_by_scheme = pools
+
+    def send(self, request, stream=False, **kwargs):
+        correlation_id = request.headers.setdefault(CORRELATION_HEADER, uuid.uuid4().hex)
+        if self.mode == "close":
+            request.headers["Connection"] = "close"
+        _current.connect = _current.tcp = _current.pool_wait = 0.0
+        connection_stats["requests"] += 1
+        start = time.perf_counter()
+        response = super().send(request, stream=stream, **kwargs)
+        headers_at = time.perf_counter()
+        if not stream:
+            # Se lee acá (requests lo haría justo después) para medir solo la descarga del cuerpo
+            response.content
+        connect, tcp = _current.connect, _current.tcp
+        response.timing = RequestTiming(
+            connect=connect * 1000, tls=(connect - tcp) * 1000 if tcp else 0.0,
+            pool_wait=_current.pool_wait * 1000, ttfb=(headers_at - start) * 1000,
+            body=(time.perf_counter() - headers_at) * 1000, correlation_id=correlation_id)
+        return response
+
+_shared_adapter: Optional[TimedHTTPAdapter] = None
+
+def instrument_session(session, mode: str = "keepalive", shared_pool_size: int = 10) -> None:
+    """Monta TimedHTTPAdapter en una sesión de requests (p. ej. HttpUser.client).
+
+    En modo shared todas las sesiones del proceso montan el mismo adapter, con un pool
+    de shared_pool_size conexiones por host que bloquea cuando se agota.
+    """
+    global _shared_adapter
+    if mode == "shared":
+        if _shared_adapter is None:
+            _shared_adapter = TimedHTTPAdapter(mode, pool_maxsize=shared_pool_size, pool_block=True)
+        adapter = _shared_adapter
+    else:
+        adapter = TimedHTTPAdapter(mode)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+def response_timing(response) -> Optional[RequestTiming]:
+    return getattr(response, "timing", None)
+
+class _CountedSocketPoolMixin:
+    """Contadores de conexiones para los pools de sockets de geventhttpclient (FastHttpUser)."""
+    # Si True, el socket se cierra al devolverlo en vez de quedar disponible para reuso
+    close_after_use = False
+
+    def _create_socket(self):
+        global open_connections, peak_connections
+        start = time.perf_counter()
+        sock = super()._create_socket()
+        elapsed = time.perf_counter() - start
+        connection_stats["opened"] += 1
+        connection_stats["connect_us"] += int(elapsed * 1_000_000)
+        open_connections += 1
+        peak_connections = max(peak_connections, open_connections)
+        return sock
+
+    def _count_closed(self) -> None:
+        global open_connections
+        open_connections -= 1
+        connection_stats["closed"] += 1
+
+    def _is_socket_alive(self, sock):
+        alive = super()._is_socket_alive(sock)
+        if not alive and sock is not None:
+            # get_socket lo cierra y abre otro
+            self._count_closed()
+        return alive
+
+    def return_socket(self, sock):
+        if self.close_after_use:
+            self.release_socket(sock)
+            return
+        if self._closed:
+            self._count_closed()
+        super().return_socket(sock)
+
+    def release_socket(self, sock):
+        self._count_closed()
+        super().release_socket(sock)
+
+    def close(self):
+        for _ in range(self._socket_queue.qsize()):
+            self._count_closed()
+        super().close()
+
+class CountedConnectionPool(_CountedSocketPoolMixin, ConnectionPool):
+    pass
+
+class CountedSSLConnectionPool(_CountedSocketPoolMixin, SSLConnectionPool):
+    pass
+
+_COUNTED_POOLS = {ConnectionPool: CountedConnectionPool, SSLConnectionPool: CountedSSLConnectionPool}
+
+class CountedHTTPClientPool(HTTPClientPool):
+    """HTTPClientPool cuyos clientes cuentan sus conexiones en connection_stats.
+
+    HTTPClient crea su ConnectionPool sin dejar elegir la clase, así que al crear
+    cada cliente se le cambia la clase del pool por la versión con contadores.
+    """
+
+    def __init__(self, mode: str = "keepalive", **kwargs):
+        if mode not in CONNECTION_MODES:
+            raise ValueError(f"Modo de conexión desconocido: {mode} ({', '.join(CONNECTION_MODES)})")
+        self.mode = mode
+        super().__init__(**kwargs)
+
+    def get_client(self, url):
+        client = super().get_client(url)
+        pool = client._connection_pool
+        counted = _COUNTED_POOLS.get(type(pool))
+        if counted is not None:
+            pool.__class__ = counted
+            pool.close_after_use = self.mode == "close"
+        return client
+
+_shared_client_pool: Optional[CountedHTTPClientPool] = None
+
+def instrument_fast_session(session, mode: str = "keepalive", shared_pool_size: int = 10) -> None:
+    """Aplica a un FastHttpSession (FastHttpUser.client) lo que TimedHTTPAdapter hace con requests:
+    X-Correlation-ID por request, el modo de conexión y los contadores de connection_stats.
+
+    En modo shared todas las sesiones del proceso usan el mismo CountedHTTPClientPool,
+    con shared_pool_size conexiones por host; si no hay una libre el request espera.
+    No hay desglose de fases: geventhttpclient no separa ttfb de la descarga del cuerpo.
+    """
+    global _shared_client_pool
+    agent = session.client
+    client_args = agent.clientpool.client_args
+    if mode == "shared":
+        if _shared_client_pool is None:
+            _shared_client_pool = CountedHTTPClientPool(mode, **dict(client_args, concurrency=shared_pool_size))
+        agent.clientpool = _shared_client_pool
+    else:
+        agent.clientpool = CountedHTTPClientPool(mode, **client_args)
+    request = session.request
+
+    def instrumented_request(method, url, *args, headers=None, **kwargs):
+        headers = dict(headers or {})
+        headers.setdefault(CORRELATION_HEADER, uuid.uuid4().hex)
+        if mode == "close":
+            headers["Connection"] = "close"
+        connection_stats["requests"] += 1
+        return request(method, url, *args, headers=headers, **kwargs)
+
+    session.request = instrumented_request
@@ -0,0 +1,153 @@
+"""
+Grabación de trazas de requests para reproducirlas con trace_replay.py.
+
+Una traza es un JSONL comprimido con gzip. La primera línea es el encabezado
+{"trace": 1, "started_at": <epoch>, "source": "<proceso>"} y cada línea siguiente
+es un request en forma de lista:
+
+  [offset_s, usuario, método, nombre, path, body, status, response_ms, auth]
+
+  offset_s     segundos desde started_at hasta el envío
+  usuario      id lógico del usuario de Locust que lo emitió ("<worker>.<n>")
+  body         JSON enviado (o null)
+  auth         1 si llevaba Authorization: Bearer del propio usuario
+
+Con TRACE_RECORD=<ruta> locustfile.py graba cada request emitido por los WalletHttpUser y
+WalletFastHttpUser. En master/worker cada worker escribe su propio archivo (<ruta>.w<índice>);
+trace_replay.py acepta varias rutas o un patrón glob y las une por tiempo absoluto.
+"""
+import glob
+import gzip
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+TRACE_VERSION = 1
+CVU_FIELDS = ("cvu", "payerCvu", "payeeCvu", "sourceCvu", "destinationCvu")
+# Dónde aparece el CVU del propio usuario: en el path de saldo/historial o en un campo del body
+OWNER_PATHS = ("/api/v1/wallet/balance/", "/api/v1/transaction/")
+OWNER_FIELDS = {"/api/v1/transaction/transfer": "payerCvu", "/api/v1/transaction/withdrawal": "sourceCvu",
+                "/api/v1/transaction/deposit": "destinationCvu"}
+
+class TraceRecorder:
+    def __init__(self, path: str, source: str = "local"):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.started_at = time.time()
+        self.count = 0
+        self._file = gzip.open(path, "wt", compresslevel=6)
+        self._file.write(json.dumps({"trace": TRACE_VERSION, "started_at": self.started_at, "source": source}) + "\n")
+
+    def record(self, sent_at: float, user: str, method: str, name: str, path: str, body, status: int,
+               response_ms: float, auth: bool) -> None:
+        if self._file is None:
+            return
+        self._file.write(json.dumps([round(sent_at - self.started_at, 4), user, method, name, path, body, status,
+                                     round(response_ms, 2), int(auth)], ensure_ascii=False,
+                                    separators=(",", ":")) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+def trace_session(session, recorder: TraceRecorder, user: str) -> None:
+    """Envuelve session.request (HttpSession o FastHttpSession de Locust) para grabar cada request en recorder."""
+    request = session.request
+
+    def traced_request(method, url, *args, **kwargs):
+        sent_at = time.time()
+        start = time.perf_counter()
+        response = request(method, url, *args, **kwargs)
+        # FastHttpSession.post pasa json y data siempre, uno de los dos en None
+        body = kwargs.get("json")
+        if body is None:
+            body = kwargs.get("data")
+        if isinstance(body, bytes):
+            body = body.decode(errors="replace")
+        auth = "Authorization" in (kwargs.get("headers") or {})
+        recorder.record(sent_at, user, method, kwargs.get("name") or url, url, body,
+                        response.status_code or 0, (time.perf_counter() - start) * 1000, auth)
+        return response
+
+    session.request = traced_request
+
+@dataclass
+class TraceRecord:
+    offset: float
+    user: str
+    method: str
+    name: str
+    path: str
+    body: object
+    status: int
+    response_ms: float
+    auth: bool
+
+@dataclass
+class Trace:
+    records: Dict[str, List[TraceRecord]] = field(default_factory=dict)   # por usuario, en orden
+    owners: Dict[str, int] = field(default_factory=dict)                  # usuario -> CVU grabado
+    duration: float = 0.0
+
+    @property
+    def users(self) -> List[str]:
+        return sorted(self.records)
+
+    @property
+    def total(self) -> int:
+        return sum(len(records) for records in self.records.values())
+
+def _expand(paths: str) -> List[str]:
+    files: List[str] = []
+    for pattern in filter(None, (part.strip() for part in paths.split(","))):
+        matches = sorted(glob.glob(pattern))
+        if not matches:
+            raise FileNotFoundError(f"No hay trazas que coincidan con {pattern}")
+        files.extend(matches)
+    return files
+
+def _owner_cvu(record: TraceRecord) -> Optional[int]:
+    """CVU propio del usuario según un request autenticado: del path o del campo de la operación."""
+    if record.method == "GET" and record.path.startswith(OWNER_PATHS):
+        for segment in record.path.split("/"):
+            if segment.isdigit():
+                return int(segment)
+    owner_field = OWNER_FIELDS.get(record.path)
+    if owner_field and isinstance(record.body, dict) and record.body.get(owner_field):
+        return int(record.body[owner_field])
+    return None
+
+def load_trace(paths: str) -> Trace:
+    """Une una o más trazas (rutas separadas por coma o globs) en una línea de tiempo común."""
+    files = _expand(paths)
+    raw = []
+    for path in files:
+        with gzip.open(path, "rt") as f:
+            header = json.loads(f.readline())
+            if header.get("trace") != TRACE_VERSION:
+                raise ValueError(f"Versión de traza no soportada en {path}: {header.get('trace')}")
+            for line in f:
+                raw.append((header["started_at"], json.loads(line)))
+    trace = Trace()
+    if not raw:
+        return trace
+    origin = min(started_at for started_at, _ in raw)
+    for started_at, values in raw:
+        offset, *rest = values
+        record = TraceRecord(started_at + offset - origin, *rest)
+        record.auth = bool(record.auth)
+        trace.records.setdefault(record.user, []).append(record)
+    for user, records in trace.records.items():
+        records.sort(key=lambda r: r.offset)
+        trace.duration = max(trace.duration, records[-1].offset)
+        for record in records:
+            # Solo los requests con el token del propio usuario identifican su billetera
+            owner = _owner_cvu(record) if record.auth else None
+            if owner:
+                trace.owners[user] = owner
+                break
+    return trace
@@ -0,0 +1,145 @@
+"""
+Muestreo de recursos de los procesos del backend (JVM, Postgres) durante una corrida.
+
+Lee /proc en la máquina donde corre el master (o el runner local): CPU, RSS, threads
+y file descriptors abiertos de cada target, sumando todos los procesos que coinciden
+(Postgres usa un proceso por conexión). Los procesos de contenedores Docker del mismo
+host aparecen en el /proc del host, así que alcanza con correr Locust fuera del contenedor.
+
+  RESOURCE_TARGETS          "backend=java,postgres=postgres": nombre=texto a buscar en la
+                            línea de comando, o nombre=pid:1234. Vacío desactiva el muestreo
+  RESOURCE_SAMPLE_INTERVAL  segundos entre muestras (default 1)
+  RESOURCE_OUTPUT_DIR       directorio del CSV (default resource_results, vacío no escribe)
+
+Cada muestra va con los usuarios, req/s, fallas/s y p95 actuales de Locust en la misma
+fila, así los puntos de saturación de throughput se cruzan directo con el consumo de
+recursos. Las muestras se guardan también en el results store junto con la corrida.
+"""
+import csv
+import os
+import time
+from dataclasses import astuple, dataclass, fields
+from typing import Dict, List, Optional, Tuple
+
+RESOURCE_TARGETS = os.getenv("RESOURCE_TARGETS", "")
+RESOURCE_SAMPLE_INTERVAL = float(os.getenv("RESOURCE_SAMPLE_INTERVAL", "1.0"))
+RESOURCE_OUTPUT_DIR = os.getenv("RESOURCE_OUTPUT_DIR", "resource_results")
+
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK")
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+
+@dataclass
+class ResourceSample:
+    timestamp: float
+    target: str
+    processes: int
+    cpu_percent: float        # 100 = un core completo
+    rss_mb: float
+    threads: int
+    fds: Optional[int]        # None si no hay permiso para leer /proc/<pid>/fd
+    users: int
+    rps: float
+    fail_per_sec: float
+    p95_ms: Optional[float]
+
+def parse_targets(spec: str) -> Dict[str, str]:
+    targets = {}
+    for item in filter(None, (part.strip() for part in spec.split(","))):
+        name, sep, pattern = item.partition("=")
+        if not sep or not name or not pattern:
+            raise ValueError(f"Target de recursos inválido: {item} (nombre=patrón o nombre=pid:N)")
+        targets[name] = pattern
+    return targets
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as f:
+            return f.read().replace(b"\0", b" ").decode(errors="replace")
+    except OSError:
+        return ""
+
+def find_pids(pattern: str) -> List[int]:
+    if pattern.startswith("pid:"):
+        pid = int(pattern[4:])
+        return [pid] if os.path.exists(f"/proc/{pid}") else []
+    own = os.getpid()
+    return [pid for pid in (int(entry) for entry in os.listdir("/proc") if entry.isdigit())
+            if pid != own and pattern in _cmdline(pid)]
+
+def read_process(pid: int) -> Optional[Tuple[int, int, int, Optional[int]]]:
+    """(ticks de CPU user+system, páginas de RSS, threads, fds) o None si el proceso ya no existe."""
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            # El nombre del proceso va entre paréntesis y puede tener espacios
+            stat = f.read().rsplit(")", 1)[1].split()
+        with open(f"/proc/{pid}/statm") as f:
+            rss_pages = int(f.read().split()[1])
+    except (OSError, IndexError):
+        return None
+    try:
+        fds = len(os.listdir(f"/proc/{pid}/fd"))
+    except OSError:
+        fds = None
+    # Campos 14, 15 y 20 de /proc/<pid>/stat, contando desde el estado (campo 3)
+    return int(stat[11]) + int(stat[12]), rss_pages, int(stat[17]), fds
+
+class ResourceSampler:
+    def __init__(self, targets: Dict[str, str], output_path: Optional[str] = None):
+        self.targets = targets
+        self.output_path = output_path
+        self.samples: List[ResourceSample] = []
+        self._last_ticks: Dict[int, int] = {}
+        self._last_time: Optional[float] = None
+
+    def sample(self, users: int = 0, rps: float = 0.0, fail_per_sec: float = 0.0,
+               p95_ms: Optional[float] = None) -> List[ResourceSample]:
+        now = time.time()
+        elapsed = now - self._last_time if self._last_time else None
+        ticks_now: Dict[int, int] = {}
+        batch = []
+        for name, pattern in self.targets.items():
+            cpu_ticks = rss_pages = threads = 0
+            fds: Optional[int] = 0
+            processes = 0
+            for pid in find_pids(pattern):
+                values = read_process(pid)
+                if values is None:
+                    continue
+                ticks, pages, pid_threads, pid_fds = values
+                processes += 1
+                ticks_now[pid] = ticks
+                # Un proceso nuevo (p. ej. un backend de Postgres) solo aporta CPU desde su primera muestra
+                cpu_ticks += ticks - self._last_ticks.get(pid, ticks)
+                rss_pages += pages
+                threads += pid_threads
+                fds = None if fds is None or pid_fds is None else fds + pid_fds
+            cpu_percent = cpu_ticks / CLOCK_TICKS / elapsed * 100 if elapsed else 0.0
+            batch.append(ResourceSample(now, name, processes, round(cpu_percent, 1),
+                                        round(rss_pages * PAGE_SIZE / 2 ** 20, 1), threads, fds,
+                                        users, round(rps, 2), round(fail_per_sec, 2), p95_ms))
+        self._last_ticks = ticks_now
+        self._last_time = now
+        self.samples.extend(batch)
+        if self.output_path:
+            self._append_csv(batch)
+        return batch
+
+    def _append_csv(self, batch: List[ResourceSample]) -> None:
+        new_file = not os.path.exists(self.output_path)
+        with open(self.output_path, "a", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow([field.name for field in fields(ResourceSample)])
+            writer.writerows(astuple(sample) for sample in batch)
+
+    def peaks(self) -> Dict[str, dict]:
+        """Máximos por target de la corrida."""
+        summary: Dict[str, dict] = {}
+        for sample in self.samples:
+            peak = summary.setdefault(sample.target, {"cpu_percent": 0.0, "rss_mb": 0.0, "threads": 0, "fds": 0,
+                                                      "processes": 0})
+            for key in peak:
+                value = getattr(sample, key)
+                if value is not None:
+                    peak[key] = max(peak[key], value)
+        return summary
@@ -0,0 +1,275 @@
+"""
+Almacén local de resultados de corridas y gate de regresión de performance.
+
+locustfile.py guarda cada corrida headless en una base SQLite (RESULTS_DB, por
+defecto results/results.db): throughput, percentiles de latencia y tasa de error
+por endpoint, etiquetados con VERSION y el commit de git.
+
+  python results_store.py list [--limit 20]
+  python results_store.py show RUN
+  python results_store.py resources RUN [--target backend]
+  python results_store.py compare --baseline v1.0.3 [--candidate latest] [--tolerances tolerances.json]
+
+RUN es un id de corrida, "latest" o "v<VERSION>" (la última corrida de esa versión).
+compare sale con código 1 si algún endpoint empeora más que su tolerancia:
+p50/p95/p99/p999 y avg como aumento relativo, rps como caída relativa y
+error_rate como aumento absoluto (0.01 = un punto porcentual).
+
+Las tolerancias se pueden ajustar por endpoint con un JSON:
+  {"default": {"p95": 0.10, "p99": 0.15}, "💸 Make Withdrawal": {"p99": 0.25}}
+"""
+import argparse
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+RESULTS_DB = os.getenv("RESULTS_DB", os.path.join(HERE, "results", "results.db"))
+
+DEFAULT_TOLERANCES = {"rps": 0.10, "avg": 0.15, "p50": 0.15, "p95": 0.15, "p99": 0.20, "p999": 0.30,
+                      "error_rate": 0.005}
+HIGHER_IS_WORSE = ("avg", "p50", "p95", "p99", "p999")
+PERCENTILES = {"p50": 50, "p95": 95, "p99": 99, "p999": 99.9}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started_at REAL NOT NULL,
+    ended_at REAL NOT NULL,
+    version TEXT NOT NULL,
+    git_commit TEXT NOT NULL,
+    host TEXT,
+    user_classes TEXT,
+    users INTEGER,
+    label TEXT
+);
+CREATE TABLE IF NOT EXISTS endpoint_stats (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    method TEXT NOT NULL,
+    name TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    failures INTEGER NOT NULL,
+    rps REAL NOT NULL,
+    error_rate REAL NOT NULL,
+    avg REAL, p50 REAL, p95 REAL, p99 REAL, p999 REAL, max REAL,
+    PRIMARY KEY (run_id, method, name)
+);
+CREATE TABLE IF NOT EXISTS resource_samples (
+    run_id INTEGER NOT NULL REFERENCES runs(id),
+    timestamp REAL NOT NULL,
+    target TEXT NOT NULL,
+    processes INTEGER NOT NULL,
+    cpu_percent REAL, rss_mb REAL, threads INTEGER, fds INTEGER,
+    users INTEGER, rps REAL, fail_per_sec REAL, p95_ms REAL
+);
+"""
+
+def harness_version() -> Tuple[str, str]:
+    """(VERSION, commit corto de git) del árbol que produce los resultados."""
+    try:
+        with open(os.path.join(HERE, "VERSION")) as f:
+            version = f.read().strip() or "unknown"
+    except OSError:
+        version = "unknown"
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=HERE,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+    return version, commit
+
+def connect(path: str = RESULTS_DB) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    conn.executescript(SCHEMA)
+    return conn
+
+def _entry_row(entry, histogram=None) -> dict:
+    # Con histograma HDR los percentiles salen de ahí; los de Locust se redondean por encima de 100 ms
+    if histogram:
+        percentile = histogram.value_at_percentile
+    else:
+        percentile = lambda p: entry.get_response_time_percentile(p / 100)
+    return {
+        "method": entry.method or "", "name": entry.name,
+        "requests": entry.num_requests, "failures": entry.num_failures,
+        "rps": entry.total_rps, "error_rate": entry.fail_ratio, "avg": entry.avg_response_time,
+        "max": entry.max_response_time,
+        **{key: percentile(p) for key, p in PERCENTILES.items()},
+    }
+
+def save_run(environment, label: Optional[str] = None, histograms: Optional[dict] = None,
+             path: str = RESULTS_DB, resource_samples: Optional[list] = None) -> int:
+    """Guarda las stats de Locust de la corrida y devuelve su id.
+
+    histograms: HDR por "MÉTODO nombre". resource_samples: ResourceSample de resource_sampler.py.
+    """
+    stats = environment.stats
+    version, commit = harness_version()
+    options = environment.parsed_options
+    user_classes = ",".join(sorted(cls.__name__ for cls in environment.user_classes))
+    histograms = histograms or {}
+    rows = [_entry_row(entry, histograms.get(f"{entry.method} {entry.name}"))
+            for entry in stats.entries.values() if entry.num_requests]
+    rows.append(_entry_row(stats.total))
+    with connect(path) as conn:
+        cursor = conn.execute(
+            "INSERT INTO runs (started_at, ended_at, version, git_commit, host, user_classes, users, label) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            (stats.start_time, time.time(), version, commit, environment.host, user_classes,
+             getattr(options, "num_users", None), label))
+        run_id = cursor.lastrowid
+        conn.executemany(
+            "INSERT INTO endpoint_stats (run_id, method, name, requests, failures, rps, error_rate, "
+            "avg, p50, p95, p99, p999, max) VALUES (:run_id, :method, :name, :requests, :failures, :rps, "
+            ":error_rate, :avg, :p50, :p95, :p99, :p999, :max)",
+            [dict(row, run_id=run_id) for row in rows])
+        if resource_samples:
+            conn.executemany(
+                "INSERT INTO resource_samples (run_id, timestamp, target, processes, cpu_percent, rss_mb, threads, "
+                "fds, users, rps, fail_per_sec, p95_ms) VALUES (:run_id, :timestamp, :target, :processes, "
+                ":cpu_percent, :rss_mb, :threads, :fds, :users, :rps, :fail_per_sec, :p95_ms)",
+                [dict(sample.__dict__, run_id=run_id) for sample in resource_samples])
+    return run_id
+
+def resolve_run(conn: sqlite3.Connection, selector: str) -> sqlite3.Row:
+    if selector == "latest":
+        row = conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT 1").fetchone()
+    elif selector.startswith("v"):
+        row = conn.execute("SELECT * FROM runs WHERE version = ? ORDER BY id DESC LIMIT 1",
+                           (selector[1:],)).fetchone()
+    else:
+        row = conn.execute("SELECT * FROM runs WHERE id = ?", (int(selector),)).fetchone()
+    if row is None:
+        raise SystemExit(f"❌ No hay corrida que coincida con {selector}")
+    return row
+
+def endpoint_stats(conn: sqlite3.Connection, run_id: int) -> Dict[str, sqlite3.Row]:
+    rows = conn.execute("SELECT * FROM endpoint_stats WHERE run_id = ?", (run_id,)).fetchall()
+    return {f"{row['method']} {row['name']}".strip(): row for row in rows}
+
+def load_tolerances(path: Optional[str]) -> Dict[str, Dict[str, float]]:
+    tolerances = {"default": dict(DEFAULT_TOLERANCES)}
+    if path:
+        with open(path) as f:
+            for endpoint, values in json.load(f).items():
+                tolerances.setdefault(endpoint, {}).update(values)
+    return tolerances
+
+def tolerance_for(tolerances: Dict[str, Dict[str, float]], key: str, name: str, metric: str) -> Optional[float]:
+    # Se busca por "MÉTODO nombre", después por nombre solo y por último el default
+    for scope in (key, name, "default"):
+        if metric in tolerances.get(scope, {}):
+            return tolerances[scope][metric]
+    return tolerances["default"].get(metric)
+
+def compare(baseline: Dict[str, sqlite3.Row], candidate: Dict[str, sqlite3.Row],
+            tolerances: Dict[str, Dict[str, float]]) -> List[dict]:
+    """Una fila por endpoint y métrica comparada; regression=True si supera la tolerancia."""
+    results = []
+    for key, base in sorted(baseline.items()):
+        cand = candidate.get(key)
+        if cand is None:
+            results.append({"endpoint": key, "metric": "requests", "baseline": base["requests"],
+                            "candidate": 0, "change": None, "tolerance": None, "regression": True})
+            continue
+        for metric in ("rps", "error_rate") + HIGHER_IS_WORSE:
+            tolerance = tolerance_for(tolerances, key, base["name"], metric)
+            if tolerance is None or base[metric] is None or cand[metric] is None:
+                continue
+            if metric == "error_rate":
+                change = cand[metric] - base[metric]
+            elif base[metric] == 0:
+                continue
+            elif metric == "rps":
+                change = (base[metric] - cand[metric]) / base[metric]
+            else:
+                change = (cand[metric] - base[metric]) / base[metric]
+            results.append({"endpoint": key, "metric": metric, "baseline": base[metric], "candidate": cand[metric],
+                            "change": change, "tolerance": tolerance, "regression": change > tolerance})
+    return results
+
+def _describe(run: sqlite3.Row) -> str:
+    started = time.strftime("%Y-%m-%d %H:%M", time.localtime(run["started_at"]))
+    return (f"#{run['id']} {started} v{run['version']}+{run['git_commit']} {run['user_classes']} "
+            f"users={run['users']} {run['label'] or ''}").rstrip()
+
+def cmd_list(conn: sqlite3.Connection, args) -> int:
+    for run in conn.execute("SELECT * FROM runs ORDER BY id DESC LIMIT ?", (args.limit,)):
+        print(_describe(run))
+    return 0
+
+def cmd_show(conn: sqlite3.Connection, args) -> int:
+    run = resolve_run(conn, args.run)
+    print(_describe(run))
+    print(f"{'Endpoint':<40} | {'reqs':>7} | {'rps':>8} | {'err %':>6} | {'p50':>7} | {'p95':>7} | "
+          f"{'p99':>7} | {'p99.9':>7}")
+    for key, row in sorted(endpoint_stats(conn, run["id"]).items()):
+        print(f"{key:<40} | {row['requests']:>7} | {row['rps']:>8.1f} | {row['error_rate'] * 100:>6.2f} | "
+              f"{row['p50']:>7.0f} | {row['p95']:>7.0f} | {row['p99']:>7.0f} | {row['p999']:>7.0f}")
+    return 0
+
+def cmd_resources(conn: sqlite3.Connection, args) -> int:
+    run = resolve_run(conn, args.run)
+    print(_describe(run))
+    query = "SELECT * FROM resource_samples WHERE run_id = ?"
+    params: tuple = (run["id"],)
+    if args.target:
+        query += " AND target = ?"
+        params += (args.target,)
+    print(f"{'t (s)':>7} | {'target':<12} | {'users':>6} | {'rps':>8} | {'fail/s':>6} | {'p95':>7} | "
+          f"{'cpu %':>6} | {'rss MB':>8} | {'threads':>7} | {'fds':>6}")
+    for row in conn.execute(query + " ORDER BY timestamp, target", params):
+        fds = "-" if row["fds"] is None else row["fds"]
+        p95 = "-" if row["p95_ms"] is None else f"{row['p95_ms']:.0f}"
+        print(f"{row['timestamp'] - run['started_at']:>7.1f} | {row['target']:<12} | {row['users']:>6} | "
+              f"{row['rps']:>8.1f} | {row['fail_per_sec']:>6.1f} | {p95:>7} | {row['cpu_percent']:>6.1f} | "
+              f"{row['rss_mb']:>8.1f} | {row['threads']:>7} | {fds:>6}")
+    return 0
+
+def cmd_compare(conn: sqlite3.Connection, args) -> int:
+    base_run, cand_run = resolve_run(conn, args.baseline), resolve_run(conn, args.candidate)
+    print(f"Baseline:  {_describe(base_run)}\nCandidato: {_describe(cand_run)}")
+    results = compare(endpoint_stats(conn, base_run["id"]), endpoint_stats(conn, cand_run["id"]),
+                      load_tolerances(args.tolerances))
+    regressions = [r for r in results if r["regression"]]
+    for r in (results if args.verbose else regressions):
+        change = "faltante" if r["change"] is None else f"{r['change'] * 100:+.1f}%"
+        limit = "" if r["tolerance"] is None else f" (tolerancia {r['tolerance'] * 100:.1f}%)"
+        mark = "❌" if r["regression"] else "✅"
+        print(f"{mark} {r['endpoint']} {r['metric']}: {r['baseline']:.2f} -> {r['candidate']:.2f} {change}{limit}")
+    if regressions:
+        print(f"❌ {len(regressions)} regresiones contra la corrida #{base_run['id']}")
+        return 1
+    print(f"✅ Sin regresiones contra la corrida #{base_run['id']}")
+    return 0
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Resultados de corridas de Locust y gate de regresión")
+    parser.add_argument("--db", default=RESULTS_DB)
+    commands = parser.add_subparsers(dest="command", required=True)
+    list_parser = commands.add_parser("list", help="Últimas corridas guardadas")
+    list_parser.add_argument("--limit", type=int, default=20)
+    show_parser = commands.add_parser("show", help="Stats por endpoint de una corrida")
+    show_parser.add_argument("run")
+    resources_parser = commands.add_parser("resources", help="Muestras de recursos del backend de una corrida")
+    resources_parser.add_argument("run")
+    resources_parser.add_argument("--target", help="Solo este target (p. ej. backend)")
+    compare_parser = commands.add_parser("compare", help="Compara una corrida contra un baseline")
+    compare_parser.add_argument("--baseline", required=True)
+    compare_parser.add_argument("--candidate", default="latest")
+    compare_parser.add_argument("--tolerances", help="JSON de tolerancias por endpoint")
+    compare_parser.add_argument("-v", "--verbose", action="store_true", help="Mostrar también las métricas que pasan")
+    args = parser.parse_args(argv)
+
+    commands_by_name = {"list": cmd_list, "show": cmd_show, "resources": cmd_resources, "compare": cmd_compare}
+    with connect(args.db) as conn:
+        return commands_by_name[args.command](conn, args)
+
+if __name__ == "__main__":
+    sys.exit(main())
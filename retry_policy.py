@@ -0,0 +1,95 @@
+"""
+Política de reintentos de los clientes móviles para las operaciones con la billetera externa.
+
+Cuando ExternalWalletClient da timeout el backend responde 503 y las apps reintentan.
+Con RETRY_POLICY=on los depósitos y retiros de locustfile.py reintentan igual:
+
+  RETRY_MAX_ATTEMPTS   intentos por operación lógica, incluido el primero (default 4)
+  RETRY_BASE_DELAY     espera base en s, se duplica en cada intento (default 0.2)
+  RETRY_MAX_DELAY      tope de la espera en s (default 5)
+  RETRY_JITTER         full (espera uniforme entre 0 y el backoff, default) | none
+  RETRY_BUDGET         reintentos permitidos por cada primer intento, por worker (default 0.2);
+                       con el presupuesto agotado la operación falla sin reintentar
+  RETRY_STATUSES       status que se reintentan (default 0,502,503,504; 0 = sin respuesta)
+
+Todos los intentos de una operación mandan el mismo body, con el mismo externalReference,
+como haría un cliente que reintenta la misma operación. Las transferencias P2P no se
+reintentan: no llevan clave de idempotencia y un reintento podría duplicarlas.
+
+retry_stats cuenta operaciones, intentos y resultados; locustfile.py los junta en el
+master y reporta la carga extra por reintentos según la tasa de falla del primer intento.
+"""
+import os
+import random
+from collections import Counter
+from typing import Dict
+
+RETRY_POLICY = os.getenv("RETRY_POLICY", "off") == "on"
+RETRY_MAX_ATTEMPTS = int(os.getenv("RETRY_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.getenv("RETRY_BASE_DELAY", "0.2"))
+RETRY_MAX_DELAY = float(os.getenv("RETRY_MAX_DELAY", "5"))
+RETRY_JITTER = os.getenv("RETRY_JITTER", "full")
+RETRY_BUDGET = float(os.getenv("RETRY_BUDGET", "0.2"))
+RETRY_STATUSES = {int(status) for status in os.getenv("RETRY_STATUSES", "0,502,503,504").split(",")}
+# Reintentos disponibles al arrancar, para que las primeras fallas también se reintenten
+RETRY_BUDGET_RESERVE = 10.0
+
+retry_stats: Counter = Counter()
+
+class RetryBudget:
+    """Cada primer intento suma ratio reintentos disponibles (hasta cap); cada reintento consume uno."""
+
+    def __init__(self, ratio: float, reserve: float = RETRY_BUDGET_RESERVE):
+        self.ratio = ratio
+        self.cap = max(reserve, 1.0)
+        self.tokens = reserve
+
+    def deposit(self) -> None:
+        self.tokens = min(self.tokens + self.ratio, self.cap)
+
+    def withdraw(self) -> bool:
+        if self.tokens < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+budget = RetryBudget(RETRY_BUDGET)
+
+def should_retry(status_code: int) -> bool:
+    return status_code in RETRY_STATUSES
+
+def backoff_delay(attempt: int) -> float:
+    """Espera antes del intento attempt + 1 (attempt empieza en 1)."""
+    delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 1))
+    return random.uniform(0, delay) if RETRY_JITTER == "full" else delay
+
+def record_operation(attempts: int, first_failed: bool, succeeded: bool, outcome: str) -> None:
+    """outcome: ok | not_retryable | exhausted (sin intentos) | no_budget (sin presupuesto)."""
+    retry_stats["operations"] += 1
+    retry_stats["attempts"] += attempts
+    retry_stats[f"attempts_{attempts}"] += 1
+    retry_stats[outcome] += 1
+    if first_failed:
+        retry_stats["first_failures"] += 1
+        if succeeded:
+            retry_stats["recovered"] += 1
+
+def drain_retry_stats() -> Dict[str, int]:
+    drained = dict(retry_stats)
+    retry_stats.clear()
+    return drained
+
+def summarize(stats: Counter) -> Dict[str, float]:
+    """Tasa de falla del primer intento y carga extra (reintentos / operaciones) de un período."""
+    operations = stats["operations"]
+    if not operations:
+        return {}
+    return {
+        "operations": operations,
+        "first_failure_rate": round(stats["first_failures"] / operations, 4),
+        "attempts_per_operation": round(stats["attempts"] / operations, 3),
+        "extra_load": round((stats["attempts"] - operations) / operations, 4),
+        "recovered": stats["recovered"],
+        "exhausted": stats["exhausted"],
+        "no_budget": stats["no_budget"],
+    }
@@ -20,6 +20,7 @@ show_help() {
     echo "  up-db           Levanta solo las bases de datos"
     echo "  up-app          Levanta aplicación y dependencias (sin Locust)"
     echo "  up-locust       Levanta solo Locust (requiere que la app esté corriendo)"
+    echo "  up-stub [P]     Levanta la billetera externa simulada con el perfil P (fast|normal|slow|flaky|degraded)"
     echo "  logs            Muestra logs de todos los servicios"
     echo "  logs-locust     Muestra logs solo de Locust"
     echo "  scale-workers N Escala los workers de Locust a N instancias"
@@ -60,7 +61,7 @@ case "$1" in
     "up-app")
         echo -e "${GREEN}🔧 Levantando aplicación...${NC}"
         check_env
-        docker-compose up -d postgres backend
+        docker-compose up -d postgres external-wallet-stub backend
         echo -e "${GREEN}✅ Aplicación levantada!${NC}"
         echo -e "${YELLOW}🔧 Backend API disponible en: http://localhost:8080${NC}"
         ;;
@@ -70,6 +71,12 @@ case "$1" in
         echo -e "${GREEN}✅ Locust levantado!${NC}"
         echo -e "${YELLOW}📊 Locust UI disponible en: http://localhost:8089${NC}"
         ;;
+    "up-stub")
+        echo -e "${GREEN}🏦 Levantando billetera externa simulada (perfil ${2:-normal})...${NC}"
+        EXTERNAL_WALLET_PROFILE=${2:-normal} docker-compose up -d --force-recreate external-wallet-stub
+        echo -e "${GREEN}✅ Billetera externa simulada levantada!${NC}"
+        echo -e "${YELLOW}🏦 Stub disponible en: http://localhost:8090 (stats en /__stats)${NC}"
+        ;;
     "logs")
         docker-compose logs -f
         ;;
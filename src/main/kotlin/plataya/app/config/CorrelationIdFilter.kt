@@ -0,0 +1,39 @@
+package plataya.app.config
+
+import jakarta.servlet.FilterChain
+import jakarta.servlet.http.HttpServletRequest
+import jakarta.servlet.http.HttpServletResponse
+import org.slf4j.MDC
+import org.springframework.core.Ordered
+import org.springframework.core.annotation.Order
+import org.springframework.stereotype.Component
+import org.springframework.web.filter.OncePerRequestFilter
+import java.util.UUID
+
+// Propaga el X-Correlation-ID del cliente (o genera uno) a los logs y a la respuesta,
+// para cruzar requests lentos del harness de carga con las líneas de log del backend
+@Component
+@Order(Ordered.HIGHEST_PRECEDENCE)
+class CorrelationIdFilter : OncePerRequestFilter() {
+
+    companion object {
+        const val HEADER = "X-Correlation-ID"
+        const val MDC_KEY = "correlationId"
+    }
+
+    override fun doFilterInternal(
+        request: HttpServletRequest,
+        response: HttpServletResponse,
+        filterChain: FilterChain
+    ) {
+        val correlationId = request.getHeader(HEADER)?.takeIf { it.isNotBlank() }?.take(64)
+            ?: UUID.randomUUID().toString().replace("-", "")
+        MDC.put(MDC_KEY, correlationId)
+        response.setHeader(HEADER, correlationId)
+        try {
+            filterChain.doFilter(request, response)
+        } finally {
+            MDC.remove(MDC_KEY)
+        }
+    }
+}
@@ -0,0 +1,43 @@
+import base64
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+TOKEN_REFRESH_MARGIN = float(os.getenv("TOKEN_REFRESH_MARGIN", "300"))
+TOKEN_DEFAULT_TTL = 86400.0
+
+def token_expiry(token: str) -> float:
+    """Lee el claim exp del JWT sin verificar la firma; si no se puede, asume 24h."""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return time.time() + TOKEN_DEFAULT_TTL
+
+class TokenCache:
+    """
+    Tokens JWT por usuario simulado (email -> token, exp).
+    Un token se considera válido hasta TOKEN_REFRESH_MARGIN segundos antes de expirar.
+    """
+    def __init__(self, refresh_margin: float = TOKEN_REFRESH_MARGIN):
+        self.refresh_margin = refresh_margin
+        self._tokens: Dict[str, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, email: str, token: str) -> None:
+        with self._lock:
+            self._tokens[email] = (token, token_expiry(token))
+
+    def get(self, email: str) -> Optional[str]:
+        with self._lock:
+            entry = self._tokens.get(email)
+        if entry and entry[1] - self.refresh_margin > time.time():
+            return entry[0]
+        return None
+
+    def invalidate(self, email: str) -> None:
+        with self._lock:
+            self._tokens.pop(email, None)
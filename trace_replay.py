@@ -0,0 +1,238 @@
+"""
+Reproducción de trazas grabadas con TRACE_RECORD (ver request_trace.py).
+
+  TRACE_REPLAY             traza(s) a reproducir: rutas separadas por coma o un glob ("traces/base.gz*")
+  REPLAY_SPEED             1 = tiempo real (default), N = N veces más rápido, 0 = lo más rápido posible
+                           respetando el orden de los requests de cada usuario
+  REPLAY_USERS_FILE        fixture de provisioning.py a usar en vez de registrar usuarios nuevos
+  REPLAY_SEED_CONCURRENCY  registros en paralelo al sembrar la población (default 32)
+
+Antes de reproducir, el master (o el runner local) siembra una población nueva: un
+usuario registrado y fondeado por cada usuario lógico de la traza. Los CVU grabados de
+cada usuario se reemplazan en paths y bodies por el de su usuario nuevo, y el
+Authorization por su token vigente. Los registros se reproducen con un email nuevo (el
+backend recibe la misma carga, pero el flujo sigue con la billetera sembrada), los logins
+con las credenciales sembradas y las externalReference se regeneran.
+
+Un request cuenta como exitoso si el status coincide con el grabado, así las diferencias
+de comportamiento entre builds aparecen como fallas.
+
+Los usuarios lógicos se reparten entre los workers conectados al arrancar (el master
+manda la cantidad junto con la población). Cada proceso reproduce su parte, un usuario por
+greenlet y con su propia sesión HTTP, así la concurrencia de la traza no depende de -u:
+ReplayUser solo existe para que Locust arranque la corrida. Cuando todos los workers
+terminan su parte, el master junta los totales y corta la corrida sin esperar a -t.
+Todos los procesos tienen que ver el archivo de la traza.
+
+Uso: TRACE_REPLAY=traces/baseline.trace.gz locust -f trace_replay.py --headless -u 1 ReplayUser
+"""
+import os
+import time
+import uuid
+from typing import Dict, List, Optional
+
+import gevent
+from gevent.event import Event
+from locust import HttpUser, constant, events
+from locust.clients import HttpSession
+from locust.runners import MasterRunner, WorkerRunner
+
+from locustfile import CONNECTION_MODE, SHARED_POOL_SIZE, generate_external_reference, logger
+from provisioning import USER_PASSWORD, ProvisionedUser, load_fixture, seed
+from request_timing import instrument_session
+from request_trace import CVU_FIELDS, Trace, TraceRecord, load_trace
+
+TRACE_REPLAY = os.getenv("TRACE_REPLAY", "")
+REPLAY_SPEED = float(os.getenv("REPLAY_SPEED", "1"))
+REPLAY_USERS_FILE = os.getenv("REPLAY_USERS_FILE")
+REPLAY_SEED_CONCURRENCY = int(os.getenv("REPLAY_SEED_CONCURRENCY", "32"))
+# Margen para que la población llegue a todos los workers antes del instante cero
+REPLAY_START_DELAY = 2.0
+MSG_REPLAY_POPULATION = "replay_population"
+MSG_REPLAY_DONE = "replay_done"
+REGISTER_PATH = "/api/v1/user/register"
+LOGIN_PATH = "/api/v1/user/login"
+
+trace: Trace = load_trace(TRACE_REPLAY) if TRACE_REPLAY else Trace()
+
+class TraceRemapper:
+    """Traduce los requests grabados a la población sembrada para esta reproducción."""
+
+    def __init__(self, trace: Trace, population: Dict[str, ProvisionedUser]):
+        self.population = population
+        self.cvus = {trace.owners[user]: seeded.cvu for user, seeded in population.items() if user in trace.owners}
+        self.tokens = {user: seeded.token for user, seeded in population.items()}
+
+    def _path(self, path: str) -> str:
+        return "/".join(str(self.cvus.get(int(segment), segment)) if segment.isdigit() else segment
+                        for segment in path.split("/"))
+
+    def _body(self, user: str, record: TraceRecord):
+        if not isinstance(record.body, dict):
+            return record.body
+        body = dict(record.body)
+        for key in CVU_FIELDS:
+            if body.get(key) is not None:
+                body[key] = self.cvus.get(int(body[key]), body[key])
+        if "externalReference" in body:
+            body["externalReference"] = generate_external_reference()
+        if record.path == REGISTER_PATH:
+            body["mail"] = f"replay_{uuid.uuid4().hex[:12]}@example.com"
+        elif record.path == LOGIN_PATH:
+            body["mail"], body["password"] = self.population[user].email, USER_PASSWORD
+        return body
+
+    def request_kwargs(self, user: str, record: TraceRecord) -> dict:
+        kwargs = {"url": self._path(record.path), "name": record.name}
+        body = self._body(user, record)
+        if isinstance(body, dict):
+            kwargs["json"] = body
+        elif body is not None:
+            kwargs["data"] = body
+        if record.auth:
+            kwargs["headers"] = {"Authorization": f"Bearer {self.tokens[user]}"}
+        return kwargs
+
+    def observe(self, user: str, record: TraceRecord, response) -> None:
+        # Un login reproducido emite un token nuevo para el usuario sembrado
+        if record.path == LOGIN_PATH and response.status_code == 200:
+            try:
+                self.tokens[user] = response.json().get("token") or self.tokens[user]
+            except ValueError:
+                pass
+
+remapper: Optional[TraceRemapper] = None
+replay_start_at = 0.0
+replay_share, replay_workers = 0, 1
+population_ready = Event()
+_engine_started = False
+# Totales de los workers que ya terminaron su parte (solo en el master)
+_finished: Dict[str, dict] = {}
+
+def _set_population(population: Dict[str, ProvisionedUser], start_at: float, share: int, workers: int) -> None:
+    global remapper, replay_start_at, replay_share, replay_workers
+    remapper = TraceRemapper(trace, population)
+    replay_start_at = start_at
+    replay_share, replay_workers = share, workers
+    population_ready.set()
+
+def _worker_on_population(environment, msg, **kwargs):
+    users, start_at, share, workers = msg.data
+    _set_population({user: ProvisionedUser(*seeded) for user, *seeded in users}, start_at, share, workers)
+
+def _master_on_done(environment, msg, **kwargs):
+    _finished[msg.node_id] = msg.data
+    if len(_finished) < replay_workers:
+        return
+    _log_replay_done(_merge_stats(_finished.values()), workers=len(_finished))
+    # Fuera del greenlet que atiende los mensajes: quit() lo mata
+    gevent.spawn(environment.runner.quit)
+
+def _seed_population(host: str) -> List[ProvisionedUser]:
+    if REPLAY_USERS_FILE:
+        return load_fixture(REPLAY_USERS_FILE)[:len(trace.users)]
+    return seed(host, len(trace.users), REPLAY_SEED_CONCURRENCY, 30.0)
+
+@events.init.add_listener
+def setup_replay(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message(MSG_REPLAY_POPULATION, _worker_on_population)
+    elif isinstance(environment.runner, MasterRunner):
+        environment.runner.register_message(MSG_REPLAY_DONE, _master_on_done)
+
+@events.test_start.add_listener
+def seed_replay_population(environment, **kwargs):
+    runner = environment.runner
+    if isinstance(runner, WorkerRunner):
+        return
+    if not trace.records:
+        raise RuntimeError("TRACE_REPLAY no tiene requests para reproducir")
+    seeded = _seed_population(environment.host or ReplayUser.host)
+    if len(seeded) < len(trace.users):
+        raise RuntimeError(f"Se sembraron {len(seeded)} usuarios de {len(trace.users)} que tiene la traza")
+    population = dict(zip(trace.users, seeded))
+    start_at = time.time() + REPLAY_START_DELAY
+    workers = 1
+    if isinstance(runner, MasterRunner):
+        # La parte de cada worker es su posición entre los conectados: los índices de
+        # worker no son necesariamente contiguos
+        clients = sorted(runner.clients.ready + runner.clients.spawning + runner.clients.running,
+                         key=lambda client: runner.get_worker_index(client.id))
+        workers = max(len(clients), 1)
+        _finished.clear()
+        users = [(user, *p) for user, p in population.items()]
+        for share, client in enumerate(clients):
+            # Llega a cada worker antes que el mensaje de spawn
+            runner.send_message(MSG_REPLAY_POPULATION, (users, start_at, share, workers), client_id=client.id)
+    _set_population(population, start_at, 0, workers)
+    speed = "máxima velocidad" if REPLAY_SPEED <= 0 else f"{REPLAY_SPEED:g}x"
+    logger.info("🔁 Reproduciendo %s requests de %s usuarios (%.0fs grabados) a %s", trace.total,
+                len(trace.users), trace.duration, speed)
+
+def _replay_user(session: HttpSession, user: str, records: List[TraceRecord], stats: dict) -> None:
+    for record in records:
+        if REPLAY_SPEED > 0:
+            delay = replay_start_at + record.offset / REPLAY_SPEED - time.time()
+            if delay > 0:
+                gevent.sleep(delay)
+            else:
+                stats["max_lag_ms"] = max(stats["max_lag_ms"], -delay * 1000)
+        kwargs = remapper.request_kwargs(user, record)
+        with session.request(record.method, catch_response=True, **kwargs) as response:
+            remapper.observe(user, record, response)
+            stats["requests"] += 1
+            if response.status_code == record.status:
+                response.success()
+            else:
+                stats["mismatches"] += 1
+                response.failure(f"Status {response.status_code}, grabado {record.status}")
+
+def _merge_stats(parts) -> dict:
+    merged = {"requests": 0, "mismatches": 0, "users": 0, "max_lag_ms": 0.0}
+    for part in parts:
+        for key in ("requests", "mismatches", "users"):
+            merged[key] += part[key]
+        merged["max_lag_ms"] = max(merged["max_lag_ms"], part["max_lag_ms"])
+    return merged
+
+def _log_replay_done(stats: dict, workers: int = 1) -> None:
+    logger.info("🔁 Reproducción terminada: %s requests de %s usuarios en %.0fs (%s procesos), %s con status "
+                "distinto al grabado, atraso máximo %.0fms", stats["requests"], stats["users"],
+                time.time() - replay_start_at, workers, stats["mismatches"], stats["max_lag_ms"])
+
+def _run_engine(environment) -> None:
+    population_ready.wait()
+    gevent.sleep(max(0.0, replay_start_at - time.time()))
+    runner = environment.runner
+    share = trace.users[replay_share::replay_workers]
+    stats = {"requests": 0, "mismatches": 0, "users": len(share), "max_lag_ms": 0.0}
+    greenlets = []
+    for user in share:
+        session = HttpSession(base_url=environment.host or ReplayUser.host, request_event=environment.events.request,
+                              user=None)
+        instrument_session(session, CONNECTION_MODE, SHARED_POOL_SIZE)
+        greenlets.append(gevent.spawn(_replay_user, session, user, trace.records[user], stats))
+    gevent.joinall(greenlets)
+    if isinstance(runner, WorkerRunner):
+        runner.send_message(MSG_REPLAY_DONE, stats)
+    else:
+        _log_replay_done(stats)
+        runner.quit()
+
+@events.test_start.add_listener
+def start_replay_engine(environment, **kwargs):
+    global _engine_started
+    # Un solo motor por proceso, aunque el worker no tenga ningún ReplayUser asignado
+    if isinstance(environment.runner, MasterRunner) or _engine_started:
+        return
+    _engine_started = True
+    gevent.spawn(_run_engine, environment)
+
+class ReplayUser(HttpUser):
+    wait_time = constant(60)
+    host = "http://localhost:8080"
+
+    def idle(self):
+        pass
+
+    tasks = [idle]
@@ -0,0 +1,255 @@
+import logging
+import math
+import os
+import random
+import threading
+from array import array
+from bisect import bisect_left, insort
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+from harness_logging import log_event
+
+logger = logging.getLogger('wallet_test')
+
+CVU_POOL_CAPACITY = int(os.getenv("CVU_POOL_CAPACITY", "0"))
+PAYEE_DISTRIBUTION = os.getenv("PAYEE_DISTRIBUTION", "uniform")
+PAYEE_ZIPF_EXPONENT = float(os.getenv("PAYEE_ZIPF_EXPONENT", "1.0"))
+PAYEE_HOT_SET_SIZE = int(os.getenv("PAYEE_HOT_SET_SIZE", "10"))
+PAYEE_HOT_SET_FRACTION = float(os.getenv("PAYEE_HOT_SET_FRACTION", "0.8"))
+EXCLUDED_RETRIES = 8
+# Rango de popularidad: CVUs ordenados por un hash de 64 bits (multiplicar, xorshift,
+# multiplicar). Es una biyección, así el arreglo ordenado guarda solo las claves y el CVU
+# se recupera deshaciendo los pasos. Depende solo del CVU: es el mismo en todos los workers.
+_RANK_MULTIPLIER = 0x9E3779B97F4A7C15
+_RANK_INVERSE = pow(_RANK_MULTIPLIER, -1, 1 << 64)
+_RANK_MASK = (1 << 64) - 1
+# Con lotes más grandes conviene reordenar todo el arreglo que insertar de a uno
+RANK_REBUILD_BATCH = 256
+
+def rank_key(cvu: int) -> int:
+    key = (cvu * _RANK_MULTIPLIER) & _RANK_MASK
+    key ^= key >> 32
+    return (key * _RANK_MULTIPLIER) & _RANK_MASK
+
+def cvu_from_rank_key(key: int) -> int:
+    key = (key * _RANK_INVERSE) & _RANK_MASK
+    key ^= key >> 32
+    return (key * _RANK_INVERSE) & _RANK_MASK
+
+class UniformPayees:
+    """Todas las posiciones del pool con la misma probabilidad."""
+    def position(self, size: int) -> int:
+        return random.randrange(size)
+
+class ZipfPayees:
+    """
+    Posición k (0 = más popular) con probabilidad proporcional a 1/(k+1)^exponent.
+    Muestreo por rechazo-inversión (Hörmann y Derflinger): O(1) por muestra, sin
+    tablas, y el tamaño del pool puede cambiar entre muestras.
+    """
+    def __init__(self, exponent: float):
+        if exponent <= 0:
+            raise ValueError("El exponente de Zipf tiene que ser positivo")
+        self.exponent = exponent
+        self._h_integral_x1 = self._h_integral(1.5) - 1.0
+        self._s = 2.0 - self._h_integral_inverse(self._h_integral(2.5) - self._h(2.0))
+
+    def _h(self, x: float) -> float:
+        return math.exp(-self.exponent * math.log(x))
+
+    def _h_integral(self, x: float) -> float:
+        log_x = math.log(x)
+        return _expm1_over_x((1.0 - self.exponent) * log_x) * log_x
+
+    def _h_integral_inverse(self, x: float) -> float:
+        t = max(x * (1.0 - self.exponent), -1.0)
+        return math.exp(_log1p_over_x(t) * x)
+
+    def position(self, size: int) -> int:
+        h_integral_n = self._h_integral(size + 0.5)
+        while True:
+            u = h_integral_n + random.random() * (self._h_integral_x1 - h_integral_n)
+            x = self._h_integral_inverse(u)
+            k = min(max(int(x + 0.5), 1), size)
+            if k - x <= self._s or u >= self._h_integral(k + 0.5) - self._h(k):
+                return k - 1
+
+class HotSetPayees:
+    """Una fracción fija del tráfico va a las primeras hot_size posiciones; el resto es uniforme."""
+    def __init__(self, hot_size: int, fraction: float):
+        self.hot_size = hot_size
+        self.fraction = fraction
+
+    def position(self, size: int) -> int:
+        if random.random() < self.fraction:
+            return random.randrange(min(self.hot_size, size))
+        return random.randrange(size)
+
+def _expm1_over_x(x: float) -> float:
+    return math.expm1(x) / x if abs(x) > 1e-8 else 1.0 + x / 2.0
+
+def _log1p_over_x(x: float) -> float:
+    return math.log1p(x) / x if abs(x) > 1e-8 else 1.0 - x / 2.0
+
+def payee_distribution_from_env():
+    if PAYEE_DISTRIBUTION == "uniform":
+        return UniformPayees()
+    if PAYEE_DISTRIBUTION == "zipf":
+        return ZipfPayees(PAYEE_ZIPF_EXPONENT)
+    if PAYEE_DISTRIBUTION == "hotset":
+        return HotSetPayees(PAYEE_HOT_SET_SIZE, PAYEE_HOT_SET_FRACTION)
+    raise ValueError(f"PAYEE_DISTRIBUTION desconocida: {PAYEE_DISTRIBUTION} (uniform, zipf, hotset)")
+
+def distribution_summary(counts: Counter, top: int = 10) -> dict:
+    """Resumen de la distribución de accesos realizada: participación de los más elegidos y exponente estimado."""
+    samples = sum(counts.values())
+    if not samples:
+        return {"samples": 0}
+    frequencies = sorted(counts.values(), reverse=True)
+    top_1pct = max(len(frequencies) // 100, 1)
+    # Pendiente log-log frecuencia vs. rango sobre los rangos con al menos 5 accesos
+    points = [(math.log(rank), math.log(freq)) for rank, freq in enumerate(frequencies, 1) if freq >= 5]
+    exponent = None
+    if len(points) >= 3:
+        mean_x = sum(x for x, _ in points) / len(points)
+        mean_y = sum(y for _, y in points) / len(points)
+        var_x = sum((x - mean_x) ** 2 for x, _ in points)
+        if var_x:
+            exponent = round(-sum((x - mean_x) * (y - mean_y) for x, y in points) / var_x, 2)
+    return {
+        "samples": samples,
+        "distinct_payees": len(frequencies),
+        "top1_share": round(frequencies[0] / samples, 4),
+        f"top{top}_share": round(sum(frequencies[:top]) / samples, 4),
+        "top1pct_share": round(sum(frequencies[:top_1pct]) / samples, 4),
+        "zipf_exponent_estimate": exponent,
+    }
+
+class UserPool:
+    """
+    Pool de CVUs válidos para transferencias P2P.
+    Arreglo + índice: alta, baja y muestreo uniforme excluyendo al pagador en O(1).
+    Con capacity > 0, al llenarse se desaloja un CVU al azar.
+
+    Con zipf o hotset la distribución sortea un rango de popularidad y no una posición
+    del arreglo: los CVUs se ordenan por rank_key, así el CVU más popular es el mismo en
+    todos los workers y no cambia con el orden de llegada, los desalojos ni el swap-remove.
+    El arreglo ordenado se mantiene solo para esas distribuciones: alta y baja cuestan
+    un memmove de 8 bytes por CVU, el muestreo sigue siendo O(1).
+    """
+    def __init__(self, capacity: int = CVU_POOL_CAPACITY, distribution=None):
+        self.capacity = capacity
+        self.distribution = distribution or UniformPayees()
+        self.payee_counts: Counter = Counter()
+        self._cvus: List[int] = []
+        self._index: Dict[int, int] = {}
+        self._ranked: Optional[array] = None if isinstance(self.distribution, UniformPayees) else array("Q")
+        self._pending: List[int] = []
+        self._lock = threading.Lock()
+
+    def _insert(self, cvu: int, rank: bool = True) -> bool:
+        if cvu is None or cvu in self._index:
+            return False
+        if self.capacity and len(self._cvus) >= self.capacity:
+            self._discard(self._cvus[random.randrange(len(self._cvus))])
+        self._index[cvu] = len(self._cvus)
+        self._cvus.append(cvu)
+        if rank and self._ranked is not None:
+            insort(self._ranked, rank_key(cvu))
+        return True
+
+    def _discard(self, cvu: int) -> bool:
+        position = self._index.pop(cvu, None)
+        if position is None:
+            return False
+        last = self._cvus.pop()
+        if last != cvu:
+            self._cvus[position] = last
+            self._index[last] = position
+        if self._ranked is not None:
+            key = rank_key(cvu)
+            rank = bisect_left(self._ranked, key)
+            # Un CVU de un lote de merge_cvus puede desalojarse antes de entrar al arreglo ordenado
+            if rank < len(self._ranked) and self._ranked[rank] == key:
+                del self._ranked[rank]
+        return True
+
+    def _rank(self, cvus: List[int]) -> None:
+        if self._ranked is None:
+            return
+        keys = [rank_key(cvu) for cvu in cvus if cvu in self._index]
+        if len(keys) > RANK_REBUILD_BATCH:
+            keys.extend(self._ranked)
+            keys.sort()
+            self._ranked = array("Q", keys)
+        else:
+            for key in keys:
+                insort(self._ranked, key)
+
+    def add_cvu(self, cvu: int) -> None:
+        with self._lock:
+            if self._insert(cvu):
+                self._pending.append(cvu)
+                log_event(logger, "pool_add", " CVU %s agregado al pool (Total: %s)", cvu, len(self._cvus))
+
+    def remove_cvu(self, cvu: int) -> bool:
+        with self._lock:
+            return self._discard(cvu)
+
+    def merge_cvus(self, cvus: Iterable[int]) -> List[int]:
+        with self._lock:
+            added = [cvu for cvu in cvus if self._insert(cvu, rank=False)]
+            self._rank(added)
+            return added
+
+    def drain_pending(self) -> List[int]:
+        with self._lock:
+            pending, self._pending = self._pending, []
+            return pending
+
+    def snapshot(self) -> List[int]:
+        with self._lock:
+            return list(self._cvus)
+
+    def get_random_cvu(self, exclude_cvu: Optional[int]) -> Optional[int]:
+        with self._lock:
+            cvu = self._sample(exclude_cvu)
+            if cvu is not None:
+                self.payee_counts[cvu] += 1
+            return cvu
+
+    def _sample(self, exclude_cvu: Optional[int]) -> Optional[int]:
+        size = len(self._cvus)
+        excluded = self._index.get(exclude_cvu)
+        if self._ranked is not None:
+            return self._sample_ranked(size, exclude_cvu if excluded is not None else None)
+        if excluded is None:
+            return self._cvus[self.distribution.position(size)] if size else None
+        if size < 2:
+            return None
+        # Se sortea sobre size - 1 posiciones y se salta la del pagador
+        position = random.randrange(size - 1)
+        if position >= excluded:
+            position += 1
+        return self._cvus[position]
+
+    def _sample_ranked(self, size: int, exclude_cvu: Optional[int]) -> Optional[int]:
+        if size < (1 if exclude_cvu is None else 2):
+            return None
+        for _ in range(EXCLUDED_RETRIES):
+            cvu = cvu_from_rank_key(self._ranked[self.distribution.position(size)])
+            if cvu != exclude_cvu:
+                return cvu
+        # Pagador muy popular (p. ej. el primero con zipf de exponente alto): cae al siguiente
+        excluded = bisect_left(self._ranked, rank_key(exclude_cvu))
+        return cvu_from_rank_key(self._ranked[(excluded + 1) % size])
+
+    def drain_payee_counts(self) -> Counter:
+        with self._lock:
+            counts, self.payee_counts = self.payee_counts, Counter()
+            return counts
+
+    def get_pool_size(self) -> int:
+        with self._lock:
+            return len(self._cvus)
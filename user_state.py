@@ -0,0 +1,51 @@
+"""
+Estado compacto de los usuarios simulados.
+
+Cada WalletUserFlow guarda solo su índice (slot) en un UserStateStore compartido por
+el proceso: CVU y saldo van en arrays tipados (8 bytes cada uno, sin objetos int/float
+por usuario), y email y token en listas. Nombre, apellido, fecha de nacimiento y
+contraseña son iguales para todos y quedan como constantes de clase en WalletUserFlow.
+
+Los tokens no pasan por sys.intern: cada JWT es distinto y la tabla de internados suma
+~45 bytes por usuario sin deduplicar nada. El flujo guarda el mismo objeto str que el
+TokenCache, así cada token existe una sola vez en memoria.
+
+Los slots de usuarios que terminan se reusan (y su token sale del TokenCache en on_stop),
+así ni el store ni el cache crecen con el churn de usuarios.
+"""
+import sys
+from array import array
+from typing import List, Optional
+
+class UserStateStore:
+    def __init__(self):
+        self.cvus = array("q")        # 0 = sin CVU todavía
+        self.balances = array("d")
+        self.emails: List[Optional[str]] = []
+        self.tokens: List[Optional[str]] = []
+        self._free: List[int] = []
+
+    def allocate(self, email: str) -> int:
+        if self._free:
+            slot = self._free.pop()
+            self.cvus[slot], self.balances[slot] = 0, 0.0
+            self.emails[slot], self.tokens[slot] = email, None
+            return slot
+        self.cvus.append(0)
+        self.balances.append(0.0)
+        self.emails.append(email)
+        self.tokens.append(None)
+        return len(self.cvus) - 1
+
+    def release(self, slot: int) -> None:
+        self.emails[slot] = self.tokens[slot] = None
+        self._free.append(slot)
+
+    def __len__(self) -> int:
+        return len(self.cvus) - len(self._free)
+
+    def nbytes(self) -> int:
+        """Bytes de las estructuras del store (sin contar los str de email y token)."""
+        return (self.cvus.buffer_info()[1] * self.cvus.itemsize + self.balances.buffer_info()[1] *
+                self.balances.itemsize + sys.getsizeof(self.emails) + sys.getsizeof(self.tokens) +
+                sys.getsizeof(self._free))
@@ -0,0 +1,129 @@
+"""
+Perfiles de carga declarativos para locustfile.py.
+
+Un perfil es un JSON en workload_profiles/ (o una ruta) que define la mezcla de
+tareas, el ritmo de los usuarios y la distribución de montos. Se elige al lanzar
+con WORKLOAD_PROFILE=<nombre|ruta> (default: "default", la mezcla histórica):
+
+  {
+    "description": "Fin de mes: mayormente consultas",
+    "mode": "weighted",                       weighted | sequential
+    "weights": {"balance": 12, "history": 10, "deposit": 1, ...},
+    "sequence": ["register", "login", ...],   orden del modo sequential
+    "pacing": {"normal": [1, 3], "stress": [0.1, 0.5]},
+    "amounts": {
+      "deposit": {"distribution": "lognormal", "median": 200, "sigma": 1.0, "min": 1, "max": 5000},
+      "withdrawal": {"min": 10, "max_fraction": 0.3, "reserve": 10, "min_balance": 10}
+    },
+    "initial_deposit": 1000.0,
+    "external_cvu": 200000000001
+  }
+
+Las claves omitidas toman el valor del perfil default.
+"""
+import json
+import math
+import os
+import random
+from dataclasses import dataclass, field, fields
+from typing import Callable, Dict, List, Optional, Tuple
+
+PROFILES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "workload_profiles")
+TASK_NAMES = ("register", "login", "balance", "deposit", "withdrawal", "transfer", "history")
+MODES = ("weighted", "sequential")
+DISTRIBUTIONS = ("uniform", "lognormal", "fixed")
+
+@dataclass
+class AmountSpec:
+    distribution: str = "uniform"  # uniform | lognormal | fixed (usa min)
+    min: float = 1.0
+    max: float = math.inf
+    median: float = 100.0          # lognormal
+    sigma: float = 1.0             # lognormal
+    max_fraction: float = 1.0      # tope como fracción del saldo (retiros y transferencias)
+    reserve: float = 0.0           # saldo que siempre queda en la billetera
+    min_balance: float = 0.0       # con saldo menor o igual la operación se omite
+
+    def sample(self, balance: Optional[float] = None) -> Optional[float]:
+        """Monto a operar; None si el saldo no alcanza. balance solo se pasa para débitos."""
+        high = self.max
+        if balance is not None:
+            if balance <= self.min_balance:
+                return None
+            high = min(high, balance * self.max_fraction, balance - self.reserve)
+        if high < self.min:
+            return None
+        if self.distribution == "fixed":
+            value = self.min
+        elif self.distribution == "lognormal":
+            value = min(max(random.lognormvariate(math.log(self.median), self.sigma), self.min), high)
+        else:
+            value = random.uniform(self.min, high)
+        return round(value, 2)
+
+def _default_amounts() -> Dict[str, AmountSpec]:
+    return {
+        "deposit": AmountSpec(min=1.0, max=1000.0),
+        "withdrawal": AmountSpec(min=10.0, max_fraction=0.3, reserve=10.0, min_balance=10.0),
+        "transfer": AmountSpec(min=10.0, max_fraction=0.15, reserve=10.0, min_balance=20.0),
+    }
+
+@dataclass
+class WorkloadProfile:
+    name: str = "default"
+    description: str = ""
+    mode: str = "weighted"
+    weights: Dict[str, int] = field(default_factory=lambda: {
+        "register": 1, "login": 1, "balance": 8, "deposit": 4, "withdrawal": 2, "transfer": 3, "history": 5})
+    sequence: List[str] = field(default_factory=lambda: list(TASK_NAMES))
+    pacing: Dict[str, Tuple[float, float]] = field(default_factory=lambda: {"normal": (1.0, 3.0), "stress": (0.1, 0.5)})
+    amounts: Dict[str, AmountSpec] = field(default_factory=_default_amounts)
+    initial_deposit: float = 1000.0
+    external_cvu: int = 200000000001
+
+    def expand_tasks(self, tasks: Dict[str, Callable]) -> List[Callable]:
+        """Lista de tareas para TaskSet.tasks: repetidas por peso o en el orden de sequence."""
+        if self.mode == "sequential":
+            return [tasks[name] for name in self.sequence]
+        return [tasks[name] for name in TASK_NAMES for _ in range(self.weights.get(name, 0))]
+
+    def validate(self) -> None:
+        if self.mode not in MODES:
+            raise ValueError(f"Modo desconocido en el perfil {self.name}: {self.mode} ({', '.join(MODES)})")
+        for name in list(self.weights) + self.sequence:
+            if name not in TASK_NAMES:
+                raise ValueError(f"Tarea desconocida en el perfil {self.name}: {name} ({', '.join(TASK_NAMES)})")
+        if self.mode == "weighted" and not any(weight > 0 for weight in self.weights.values()):
+            raise ValueError(f"El perfil {self.name} no tiene ninguna tarea con peso positivo")
+        if self.mode == "sequential" and not self.sequence:
+            raise ValueError(f"El perfil {self.name} es secuencial pero no define sequence")
+        for kind, spec in self.amounts.items():
+            if spec.distribution not in DISTRIBUTIONS:
+                raise ValueError(f"Distribución de montos desconocida para {kind}: {spec.distribution}")
+
+def _amount_spec(kind: str, values: dict) -> AmountSpec:
+    known = {f.name for f in fields(AmountSpec)}
+    unknown = set(values) - known
+    if unknown:
+        raise ValueError(f"Campos desconocidos en amounts.{kind}: {', '.join(sorted(unknown))}")
+    base = _default_amounts().get(kind, AmountSpec())
+    return AmountSpec(**{**base.__dict__, **values})
+
+def load_workload(name_or_path: str) -> WorkloadProfile:
+    path = name_or_path if name_or_path.endswith(".json") else os.path.join(PROFILES_DIR, f"{name_or_path}.json")
+    with open(path) as f:
+        data = json.load(f)
+    known = {f.name for f in fields(WorkloadProfile)}
+    unknown = set(data) - known
+    if unknown:
+        raise ValueError(f"Campos desconocidos en el perfil {path}: {', '.join(sorted(unknown))}")
+    profile = WorkloadProfile(name=os.path.splitext(os.path.basename(path))[0])
+    for key, value in data.items():
+        if key == "amounts":
+            profile.amounts.update({kind: _amount_spec(kind, spec) for kind, spec in value.items()})
+        elif key == "pacing":
+            profile.pacing.update({family: tuple(bounds) for family, bounds in value.items()})
+        else:
+            setattr(profile, key, value)
+    profile.validate()
+    return profile